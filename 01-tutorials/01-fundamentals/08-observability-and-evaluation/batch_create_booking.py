@@ -0,0 +1,72 @@
+from typing import Any
+from strands.types.tools import ToolResult, ToolUse
+import uuid
+
+from booking_table import batch_put_bookings
+from create_booking import TOOL_SPEC as CREATE_BOOKING_SPEC
+
+TOOL_SPEC = {
+    "name": "batch_create_booking",
+    "description": "Create several new bookings at once, e.g. for a group split over several tables or dates",
+    "inputSchema": {
+        "json": {
+            "type": "object",
+            "properties": {
+                "bookings": {
+                    "type": "array",
+                    "description": "The bookings to create",
+                    "items": CREATE_BOOKING_SPEC["inputSchema"]["json"]
+                }
+            },
+            "required": ["bookings"]
+        }
+    }
+}
+
+
+def new_booking_ids(count):
+    """count distinct booking ids, as batch_put_bookings keeps only one item per key"""
+    booking_ids = set()
+    while len(booking_ids) < count:
+        booking_ids.add(str(uuid.uuid4())[:8])
+    return list(booking_ids)
+
+# Function name must match tool name
+def batch_create_booking(tool: ToolUse, **kwargs: Any) -> ToolResult:
+    tool_use_id = tool["toolUseId"]
+    bookings = tool["input"]["bookings"]
+
+    print(f"Creating {len(bookings)} reservations")
+    try:
+        items = [
+            {
+                'booking_id': booking_id,
+                'restaurant_name': booking["restaurant_name"],
+                'date': booking["date"],
+                'name': booking["guest_name"],
+                'hour': booking["hour"],
+                'num_guests': booking["num_guests"]
+            }
+            for booking, booking_id in zip(bookings, new_booking_ids(len(bookings)))
+        ]
+        unprocessed = {item['booking_id'] for item in batch_put_bookings(items)}
+        created = [item for item in items if item['booking_id'] not in unprocessed]
+        lines = [f"{len(created)} of {len(items)} reservations created. Booking ids:"]
+        lines += [f"{item['booking_id']}: {item['name']}, {item['restaurant_name']}, {item['date']} {item['hour']}"
+                  for item in created]
+        if unprocessed:
+            lines.append("Not created, try again: " + ", ".join(
+                f"{item['name']}, {item['restaurant_name']}, {item['date']} {item['hour']}"
+                for item in items if item['booking_id'] in unprocessed
+            ))
+        return {
+            "toolUseId": tool_use_id,
+            "status": "success" if created or not items else "error",
+            "content": [{"text": "\n".join(lines)}]
+        }
+    except Exception as e:
+        return {
+            "toolUseId": tool_use_id,
+            "status": "error",
+            "content": [{"text": str(e)}]
+        }
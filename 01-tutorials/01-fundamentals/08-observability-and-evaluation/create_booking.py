@@ -1,8 +1,9 @@
 from typing import Any
 from strands.types.tools import ToolResult, ToolUse
-import boto3
 import uuid
 
+from booking_table import get_booking_table
+
 TOOL_SPEC = {
     "name": "create_booking",
     "description": "Create a new booking at restaurant_name",
@@ -39,14 +40,7 @@ TOOL_SPEC = {
 }
 # Function name must match tool name
 def create_booking(tool: ToolUse, **kwargs: Any) -> ToolResult:
-    kb_name = 'restaurant-assistant'
-    dynamodb = boto3.resource('dynamodb')
-    smm_client = boto3.client('ssm')
-    table_name = smm_client.get_parameter(
-        Name=f'{kb_name}-table-name',
-        WithDecryption=False
-    )
-    table = dynamodb.Table(table_name["Parameter"]["Value"])
+    table = get_booking_table()
     
     tool_use_id = tool["toolUseId"]
     date = tool["input"]["date"]
@@ -1,5 +1,6 @@
 from strands import tool
-import boto3 
+
+from booking_table import get_booking_table
 
 @tool
 def delete_booking(booking_id: str, restaurant_name:str) -> str:
@@ -11,14 +12,7 @@ def delete_booking(booking_id: str, restaurant_name:str) -> str:
     Returns:
         confirmation_message: confirmation message
     """
-    kb_name = 'restaurant-assistant'
-    dynamodb = boto3.resource('dynamodb')
-    smm_client = boto3.client('ssm')
-    table_name = smm_client.get_parameter(
-        Name=f'{kb_name}-table-name',
-        WithDecryption=False
-    )
-    table = dynamodb.Table(table_name["Parameter"]["Value"])
+    table = get_booking_table()
     try:
         response = table.delete_item(Key={'booking_id': booking_id, 'restaurant_name': restaurant_name})
         if response['ResponseMetadata']['HTTPStatusCode'] == 200:
@@ -0,0 +1,29 @@
+from itertools import islice
+
+from strands import tool
+
+from booking_table import iter_bookings_by_date
+
+MAX_BOOKINGS = 50
+
+@tool
+def list_bookings(restaurant_name: str, date: str, after_booking_id: str = "") -> dict:
+    """List the bookings at restaurant_name on date
+    Args:
+        restaurant_name: name of the restaurant handling the reservations
+        date: the date of the bookings in the format YYYY-MM-DD
+        after_booking_id: the next_booking_id of a previous call, to list the bookings after it
+
+    Returns:
+        bookings: up to 50 bookings with their booking_id, guest name, hour and number
+            of guests, and next_booking_id when there may be more
+    """
+    try:
+        bookings = list(islice(iter_bookings_by_date(restaurant_name, date, after_booking_id or None,
+                                                     page_size=MAX_BOOKINGS), MAX_BOOKINGS))
+    except Exception as e:
+        return str(e)
+    results = {'restaurant_name': restaurant_name, 'date': date, 'bookings': bookings}
+    if len(bookings) == MAX_BOOKINGS:
+        results['next_booking_id'] = bookings[-1]['booking_id']
+    return results
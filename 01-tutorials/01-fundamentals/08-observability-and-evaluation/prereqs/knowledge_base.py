@@ -10,14 +10,19 @@ IAM roles and OpenSearch Serverless.
 
 import json
 import boto3
+import hashlib
 import time
 import uuid
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from opensearchpy import (
     OpenSearch,
     RequestsHttpConnection,
     AWSV4SignerAuth,
+    AuthorizationException,
     RequestError,
+    TransportError,
 )
 import pprint
 from retrying import retry
@@ -34,6 +39,12 @@ valid_embedding_models = [
 ]
 pp = pprint.PrettyPrinter(indent=2)
 
+upload_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
 
 def read_yaml_file(file_path: str):
     """
@@ -49,17 +60,33 @@ def read_yaml_file(file_path: str):
             return None
 
 
-def interactive_sleep(seconds: int):
+def wait_until(probe, description: str, timeout: float = 600, initial_delay: float = 1, max_delay: float = 30):
     """
-    Support functionality to induce an artificial 'sleep' to the code in order to wait for resources to be available
+    Poll probe until it returns a truthy value, backing off exponentially with jitter between polls
     Args:
-        seconds (int): number of seconds to sleep for
+        probe: callable returning the ready resource, or a falsy value while it is not ready
+        description: what is waited for, shown while waiting
+        timeout: overall deadline in seconds, after which TimeoutError is raised
+        initial_delay: seconds before the second poll, doubled for every later poll
+        max_delay: upper bound of the delay between polls
+
+    Returns:
+        the probe's last value
     """
-    dots = ""
-    for i in range(seconds):
-        dots += "."
-        print(dots, end="\r")
-        time.sleep(1)
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = initial_delay
+    while True:
+        result = probe()
+        if result:
+            print(f"{description} ready after {time.monotonic() - started:.0f}s")
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{description} not ready after {timeout}s")
+        print(f"Waiting for {description} ({time.monotonic() - started:.0f}s)", end="\r")
+        time.sleep(min(remaining, random.uniform(delay / 2, delay)))
+        delay = min(max_delay, delay * 2)
 
 
 class KnowledgeBasesForAmazonBedrock:
@@ -247,7 +274,7 @@ class KnowledgeBasesForAmazonBedrock:
                 kb_description,
                 bedrock_kb_execution_role,
             )
-            interactive_sleep(60)
+            self.wait_for_knowledge_base(knowledge_base["knowledgeBaseId"])
             print(
                 "========================================================================================"
             )
@@ -275,17 +302,79 @@ class KnowledgeBasesForAmazonBedrock:
                     CreateBucketConfiguration={"LocationConstraint": self.region_name},
                 )
 
-    def upload_directory(self, s3_path, bucket_name):
+    def upload_directory(self, s3_path, bucket_name, max_workers=16, manifest_path=None):
         """
-        Upload files from a local path to s3
+        Upload files from a local path to s3, skipping files unchanged since the last upload
             s3_path: local path of the document
             bucket_name: bucket name
+            max_workers: number of files uploaded concurrently
+            manifest_path: json file with the content hash of each uploaded file, by default
+                next to s3_path and named after the bucket. Files whose hash matches and whose
+                object is still in the bucket are not uploaded again. It is written even when
+                the upload fails or is interrupted, so finished files are not uploaded again
+        Returns:
+            the keys of the uploaded files, their paths relative to s3_path
         """
+        if manifest_path is None:
+            manifest_path = f"{os.path.normpath(s3_path)}.{bucket_name}.upload-manifest.json"
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        bucket_keys = set()
+        for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name):
+            bucket_keys.update(obj["Key"] for obj in page.get("Contents", []))
+
+        to_upload = {}
+        unchanged = 0
         for root, dirs, files in os.walk(s3_path):
             for file in files:
                 file_to_upload = os.path.join(root, file)
-                print(f"uploading file {file_to_upload} to {bucket_name}")
-                self.s3_client.upload_file(file_to_upload, bucket_name, file)
+                key = os.path.relpath(file_to_upload, s3_path).replace(os.sep, "/")
+                digest = self._file_sha256(file_to_upload)
+                if manifest.get(key) == digest and key in bucket_keys:
+                    unchanged += 1
+                else:
+                    to_upload[key] = (file_to_upload, digest)
+        print(f"uploading {len(to_upload)} files to {bucket_name}, skipping {unchanged} unchanged files")
+
+        def upload(key):
+            file_to_upload, _ = to_upload[key]
+            print(f"uploading file {file_to_upload} to {bucket_name}")
+            self.s3_client.upload_file(file_to_upload, bucket_name, key, Config=upload_transfer_config)
+
+        errors = []
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(upload, key): key for key in to_upload}
+        try:
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            executor.shutdown(cancel_futures=True)
+            uploaded = [key for future, key in futures.items()
+                        if not future.cancelled() and future.exception() is None]
+            for key in uploaded:
+                manifest[key] = to_upload[key][1]
+            with open(f"{manifest_path}.tmp", "w") as manifest_file:
+                json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+        if errors:
+            raise errors[0]
+        return uploaded
+
+    @staticmethod
+    def _file_sha256(path):
+        """
+        sha256 hex digest of a file's content
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
 
     def get_data_bucket_name(self):
         """
@@ -630,33 +719,57 @@ class KnowledgeBasesForAmazonBedrock:
         print(host)
         # wait for collection creation
         # This can take couple of minutes to finish
-        response = self.aoss_client.batch_get_collection(names=[vector_store_name])
-        # Periodically check collection status
-        while (response["collectionDetails"][0]["status"]) == "CREATING":
-            print("Creating collection...")
-            interactive_sleep(30)
-            response = self.aoss_client.batch_get_collection(names=[vector_store_name])
+        collection_details = wait_until(
+            lambda: self._collection_ready(vector_store_name),
+            f"collection {vector_store_name}",
+            timeout=900,
+        )
         print("\nCollection successfully created:")
-        pp.pprint(response["collectionDetails"])
+        pp.pprint(collection_details)
         # create opensearch serverless access policy and attach it to Bedrock execution role
         try:
-            created = self.create_oss_policy_attach_bedrock_execution_role(
+            # It can take up to a minute for data access rules to be enforced,
+            # create_vector_index waits for them before creating the index
+            self.create_oss_policy_attach_bedrock_execution_role(
                 collection_id, oss_policy_name, bedrock_kb_execution_role
             )
-            if created:
-                # It can take up to a minute for data access rules to be enforced
-                print(
-                    "Sleeping for a minute to ensure data access rules have been enforced"
-                )
-                interactive_sleep(60)
             return host, collection, collection_id, collection_arn
         except Exception as e:
             print("Policy already exists")
             pp.pprint(e)
 
+    def _collection_ready(self, vector_store_name: str):
+        """
+        Collection details once the collection is active, None while it is being created
+        """
+        collection = self.aoss_client.batch_get_collection(names=[vector_store_name])["collectionDetails"][0]
+        if collection["status"] == "FAILED":
+            raise RuntimeError(f"Collection {vector_store_name} failed to create")
+        return collection if collection["status"] == "ACTIVE" else None
+
+    def _create_index_when_authorized(self, index_name: str, body: str):
+        """
+        Create the index, or return None while the data access rules are not enforced yet
+        """
+        try:
+            return self.oss_client.indices.create(index=index_name, body=body)
+        except AuthorizationException:
+            return None
+
+    def _index_ready(self, index_name: str):
+        """
+        True once the index exists and answers a query
+        """
+        try:
+            return bool(self.oss_client.indices.exists(index=index_name)) and bool(
+                self.oss_client.search(index=index_name, body={"size": 0, "query": {"match_all": {}}})
+            )
+        except TransportError:
+            return False
+
     def create_vector_index(self, index_name: str):
         """
-        Create OpenSearch Serverless vector index. If existent, ignore
+        Create OpenSearch Serverless vector index and wait until it answers queries. If existent, ignore
         Args:
             index_name: name of the vector index
         """
@@ -686,14 +799,16 @@ class KnowledgeBasesForAmazonBedrock:
 
         # Create index
         try:
-            response = self.oss_client.indices.create(
-                index=index_name, body=json.dumps(body_json)
+            response = wait_until(
+                lambda: self._create_index_when_authorized(index_name, json.dumps(body_json)),
+                "data access rules",
+                timeout=300,
             )
             print("\nCreating index:")
             pp.pprint(response)
 
             # index creation can take up to a minute
-            interactive_sleep(60)
+            wait_until(lambda: self._index_ready(index_name), f"index {index_name}", timeout=300)
         except RequestError as e:
             # you can delete the index if its already exists
             # oss_client.indices.delete(index=index_name)
@@ -834,14 +949,7 @@ class KnowledgeBasesForAmazonBedrock:
             ds_id: data source id
         """
         # ensure that the kb is available
-        i_status = ["CREATING", "DELETING", "UPDATING"]
-        while (
-            self.bedrock_agent_client.get_knowledge_base(knowledgeBaseId=kb_id)[
-                "knowledgeBase"
-            ]["status"]
-            in i_status
-        ):
-            time.sleep(10)
+        self.wait_for_knowledge_base(kb_id)
         # Start an ingestion job
         start_job_response = self.bedrock_agent_client.start_ingestion_job(
             knowledgeBaseId=kb_id, dataSourceId=ds_id
@@ -849,16 +957,40 @@ class KnowledgeBasesForAmazonBedrock:
         job = start_job_response["ingestionJob"]
         pp.pprint(job)
         # Get job
-        while job["status"] != "COMPLETE" and job["status"] != "FAILED":
-            get_job_response = self.bedrock_agent_client.get_ingestion_job(
-                knowledgeBaseId=kb_id,
-                dataSourceId=ds_id,
-                ingestionJobId=job["ingestionJobId"],
-            )
-            job = get_job_response["ingestionJob"]
-            interactive_sleep(5)
+        job = wait_until(
+            lambda: self._ingestion_job_finished(kb_id, ds_id, job["ingestionJobId"]),
+            f"ingestion job {job['ingestionJobId']}",
+            timeout=3600,
+        )
         pp.pprint(job)
-        # interactive_sleep(40)
+
+    def wait_for_knowledge_base(self, kb_id):
+        """
+        Wait until the knowledge base is no longer being created, updated or deleted
+        Args:
+            kb_id: knowledge base id
+
+        Returns:
+            the knowledge base details
+        """
+        i_status = ["CREATING", "DELETING", "UPDATING"]
+
+        def kb_available():
+            kb = self.bedrock_agent_client.get_knowledge_base(knowledgeBaseId=kb_id)["knowledgeBase"]
+            return kb if kb["status"] not in i_status else None
+
+        return wait_until(kb_available, f"knowledge base {kb_id}")
+
+    def _ingestion_job_finished(self, kb_id, ds_id, job_id):
+        """
+        The ingestion job once it completed, failed or was stopped, None while it runs
+        """
+        job = self.bedrock_agent_client.get_ingestion_job(
+            knowledgeBaseId=kb_id,
+            dataSourceId=ds_id,
+            ingestionJobId=job_id,
+        )["ingestionJob"]
+        return job if job["status"] in ("COMPLETE", "FAILED", "STOPPED") else None
 
     def get_kb(self, kb_id):
         """
@@ -0,0 +1,31 @@
+from strands import tool
+
+from booking_table import batch_get_bookings
+
+@tool
+def batch_get_booking_details(bookings: list[dict]) -> dict:
+    """Get the details of several bookings at once, e.g. for a group or to reconcile reservations
+    Args:
+        bookings: the bookings to look up, each an object with the booking_id
+            and the restaurant_name handling the reservation
+
+    Returns:
+        booking_details: the bookings found, the booking ids not found and, if
+            DynamoDB could not serve them, the bookings to ask for again
+    """
+    try:
+        items, unprocessed = batch_get_bookings(bookings)
+    except Exception as e:
+        return str(e)
+    found = {(item['booking_id'], item['restaurant_name']) for item in items}
+    unprocessed_keys = {(key['booking_id'], key['restaurant_name']) for key in unprocessed}
+    results = {
+        'bookings': items,
+        'not_found': list(dict.fromkeys(
+            booking['booking_id'] for booking in bookings
+            if (booking['booking_id'], booking['restaurant_name']) not in found | unprocessed_keys
+        )),
+    }
+    if unprocessed:
+        results['unprocessed'] = unprocessed
+    return results
@@ -0,0 +1,109 @@
+"""
+Latency of a booking lookup against a moto DynamoDB and SSM.
+
+Compares building a DynamoDB resource and an SSM client and reading the table name
+parameter on every lookup, as the booking tools used to, with the shared Table
+handle of booking_table. Reports latency per lookup and AWS calls per lookup, and
+the time to look up BULK_BOOKINGS bookings one GetItem at a time and in batches.
+Run from the integration directory (requires moto):
+
+    python -m pytest benchmarks/bench_booking_tools.py
+"""
+
+import os
+import statistics
+import time
+from collections import Counter
+
+import pytest
+
+moto = pytest.importorskip("moto")
+
+import boto3  # noqa: E402
+
+import booking_table  # noqa: E402
+
+from .conftest import REPORT_ROWS  # noqa: E402
+
+LOOKUPS = 200
+KEY = {"booking_id": "00000001", "restaurant_name": "Nonna"}
+BULK_BOOKINGS = 2000
+
+
+def per_call_table():
+    """The table handle as the booking tools built it before booking_table."""
+    dynamodb = boto3.resource('dynamodb')
+    ssm_client = boto3.client('ssm')
+    table_name = ssm_client.get_parameter(Name=booking_table.TABLE_NAME_PARAMETER, WithDecryption=False)
+    return dynamodb.Table(table_name["Parameter"]["Value"])
+
+
+@pytest.fixture(scope="module")
+def aws_calls():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        boto3.setup_default_session()
+        calls = Counter()
+        boto3.DEFAULT_SESSION.events.register("before-call", lambda model, **kwargs: calls.update([model.name]))
+        table = boto3.resource("dynamodb").create_table(
+            TableName="restaurant-assistant-bookings",
+            KeySchema=[
+                {"AttributeName": "booking_id", "KeyType": "HASH"},
+                {"AttributeName": "restaurant_name", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "booking_id", "AttributeType": "S"},
+                {"AttributeName": "restaurant_name", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table.put_item(Item={**KEY, "name": "Anna", "date": "2025-07-01", "hour": "20:00", "num_guests": 2})
+        boto3.client("ssm").put_parameter(Name=booking_table.TABLE_NAME_PARAMETER, Value=table.name, Type="String")
+        booking_table.reset_booking_table()
+        yield calls
+        booking_table.reset_booking_table()
+
+
+@pytest.mark.parametrize("setup", ["per-call", "shared"])
+def test_lookup_latency(aws_calls, setup):
+    get_table = per_call_table if setup == "per-call" else booking_table.get_booking_table
+    get_table().get_item(Key=KEY)
+    aws_calls.clear()
+
+    latencies = []
+    for _ in range(LOOKUPS):
+        started = time.perf_counter()
+        item = get_table().get_item(Key=KEY)["Item"]
+        latencies.append(time.perf_counter() - started)
+
+    REPORT_ROWS["booking lookup"].append({
+        "setup": setup,
+        "lookups": LOOKUPS,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p95_ms": round(statistics.quantiles(latencies, n=100)[94] * 1000, 3),
+        "aws_calls_per_lookup": round(sum(aws_calls.values()) / LOOKUPS, 2),
+    })
+    assert item["name"] == "Anna"
+
+
+@pytest.mark.parametrize("mode", ["get_item", "batch"])
+def test_bulk_lookup(aws_calls, mode):
+    keys = [booking_table.booking_key(f"bulk{idx:06d}", "Nonna") for idx in range(BULK_BOOKINGS)]
+    booking_table.batch_put_bookings([{**key, "name": "Guest", "num_guests": 2} for key in keys])
+    aws_calls.clear()
+
+    started = time.perf_counter()
+    if mode == "batch":
+        items, _ = booking_table.batch_get_bookings(keys)
+    else:
+        table = booking_table.get_booking_table()
+        items = [table.get_item(Key=key)["Item"] for key in keys]
+    elapsed = time.perf_counter() - started
+
+    REPORT_ROWS["bulk booking lookup"].append({
+        "mode": mode,
+        "bookings": BULK_BOOKINGS,
+        "seconds": round(elapsed, 3),
+        "aws_calls": sum(aws_calls.values()),
+    })
+    assert len(items) == BULK_BOOKINGS
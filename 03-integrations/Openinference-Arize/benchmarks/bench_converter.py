@@ -0,0 +1,81 @@
+"""
+Throughput of the offline Strands dump converter.
+
+Writes a synthetic dump of agent traces, in OTLP/JSON lines and in ConsoleSpanExporter
+output, of --dump-megabytes each, converts it with strands_to_openinference_convert
+into an exporter that only counts spans, and reports spans and megabytes per second
+together with the resident memory growth. Run from the integration directory:
+
+    python -m pytest benchmarks/bench_converter.py --dump-megabytes 4096
+"""
+
+import json
+import os
+import time
+
+import pytest
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from strands_to_openinference_convert import convert_dumps, spans_to_otlp_json
+
+from .bench_processor import _resident_bytes
+from .conftest import REPORT_ROWS
+from .synthetic_spans import make_tracer, run_agent_trace
+
+DUMP_FORMATS = ["otlp-json", "console"]
+
+
+class CountingExporter(SpanExporter):
+    def __init__(self):
+        self.spans = 0
+
+    def export(self, spans):
+        self.spans += len(spans)
+        return SpanExportResult.SUCCESS
+
+
+def write_dump(path, dump_format, megabytes, message_count=10, payload_bytes=512):
+    """Repeat one synthetic agent trace under fresh trace ids until the dump reaches the size."""
+    tracer, exporter = make_tracer()
+    run_agent_trace(tracer, 3, message_count, payload_bytes)
+    spans = exporter.get_finished_spans()
+    template_trace_id = format(spans[0].context.trace_id, "032x")
+    if dump_format == "otlp-json":
+        template = json.dumps(spans_to_otlp_json(spans)) + "\n"
+    else:
+        template = "".join(span.to_json() + os.linesep for span in spans)
+
+    target_bytes = megabytes * 1024 * 1024
+    written = traces = 0
+    with open(path, "w") as dump:
+        while written < target_bytes:
+            traces += 1
+            written += dump.write(template.replace(template_trace_id, format(traces, "032x")))
+    return traces * len(spans)
+
+
+@pytest.mark.parametrize("dump_format", DUMP_FORMATS)
+def test_convert_dump(request, tmp_path, dump_format):
+    megabytes = request.config.option.dump_megabytes
+    path = str(tmp_path / f"dump-{dump_format}")
+    spans = write_dump(path, dump_format, megabytes)
+    dump_bytes = os.path.getsize(path)
+
+    exporter = CountingExporter()
+    rss_before = _resident_bytes()
+    started = time.perf_counter()
+    stats = convert_dumps([path], exporter)
+    elapsed = time.perf_counter() - started
+    rss_after = _resident_bytes()
+
+    REPORT_ROWS["offline conversion"].append({
+        "format": dump_format,
+        "dump_mb": round(dump_bytes / 1024 / 1024, 1),
+        "spans": spans,
+        "seconds": round(elapsed, 2),
+        "spans_per_s": round(spans / elapsed),
+        "mb_per_s": round(dump_bytes / 1024 / 1024 / elapsed, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024 / 1024, 1),
+    })
+    assert exporter.spans == stats["spans_written"] == spans
+    assert stats["partial_traces"] == 0
@@ -0,0 +1,238 @@
+"""
+End-to-end tracing overhead of a Strands agent.
+
+Runs a Strands Agent with a scripted stand-in model and the booking tools (against
+a moto DynamoDB) under three setups, and reports agent turn latency percentiles and
+process CPU per turn:
+
+    off             spans are sampled out, nothing is recorded or exported
+    batch-export    BatchSpanProcessor with OTLP/HTTP export to a local receiver
+    openinference   StrandsToOpenInferenceProcessor plus the same batch export
+
+Run from the integration directory (requires strands-agents, moto and
+opentelemetry-exporter-otlp-proto-http):
+
+    python -m pytest benchmarks/bench_end_to_end.py
+"""
+
+import json
+import os
+import statistics
+import time
+
+import pytest
+
+strands = pytest.importorskip("strands")
+moto = pytest.importorskip("moto")
+otlp_http = pytest.importorskip("opentelemetry.exporter.otlp.proto.http.trace_exporter")
+
+import boto3  # noqa: E402
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import BatchSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON, Sampler  # noqa: E402
+from strands import Agent  # noqa: E402
+from strands.models import Model  # noqa: E402
+
+import booking_table as booking_table_module  # noqa: E402
+import create_booking  # noqa: E402
+import delete_booking  # noqa: E402
+import get_booking_details  # noqa: E402
+from otlp_receiver import OtlpReceiver  # noqa: E402
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor  # noqa: E402
+
+from .conftest import REPORT_ROWS  # noqa: E402
+
+SETUPS = ["off", "batch-export", "openinference"]
+SESSION_TURNS = 5
+WARMUP_TURNS = 5
+
+
+class ScriptedModel(Model):
+    """
+    Stand-in model: answers a user message with a create_booking tool call and the
+    tool result with a short confirmation, without any network call. Structured
+    output requests get the same booking, validated into the requested model.
+    """
+
+    def __init__(self):
+        self.config = {"model_id": "scripted"}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        yield {"output": output_model.model_validate(self._booking(len(prompt)))}
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        if any("toolResult" in block for block in messages[-1]["content"]):
+            events = self._text_events("Restaurant Helper here: your table is booked.")
+        else:
+            events = self._tool_use_events(len(messages))
+        for event in events:
+            yield event
+
+    def _booking(self, turn):
+        return {
+            "date": "2025-07-01",
+            "hour": "20:00",
+            "restaurant_name": "Nonna",
+            "guest_name": f"Guest {turn}",
+            "num_guests": 2,
+        }
+
+    def _tool_use_events(self, turn):
+        arguments = self._booking(turn)
+        return [
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"tooluse_{turn}", "name": "create_booking"}}}},
+            {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(arguments)}}}},
+            {"contentBlockStop": {}},
+            {"messageStop": {"stopReason": "tool_use"}},
+            self._metadata(),
+        ]
+
+    def _text_events(self, text):
+        return [
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"delta": {"text": text}}},
+            {"contentBlockStop": {}},
+            {"messageStop": {"stopReason": "end_turn"}},
+            self._metadata(),
+        ]
+
+    def _metadata(self):
+        return {"metadata": {"usage": {"inputTokens": 900, "outputTokens": 60, "totalTokens": 960},
+                             "metrics": {"latencyMs": 0}}}
+
+
+class SwitchableSampler(Sampler):
+    """Sampler that records every span or none, so setups can share the global provider."""
+
+    def __init__(self):
+        self.enabled = False
+
+    def should_sample(self, *args, **kwargs):
+        return (ALWAYS_ON if self.enabled else ALWAYS_OFF).should_sample(*args, **kwargs)
+
+    def get_description(self):
+        return "SwitchableSampler"
+
+
+class SwitchableSpanProcessor(SpanProcessor):
+    """Forwards spans to the processors of the setup being measured."""
+
+    def __init__(self):
+        self.processors = []
+
+    def on_start(self, span, parent_context=None):
+        for processor in self.processors:
+            processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        for processor in self.processors:
+            processor.on_end(span)
+
+    def force_flush(self, timeout_millis=30000):
+        return all(processor.force_flush(timeout_millis) for processor in self.processors)
+
+    def shutdown(self):
+        for processor in self.processors:
+            processor.shutdown()
+
+
+@pytest.fixture(scope="module")
+def booking_table():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        table_name = "restaurant-assistant-bookings"
+        boto3.resource("dynamodb").create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": "booking_id", "KeyType": "HASH"},
+                {"AttributeName": "restaurant_name", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "booking_id", "AttributeType": "S"},
+                {"AttributeName": "restaurant_name", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        boto3.client("ssm").put_parameter(Name="restaurant-assistant-table-name", Value=table_name, Type="String")
+        booking_table_module.reset_booking_table()
+        yield table_name
+        booking_table_module.reset_booking_table()
+
+
+@pytest.fixture(scope="module")
+def tracing():
+    """The global tracer provider, installed once since Strands caches its tracer."""
+    sampler = SwitchableSampler()
+    switch = SwitchableSpanProcessor()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(switch)
+    trace.set_tracer_provider(provider)
+    with OtlpReceiver() as receiver:
+        yield sampler, switch, receiver
+
+
+def run_turns(turns):
+    """Run agent turns in sessions of SESSION_TURNS, returning the latency of each turn."""
+    latencies = []
+    agent = None
+    for turn in range(turns):
+        if turn % SESSION_TURNS == 0:
+            agent = Agent(
+                model=ScriptedModel(),
+                tools=[create_booking, get_booking_details, delete_booking],
+                system_prompt="You are Restaurant Helper, a restaurant assistant.",
+                callback_handler=None,
+            )
+        started = time.perf_counter()
+        agent(f"Book a table for two at Nonna, request {turn}")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+@pytest.mark.parametrize("setup", SETUPS)
+def test_agent_turn_overhead(request, booking_table, tracing, setup):
+    sampler, switch, receiver = tracing
+    turns = request.config.option.e2e_turns
+
+    sampler.enabled = setup != "off"
+    switch.processors = []
+    if setup == "openinference":
+        switch.processors.append(StrandsToOpenInferenceProcessor())
+    if setup != "off":
+        switch.processors.append(BatchSpanProcessor(otlp_http.OTLPSpanExporter(endpoint=receiver.http_endpoint)))
+
+    run_turns(WARMUP_TURNS)
+    switch.force_flush()
+    receiver.reset()
+
+    cpu_before = time.process_time()
+    latencies = run_turns(turns)
+    switch.force_flush()
+    cpu_ms_per_turn = (time.process_time() - cpu_before) * 1000 / turns
+    switch.shutdown()
+    switch.processors = []
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    baseline = next((row for row in REPORT_ROWS["end-to-end overhead"] if row["setup"] == "off"), None)
+    stats = receiver.stats
+    REPORT_ROWS["end-to-end overhead"].append({
+        "setup": setup,
+        "turns": turns,
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+        "cpu_ms_per_turn": round(cpu_ms_per_turn, 2),
+        "cpu_overhead_pct": round(100 * (cpu_ms_per_turn / baseline["cpu_ms_per_turn"] - 1), 1) if baseline else "",
+        "spans_exported": stats["spans"],
+        "bytes_exported": stats["bytes"],
+    })
+    if setup != "off":
+        assert stats["spans"] > 0
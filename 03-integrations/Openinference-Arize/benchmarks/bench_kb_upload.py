@@ -0,0 +1,78 @@
+"""
+Knowledge base document upload against a moto S3.
+
+Generates --kb-documents documents and uploads them one by one with upload_file, as
+upload_directory used to, then with the concurrent upload_directory, then again with
+upload_directory after editing one document. Reports seconds and S3 requests per
+run. moto serves requests in process, so the concurrent speedup against real S3,
+where each request waits on the network, is larger than shown here. Run from the
+integration directory (requires moto and the prereqs dependencies):
+
+    python -m pytest benchmarks/bench_kb_upload.py --kb-documents 5000
+"""
+
+import os
+import time
+from collections import Counter
+
+import pytest
+
+moto = pytest.importorskip("moto")
+pytest.importorskip("opensearchpy")
+pytest.importorskip("retrying")
+
+from prereqs.knowledge_base import KnowledgeBasesForAmazonBedrock  # noqa: E402
+
+from .conftest import REPORT_ROWS  # noqa: E402
+
+RUNS = ["sequential", "concurrent", "one document edited"]
+
+
+def write_documents(directory, count, payload_bytes=4096):
+    line = "Seasonal menu, opening hours and allergens. "
+    for idx in range(count):
+        with open(os.path.join(directory, f"document-{idx:05d}.txt"), "w") as document:
+            document.write((f"Restaurant {idx}. " + line * (payload_bytes // len(line)))[:payload_bytes])
+
+
+@pytest.fixture(scope="module")
+def knowledge_base():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        kb = KnowledgeBasesForAmazonBedrock(suffix="bench")
+        calls = Counter()
+        kb.s3_client.meta.events.register("before-call", lambda model, **kwargs: calls.update([model.name]))
+        yield kb, calls
+
+
+@pytest.mark.parametrize("run", RUNS)
+def test_upload(request, tmp_path_factory, knowledge_base, run):
+    kb, calls = knowledge_base
+    kb_files = str(tmp_path_factory.getbasetemp() / "kb_files")
+    if not os.path.exists(kb_files):
+        os.mkdir(kb_files)
+        write_documents(kb_files, request.config.option.kb_documents)
+    bucket_name = "sequential-upload" if run == "sequential" else "concurrent-upload"
+    kb.create_s3_bucket(bucket_name)
+    if run == "one document edited":
+        with open(os.path.join(kb_files, "document-00000.txt"), "a") as document:
+            document.write("Closed on Mondays.")
+    calls.clear()
+
+    started = time.perf_counter()
+    if run == "sequential":
+        for file in os.listdir(kb_files):
+            kb.s3_client.upload_file(os.path.join(kb_files, file), bucket_name, file)
+        uploaded = os.listdir(kb_files)
+    else:
+        uploaded = kb.upload_directory(kb_files, bucket_name)
+    elapsed = time.perf_counter() - started
+
+    REPORT_ROWS["knowledge base upload"].append({
+        "run": run,
+        "documents": len(os.listdir(kb_files)),
+        "uploaded": len(uploaded),
+        "seconds": round(elapsed, 2),
+        "s3_requests": sum(calls.values()),
+    })
+    assert len(uploaded) == (1 if run == "one document edited" else len(os.listdir(kb_files)))
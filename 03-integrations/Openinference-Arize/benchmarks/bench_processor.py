@@ -0,0 +1,229 @@
+"""
+Benchmarks for StrandsToOpenInferenceProcessor.
+
+Run from the integration directory (requires pytest-benchmark):
+
+    python -m pytest benchmarks/bench_processor.py
+
+Compare against the shipped baseline:
+
+    python -m pytest benchmarks/bench_processor.py \\
+        --benchmark-storage=benchmarks/baselines --benchmark-compare=0001
+"""
+
+import json
+import os
+import tracemalloc
+import uuid
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor
+
+from .conftest import REPORT_ROWS
+from .synthetic_spans import (
+    SPAN_KINDS,
+    attribute_bytes,
+    make_span,
+    make_tracer,
+    run_agent_trace,
+    run_conversation_trace,
+)
+
+_bare_tracer = TracerProvider().get_tracer("benchmarks")
+
+
+def _ended_span(name, attributes):
+    """An ended SDK span that has not been seen by any processor yet."""
+    span = _bare_tracer.start_span(name, attributes=attributes)
+    span.end()
+    return span
+
+
+def _resident_bytes() -> int:
+    """Current RSS on Linux, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+@pytest.mark.parametrize("kind", SPAN_KINDS)
+def test_on_end(benchmark, request, kind, message_count, payload_bytes):
+    processor = StrandsToOpenInferenceProcessor()
+    name, attributes = make_span(kind, message_count, payload_bytes)
+
+    def setup():
+        span = _ended_span(name, attributes)
+        processor.on_start(span)
+        return (span,), {}
+
+    # Allocation profile and attribute sizes from a single untimed run
+    (span,), _ = setup()
+    bytes_in = attribute_bytes(span.attributes)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        processor.on_end(span)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    bytes_out = attribute_bytes(span.attributes)
+
+    benchmark.extra_info.update(alloc_peak_bytes=peak - before, attr_bytes_in=bytes_in, attr_bytes_out=bytes_out)
+    benchmark.pedantic(processor.on_end, setup=setup, rounds=request.config.option.span_rounds)
+
+    REPORT_ROWS["span transform"].append({
+        "kind": kind,
+        "messages": message_count,
+        "payload": payload_bytes,
+        "mean_us": round(benchmark.stats.stats.mean * 1e6, 1) if benchmark.stats else "",
+        "alloc_peak_bytes": peak - before,
+        "attr_bytes_in": bytes_in,
+        "attr_bytes_out": bytes_out,
+    })
+
+
+@pytest.mark.parametrize("kind", SPAN_KINDS)
+def test_attribute_rewrite(benchmark, request, kind, message_count, payload_bytes):
+    processor = StrandsToOpenInferenceProcessor()
+    name, attributes = make_span(kind, message_count, payload_bytes)
+
+    def setup():
+        span = _ended_span(name, attributes)
+        transformed = processor._transform_span(span, span.get_span_context().span_id, None)
+        return (span, transformed), {}
+
+    # Allocations of the in-place rewrite alone, separate from the transform
+    (span, transformed), _ = setup()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        processor._replace_attributes(span, transformed)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info.update(alloc_peak_bytes=peak - before, alloc_retained_bytes=after - before)
+    benchmark.pedantic(processor._replace_attributes, setup=setup, rounds=request.config.option.span_rounds)
+
+    REPORT_ROWS["attribute rewrite"].append({
+        "kind": kind,
+        "messages": message_count,
+        "payload": payload_bytes,
+        "mean_us": round(benchmark.stats.stats.mean * 1e6, 1) if benchmark.stats else "",
+        "alloc_peak_bytes": peak - before,
+        "alloc_retained_bytes": after - before,
+    })
+
+
+@pytest.mark.parametrize("kind", ["LLM", "CHAIN"])
+def test_map_messages(benchmark, request, kind, message_count, payload_bytes):
+    processor = StrandsToOpenInferenceProcessor()
+    _, attributes = make_span(kind, message_count, payload_bytes)
+    messages = json.loads(attributes["gen_ai.prompt"])
+
+    benchmark.pedantic(
+        processor._map_messages, args=(messages, {}, True), rounds=request.config.option.span_rounds
+    )
+
+
+def test_determine_span_kind(benchmark, request):
+    processor = StrandsToOpenInferenceProcessor()
+    # Span names of a five-cycle agent trace, each cycle named after a fresh uuid
+    names = ["invoke_agent Booking Assistant"]
+    for _ in range(5):
+        names += [f"Cycle {uuid.uuid4()}", "Model invoke", "Tool: get_booking_details"]
+    spans = [_ended_span(name, {}) for name in names]
+    attrs = {"gen_ai.agent.name": "Booking Assistant"}
+
+    def run():
+        for span in spans:
+            processor._determine_span_kind(span, attrs)
+
+    benchmark.pedantic(run, rounds=request.config.option.span_rounds, iterations=100)
+
+    REPORT_ROWS["span kind"].append({
+        "spans": len(spans),
+        "ns_per_span": round(benchmark.stats.stats.mean * 1e9 / len(spans), 1) if benchmark.stats else "",
+    })
+
+
+@pytest.mark.parametrize("with_processor", [False, True], ids=["export-only", "processor"])
+def test_agent_trace(benchmark, request, with_processor, message_count, payload_bytes):
+    processors = [StrandsToOpenInferenceProcessor()] if with_processor else []
+    tracer, exporter = make_tracer(*processors)
+
+    benchmark.pedantic(
+        run_agent_trace,
+        args=(tracer, 3, message_count, payload_bytes),
+        setup=exporter.clear,
+        rounds=max(1, request.config.option.span_rounds // 5),
+    )
+    benchmark.extra_info["attr_bytes_exported"] = sum(
+        attribute_bytes(span.attributes) for span in exporter.get_finished_spans()
+    )
+
+
+@pytest.mark.parametrize("delta_messages", [False, True], ids=["full", "delta"])
+def test_conversation_trace_bytes(benchmark, request, delta_messages, payload_bytes):
+    turns = 20
+    processor = StrandsToOpenInferenceProcessor(delta_messages=delta_messages)
+    tracer, exporter = make_tracer(processor)
+
+    benchmark.pedantic(
+        run_conversation_trace,
+        args=(tracer, turns, payload_bytes),
+        setup=exporter.clear,
+        rounds=max(1, request.config.option.span_rounds // 5),
+    )
+    exported_bytes = sum(attribute_bytes(span.attributes) for span in exporter.get_finished_spans())
+    benchmark.extra_info["attr_bytes_exported"] = exported_bytes
+    REPORT_ROWS["conversation delta encoding"].append({
+        "mode": "delta" if delta_messages else "full",
+        "turns": turns,
+        "payload": payload_bytes,
+        "attr_bytes_exported": exported_bytes,
+    })
+
+
+def test_bookkeeping_soak(request):
+    processor = StrandsToOpenInferenceProcessor()
+    tracer, exporter = make_tracer(processor)
+    total_spans = request.config.option.soak_spans
+    spans_per_trace = 7
+
+    def run(traces):
+        for _ in range(traces):
+            with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"}):
+                for cycle in range(3):
+                    with tracer.start_as_current_span(f"Cycle {cycle}"):
+                        with tracer.start_as_current_span("Model invoke", attributes={"gen_ai.prompt": "hi"}):
+                            pass
+            exporter.clear()
+
+    run(1000)
+    rss_before = _resident_bytes()
+    run(total_spans // spans_per_trace)
+    rss_after = _resident_bytes()
+    tracemalloc.start()
+    try:
+        run(total_spans // spans_per_trace // 10)
+        traced_after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    REPORT_ROWS["bookkeeping soak"].append({
+        "spans": total_spans,
+        "traced_bytes_retained": traced_after,
+        "rss_growth_bytes": rss_after - rss_before,
+        "tracked_spans": len(processor.span_hierarchy),
+    })
+    assert len(processor.span_hierarchy) == 0
+    assert len(processor.processed_spans) == 0
+    assert traced_after < 1024 * 1024
+    assert rss_after - rss_before < request.config.option.soak_max_rss_growth_mb * 1024 * 1024
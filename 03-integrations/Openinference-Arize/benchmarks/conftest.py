@@ -0,0 +1,56 @@
+"""
+Options and reporting for the OpenInference processor benchmarks.
+"""
+
+REPORT_ROWS = {
+    "span transform": [],
+    "attribute rewrite": [],
+    "span kind": [],
+    "bookkeeping soak": [],
+    "conversation delta encoding": [],
+    "end-to-end overhead": [],
+    "offline conversion": [],
+    "booking lookup": [],
+    "bulk booking lookup": [],
+    "knowledge base upload": [],
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("span benchmarks")
+    group.addoption("--span-message-counts", default="1,10,50",
+                    help="Comma separated message (or tool) counts per synthetic span")
+    group.addoption("--span-payload-bytes", default="256,4096",
+                    help="Comma separated payload sizes in bytes per message, argument or result")
+    group.addoption("--span-rounds", type=int, default=50,
+                    help="Timed rounds per benchmark, each on a fresh span")
+    group.addoption("--soak-spans", type=int, default=100000,
+                    help="Number of spans pushed through the processor by the soak test")
+    group.addoption("--soak-max-rss-growth-mb", type=float, default=8,
+                    help="Resident memory growth over the soak test above which it fails")
+    group.addoption("--e2e-turns", type=int, default=200,
+                    help="Measured agent turns per setup in the end-to-end benchmark")
+    group.addoption("--dump-megabytes", type=int, default=64,
+                    help="Size of each synthetic span dump converted by the converter benchmark")
+    group.addoption("--kb-documents", type=int, default=2000,
+                    help="Number of generated documents uploaded by the knowledge base upload benchmark")
+
+
+def pytest_generate_tests(metafunc):
+    options = metafunc.config.option
+    if "message_count" in metafunc.fixturenames:
+        metafunc.parametrize("message_count", [int(v) for v in options.span_message_counts.split(",")])
+    if "payload_bytes" in metafunc.fixturenames:
+        metafunc.parametrize("payload_bytes", [int(v) for v in options.span_payload_bytes.split(",")])
+
+
+def pytest_terminal_summary(terminalreporter):
+    for title, rows in REPORT_ROWS.items():
+        if not rows:
+            continue
+        columns = list(rows[0])
+        widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+        terminalreporter.write_sep("-", f"{title} report")
+        terminalreporter.write_line("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            terminalreporter.write_line("  ".join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
@@ -0,0 +1,157 @@
+"""
+Synthetic Strands spans for benchmarking the OpenInference processor.
+
+Each builder returns the span name and attributes that Strands emits for one of the
+span kinds recognized by StrandsToOpenInferenceProcessor._determine_span_kind.
+"""
+
+import json
+import random
+import string
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+SPAN_KINDS = ["LLM", "TOOL", "CHAIN", "AGENT"]
+
+
+def make_text(payload_bytes: int, seed: int = 0) -> str:
+    """Deterministic pseudo-random text of the given size."""
+    rng = random.Random(seed)
+    return "".join(rng.choice(string.ascii_letters + " ") for _ in range(payload_bytes))
+
+
+def make_messages(message_count: int, payload_bytes: int) -> list:
+    """A Strands conversation alternating user and assistant turns, with tool use."""
+    messages = []
+    for idx in range(message_count):
+        message = {
+            "role": "user" if idx % 2 == 0 else "assistant",
+            "content": [{"text": make_text(payload_bytes, seed=idx)}],
+        }
+        if idx % 4 == 1:
+            message["toolUse"] = [{
+                "toolUseId": f"tooluse_{idx}",
+                "name": "get_booking_details",
+                "input": {"booking_id": f"{idx:08d}", "restaurant_name": "Nonna"},
+            }]
+        messages.append(message)
+    return messages
+
+
+def make_tools(tool_count: int) -> list:
+    """Tool definitions as carried on the agent span."""
+    return [
+        {
+            "name": f"tool_{idx}",
+            "description": make_text(200, seed=idx),
+            "input_schema": {
+                "type": "object",
+                "properties": {"booking_id": {"type": "string"}, "restaurant_name": {"type": "string"}},
+                "required": ["booking_id", "restaurant_name"],
+            },
+        }
+        for idx in range(tool_count)
+    ]
+
+
+@lru_cache(maxsize=None)
+def make_span(kind: str, message_count: int, payload_bytes: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the name and attributes of a synthetic Strands span.
+
+    Args:
+        kind: One of SPAN_KINDS
+        message_count: Number of messages in prompts (LLM, CHAIN) or tools (AGENT)
+        payload_bytes: Size of each message text, tool argument or tool result
+
+    Results are cached, so callers must not mutate the returned attributes.
+    """
+    if kind == "LLM":
+        return "Model invoke", {
+            "gen_ai.system": "strands-agents",
+            "gen_ai.request.model": "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+            "gen_ai.prompt": json.dumps(make_messages(message_count, payload_bytes)),
+            "gen_ai.completion": json.dumps([{"text": make_text(payload_bytes, seed=-1)}]),
+            "gen_ai.usage.prompt_tokens": message_count * payload_bytes // 4,
+            "gen_ai.usage.completion_tokens": payload_bytes // 4,
+            "gen_ai.usage.total_tokens": (message_count + 1) * payload_bytes // 4,
+        }
+    if kind == "TOOL":
+        return "Tool: get_booking_details", {
+            "gen_ai.system": "strands-agents",
+            "tool.name": "get_booking_details",
+            "tool.id": "tooluse_0",
+            "tool.parameters": json.dumps({"booking_id": "00000001", "notes": make_text(payload_bytes)}),
+            "tool.result": json.dumps({"status": "success", "content": [{"text": make_text(payload_bytes, seed=1)}]}),
+            "tool.status": "success",
+        }
+    if kind == "CHAIN":
+        return "Cycle 0", {
+            "gen_ai.system": "strands-agents",
+            "event_loop.cycle_id": "0",
+            "gen_ai.prompt": json.dumps(make_messages(message_count, payload_bytes)),
+            "gen_ai.completion": json.dumps([{"text": make_text(payload_bytes, seed=-1)}]),
+        }
+    if kind == "AGENT":
+        return "invoke_agent", {
+            "gen_ai.system": "strands-agents",
+            "gen_ai.agent.name": "Strands Agents",
+            "gen_ai.request.model": "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+            "gen_ai.prompt": make_text(payload_bytes),
+            "gen_ai.completion": make_text(payload_bytes, seed=1),
+            "gen_ai.agent.tools": json.dumps(make_tools(message_count)),
+            "gen_ai.usage.prompt_tokens": 1000,
+            "gen_ai.usage.completion_tokens": 200,
+            "gen_ai.usage.total_tokens": 1200,
+        }
+    raise ValueError(f"Unknown span kind: {kind}")
+
+
+def make_tracer(*processors):
+    """Tracer whose spans go through the given processors into an in-memory exporter."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    for processor in processors:
+        provider.add_span_processor(processor)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider.get_tracer("benchmarks"), exporter
+
+
+def run_agent_trace(tracer, cycles: int, message_count: int, payload_bytes: int):
+    """Emit one agent trace: an agent span with cycles, each holding an LLM and a tool span."""
+    agent_name, agent_attrs = make_span("AGENT", message_count, payload_bytes)
+    with tracer.start_as_current_span(agent_name, attributes=agent_attrs):
+        for cycle in range(cycles):
+            _, cycle_attrs = make_span("CHAIN", message_count, payload_bytes)
+            with tracer.start_as_current_span(f"Cycle {cycle}", attributes=cycle_attrs):
+                for kind in ["LLM", "TOOL"]:
+                    span_name, span_attrs = make_span(kind, message_count, payload_bytes)
+                    with tracer.start_as_current_span(span_name, attributes=span_attrs):
+                        pass
+
+
+def run_conversation_trace(tracer, turns: int, payload_bytes: int):
+    """Emit an agent trace whose Model invoke spans carry the growing conversation."""
+    messages = make_messages(2 * turns, payload_bytes)
+    with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "Strands Agents"}):
+        for turn in range(turns):
+            with tracer.start_as_current_span(f"Cycle {turn}"):
+                with tracer.start_as_current_span("Model invoke", attributes={
+                    "gen_ai.request.model": "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+                    "gen_ai.prompt": json.dumps(messages[:2 * turn + 1]),
+                    "gen_ai.completion": json.dumps([messages[2 * turn + 1]]),
+                }):
+                    pass
+
+
+def attribute_bytes(attributes) -> int:
+    """Approximate encoded size of span attributes: key plus value text per entry."""
+    total = 0
+    for key, value in attributes.items():
+        total += len(key.encode())
+        total += len(value.encode()) if isinstance(value, str) else len(str(value))
+    return total
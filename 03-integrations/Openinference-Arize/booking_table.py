@@ -0,0 +1,164 @@
+"""
+Shared DynamoDB access for the restaurant booking tools
+
+The booking table name lives in the SSM parameter store. Instead of creating a
+DynamoDB resource and an SSM client and reading the parameter on every tool call,
+the tools share a lazily created Table handle and a table name cached for
+TABLE_NAME_TTL_SECONDS, so a tool call costs a single DynamoDB request.
+
+boto3 resources are not thread safe and Strands can run tools concurrently, so
+each thread gets its own resource, created on its first tool call.
+
+batch_get_bookings and batch_put_bookings serve the batch tools. They split the
+keys or items into BatchGetItem and BatchWriteItem requests of at most 100 and 25,
+and resend what DynamoDB returns as unprocessed with exponential backoff.
+iter_bookings_by_date queries the restaurant and date index created by
+prereqs/dynamodb.py, so listing a day's bookings reads only those bookings.
+"""
+
+import random
+import threading
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+KB_NAME = 'restaurant-assistant'
+TABLE_NAME_PARAMETER = f'{KB_NAME}-table-name'
+TABLE_NAME_TTL_SECONDS = 300
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+BATCH_MAX_ATTEMPTS = 8
+BATCH_BACKOFF_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 2.0
+
+DATE_INDEX_NAME = 'restaurant-date-index'
+DATE_QUERY_FIELDS = ('booking_id', 'name', 'hour', 'num_guests')
+DATE_QUERY_PAGE_SIZE = 100
+
+_lock = threading.Lock()
+_ssm_client = None
+_table_name = None
+_table_name_expires_at = 0.0
+_generation = 0
+_local = threading.local()
+
+
+def get_table_name() -> str:
+    """The booking table name from the parameter store, cached for TABLE_NAME_TTL_SECONDS."""
+    global _ssm_client, _table_name, _table_name_expires_at
+    with _lock:
+        if _table_name is None or time.monotonic() >= _table_name_expires_at:
+            if _ssm_client is None:
+                _ssm_client = boto3.client('ssm')
+            parameter = _ssm_client.get_parameter(Name=TABLE_NAME_PARAMETER, WithDecryption=False)
+            _table_name = parameter["Parameter"]["Value"]
+            _table_name_expires_at = time.monotonic() + TABLE_NAME_TTL_SECONDS
+        return _table_name
+
+
+def get_booking_table():
+    """The booking Table of the calling thread, rebuilt only when the table name changes."""
+    table_name = get_table_name()
+    if getattr(_local, 'generation', None) != _generation:
+        _local.dynamodb = boto3.resource('dynamodb')
+        _local.table = None
+        _local.generation = _generation
+    table = _local.table
+    if table is None or table.name != table_name:
+        table = _local.table = _local.dynamodb.Table(table_name)
+    return table
+
+
+def reset_booking_table():
+    """Forget the cached clients and table name, e.g. after switching AWS account or region."""
+    global _ssm_client, _table_name, _table_name_expires_at, _generation
+    with _lock:
+        _ssm_client = None
+        _table_name = None
+        _table_name_expires_at = 0.0
+        _generation += 1
+
+
+def booking_key(booking_id, restaurant_name) -> dict:
+    return {'booking_id': booking_id, 'restaurant_name': restaurant_name}
+
+
+def _backoff(attempt):
+    """Sleep before resending unprocessed requests, with full jitter."""
+    time.sleep(random.uniform(0, min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_SECONDS * 2 ** attempt)))
+
+
+def batch_get_bookings(keys):
+    """
+    Fetch bookings with BatchGetItem, BATCH_GET_LIMIT keys per request.
+
+    Duplicate keys are requested once. Returns the items found and the keys still
+    unprocessed after BATCH_MAX_ATTEMPTS; keys in neither list do not exist.
+    """
+    table = get_booking_table()
+    unique_keys = list(dict.fromkeys((key['booking_id'], key['restaurant_name']) for key in keys))
+    items, unprocessed = [], []
+    for start in range(0, len(unique_keys), BATCH_GET_LIMIT):
+        pending = [booking_key(*key) for key in unique_keys[start:start + BATCH_GET_LIMIT]]
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+            response = _local.dynamodb.batch_get_item(RequestItems={table.name: {'Keys': pending}})
+            items.extend(response['Responses'].get(table.name, []))
+            pending = response.get('UnprocessedKeys', {}).get(table.name, {}).get('Keys', [])
+            if not pending:
+                break
+        unprocessed.extend(pending)
+    return items, unprocessed
+
+
+def batch_put_bookings(items):
+    """
+    Write bookings with BatchWriteItem, BATCH_WRITE_LIMIT items per request.
+
+    Of several items with the same key only the last is written, as DynamoDB rejects
+    duplicate keys within a batch. Returns the items still unprocessed after
+    BATCH_MAX_ATTEMPTS.
+    """
+    table = get_booking_table()
+    unique_items = list({(item['booking_id'], item['restaurant_name']): item for item in items}.values())
+    unprocessed = []
+    for start in range(0, len(unique_items), BATCH_WRITE_LIMIT):
+        pending = [{'PutRequest': {'Item': item}} for item in unique_items[start:start + BATCH_WRITE_LIMIT]]
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+            response = _local.dynamodb.batch_write_item(RequestItems={table.name: pending})
+            pending = response.get('UnprocessedItems', {}).get(table.name, [])
+            if not pending:
+                break
+        unprocessed.extend(request['PutRequest']['Item'] for request in pending)
+    return unprocessed
+
+
+def iter_bookings_by_date(restaurant_name, date, after_booking_id=None, page_size=DATE_QUERY_PAGE_SIZE):
+    """
+    Yield the bookings at restaurant_name on date, with only DATE_QUERY_FIELDS.
+
+    Queries DATE_INDEX_NAME page_size bookings at a time. Pages are read as the
+    generator is consumed, so stopping early stops reading. after_booking_id
+    resumes after that booking of an earlier listing.
+    """
+    table = get_booking_table()
+    query = {
+        'IndexName': DATE_INDEX_NAME,
+        'KeyConditionExpression': Key('restaurant_name').eq(restaurant_name) & Key('date').eq(date),
+        'ProjectionExpression': ', '.join(f'#{field}' for field in DATE_QUERY_FIELDS),
+        'ExpressionAttributeNames': {f'#{field}': field for field in DATE_QUERY_FIELDS},
+        'Limit': page_size,
+    }
+    if after_booking_id:
+        query['ExclusiveStartKey'] = {**booking_key(after_booking_id, restaurant_name), 'date': date}
+    while True:
+        response = table.query(**query)
+        yield from response['Items']
+        if 'LastEvaluatedKey' not in response:
+            return
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -1,5 +1,6 @@
 from strands import tool
-import boto3 
+
+from booking_table import get_booking_table
 
 @tool
 def get_booking_details(booking_id:str, restaurant_name:str) -> dict:
@@ -11,14 +12,7 @@ def get_booking_details(booking_id:str, restaurant_name:str) -> dict:
     Returns:
         booking_details: the details of the booking in JSON format
     """
-    kb_name = 'restaurant-assistant'
-    dynamodb = boto3.resource('dynamodb')
-    smm_client = boto3.client('ssm')
-    table_name = smm_client.get_parameter(
-        Name=f'{kb_name}-table-name',
-        WithDecryption=False
-    )
-    table = dynamodb.Table(table_name["Parameter"]["Value"])
+    table = get_booking_table()
     try:
         response = table.get_item(
             Key={
@@ -0,0 +1,262 @@
+"""
+Local stand-in for an OTLP trace receiver
+
+This module provides a small OTLP/HTTP receiver, plus an OTLP/gRPC one when grpcio
+is installed, that accept trace exports and only count requests, spans and bytes.
+It can be made slow or unavailable, to exercise exporters and benchmark tracing
+overhead without sending data to Arize.
+
+    python otlp_receiver.py --http-port 4318 --grpc-port 4317
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+try:
+    import grpc
+except ImportError:
+    grpc = None
+
+logger = logging.getLogger(__name__)
+
+TRACES_PATH = "/v1/traces"
+
+
+def iter_fields(data: bytes) -> Iterator[Tuple[int, int, Union[int, bytes]]]:
+    """
+    Walk the top-level fields of a protobuf message, yielding (field number, wire
+    type, value): the integer of varint fields, the raw little-endian bytes of
+    fixed64 and fixed32 fields and the payload of length-delimited fields.
+    """
+    pos, end = 0, len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field_number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+            yield field_number, wire_type, value
+        elif wire_type == 1:
+            yield field_number, wire_type, data[pos:pos + 8]
+            pos += 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            yield field_number, wire_type, data[pos:pos + length]
+            pos += length
+        elif wire_type == 5:
+            yield field_number, wire_type, data[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type: {wire_type}")
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def count_spans_protobuf(data: bytes) -> int:
+    """
+    Count the spans of a serialized ExportTraceServiceRequest without the generated
+    protobuf classes: request.resource_spans (1) -> scope_spans (2) -> spans (2).
+    """
+    count = 0
+    for field, wire_type, resource_spans in iter_fields(data):
+        if field != 1 or wire_type != 2:
+            continue
+        for field, wire_type, scope_spans in iter_fields(resource_spans):
+            if field != 2 or wire_type != 2:
+                continue
+            count += sum(1 for field, wire_type, _ in iter_fields(scope_spans) if field == 2 and wire_type == 2)
+    return count
+
+
+def count_spans_json(data: bytes) -> int:
+    """Count the spans of an OTLP/JSON trace export request."""
+    request = json.loads(data)
+    return sum(
+        len(scope_spans.get("spans", []))
+        for resource_spans in request.get("resourceSpans", [])
+        for scope_spans in resource_spans.get("scopeSpans", [])
+    )
+
+
+class OtlpReceiver:
+    """
+    OTLP trace receiver counting what it is sent. Set delay_seconds to slow every
+    response down, and available to False to reject exports as unavailable.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        http_port: Optional[int] = 0,
+        grpc_port: Optional[int] = None,
+        delay_seconds: float = 0.0,
+    ):
+        """
+        Initialize the receiver.
+
+        Args:
+            host: Interface to listen on
+            http_port: Port of the OTLP/HTTP endpoint, 0 for any free port, None to
+                disable it
+            grpc_port: Port of the OTLP/gRPC endpoint, 0 for any free port, None to
+                disable it. Requires grpcio
+            delay_seconds: Time each export is held before it is answered
+        """
+        if grpc_port is not None and grpc is None:
+            raise ImportError("grpcio is required for the OTLP/gRPC receiver")
+        self.host = host
+        self.http_port = http_port
+        self.grpc_port = grpc_port
+        self.delay_seconds = delay_seconds
+        self.available = True
+        self._lock = threading.Lock()
+        self._http_server = None
+        self._grpc_server = None
+        self.reset()
+
+    def reset(self):
+        """Zero the counters."""
+        with self._lock:
+            self.requests = 0
+            self.rejected = 0
+            self.spans = 0
+            self.bytes = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "rejected": self.rejected, "spans": self.spans, "bytes": self.bytes}
+
+    @property
+    def http_endpoint(self) -> str:
+        return f"http://{self.host}:{self.http_port}{TRACES_PATH}"
+
+    @property
+    def grpc_endpoint(self) -> str:
+        return f"{self.host}:{self.grpc_port}"
+
+    def start(self) -> "OtlpReceiver":
+        if self.http_port is not None:
+            self._http_server = ThreadingHTTPServer((self.host, self.http_port), self._http_handler())
+            self._http_server.daemon_threads = True
+            self.http_port = self._http_server.server_address[1]
+            threading.Thread(target=self._http_server.serve_forever, name="OtlpReceiverHttp", daemon=True).start()
+        if self.grpc_port is not None:
+            self._grpc_server = grpc.server(ThreadPoolExecutor(max_workers=8))
+            self._grpc_server.add_generic_rpc_handlers((self._grpc_handler(),))
+            self.grpc_port = self._grpc_server.add_insecure_port(f"{self.host}:{self.grpc_port}")
+            self._grpc_server.start()
+        return self
+
+    def stop(self):
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+        if self._grpc_server is not None:
+            self._grpc_server.stop(grace=None)
+            self._grpc_server = None
+
+    def __enter__(self) -> "OtlpReceiver":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _receive(self, body: bytes, wire_bytes: int, is_json: bool) -> bool:
+        """Count an export. Returns False when it is rejected as unavailable."""
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        if not self.available:
+            with self._lock:
+                self.rejected += 1
+            return False
+        try:
+            spans = count_spans_json(body) if is_json else count_spans_protobuf(body)
+        except (ValueError, IndexError):
+            logger.warning("Could not count spans of a %d byte export", len(body))
+            spans = 0
+        with self._lock:
+            self.requests += 1
+            self.spans += spans
+            self.bytes += wire_bytes
+        return True
+
+    def _http_handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != TRACES_PATH:
+                    self.send_error(404)
+                    return
+                wire_bytes = len(body)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                is_json = self.headers.get("Content-Type", "").startswith("application/json")
+                if not receiver._receive(body, wire_bytes, is_json):
+                    self.send_error(503)
+                    return
+                response = b"{}" if is_json else b""
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json" if is_json else "application/x-protobuf")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+    def _grpc_handler(self):
+        def export(request: bytes, context) -> bytes:
+            if not self._receive(request, len(request), is_json=False):
+                context.abort(grpc.StatusCode.UNAVAILABLE, "receiver unavailable")
+            return b""
+
+        return grpc.method_handlers_generic_handler(
+            "opentelemetry.proto.collector.trace.v1.TraceService",
+            {"Export": grpc.unary_unary_rpc_method_handler(export)},
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OTLP trace receiver counting spans and bytes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=4318)
+    parser.add_argument("--grpc-port", type=int, default=None)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each export is held before it is answered")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with OtlpReceiver(args.host, args.http_port, args.grpc_port, args.delay) as receiver:
+        print(f"OTLP/HTTP on {receiver.http_endpoint}")
+        if args.grpc_port is not None:
+            print(f"OTLP/gRPC on {receiver.grpc_endpoint}")
+        try:
+            while True:
+                time.sleep(args.report_interval)
+                print(receiver.stats)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import boto3
 import os
+import time
 from boto3.session import Session
 import yaml
 import argparse
@@ -17,7 +18,8 @@ def read_yaml_file(file_path):
 class AmazonDynamoDB:
     """
     Support class that allows for:
-        - Creation of a DynamoDB table and a parameter in parameter store with the table's name
+        - Creation of a DynamoDB table, optionally with a global secondary index, and a parameter
+          in parameter store with the table's name
         - Deletion of the table and its parameter
     """
 
@@ -32,7 +34,8 @@ class AmazonDynamoDB:
         self._smm_client = boto3.client('ssm')
         print(self._dynamodb_client, self._dynamodb_resource)
 
-    def create_dynamodb(self, kb_name: str, table_name: str, pk_item: str, sk_item: str):
+    def create_dynamodb(self, kb_name: str, table_name: str, pk_item: str, sk_item: str,
+                        index_name: str = None, index_sk_item: str = None, index_attributes: list = None):
         """
         Create a dynamoDB table for handling the restaurant reservations and stores table name
         in parameter store
@@ -41,7 +44,20 @@ class AmazonDynamoDB:
             table_name: table name
             pk_item: table primary key
             sk_item: table secondary key
+            index_name: name of a global secondary index keyed by sk_item and index_sk_item,
+                added to the table if it already exists. No index when None
+            index_sk_item: index sort key
+            index_attributes: non key attributes projected into the index, all when None
         """
+        attribute_definitions = [
+            {"AttributeName": pk_item, "AttributeType": "S"},
+            {"AttributeName": sk_item, "AttributeType": "S"},
+        ]
+        global_secondary_indexes = []
+        if index_name:
+            attribute_definitions.append({"AttributeName": index_sk_item, "AttributeType": "S"})
+            global_secondary_indexes.append(self._index_definition(index_name, sk_item, index_sk_item,
+                                                                   index_attributes))
         try:
             table = self._dynamodb_resource.create_table(
                 TableName=table_name,
@@ -49,11 +65,9 @@ class AmazonDynamoDB:
                     {"AttributeName": pk_item, "KeyType": "HASH"},
                     {"AttributeName": sk_item, "KeyType": "RANGE"},
                 ],
-                AttributeDefinitions=[
-                    {"AttributeName": pk_item, "AttributeType": "S"},
-                    {"AttributeName": sk_item, "AttributeType": "S"},
-                ],
+                AttributeDefinitions=attribute_definitions,
                 BillingMode="PAY_PER_REQUEST",  # Use on-demand capacity mode
+                **({"GlobalSecondaryIndexes": global_secondary_indexes} if global_secondary_indexes else {}),
             )
 
             # Wait for the table to be created
@@ -69,6 +83,8 @@ class AmazonDynamoDB:
             )
         except self._dynamodb_client.exceptions.ResourceInUseException:
             print(f"Table {table_name} already exists, skipping table creation step")
+            if global_secondary_indexes:
+                self._add_index(table_name, attribute_definitions, global_secondary_indexes[0])
             self._smm_client.put_parameter(
                 Name=f'{kb_name}-table-name',
                 Description=f'{kb_name} table name',
@@ -77,6 +93,48 @@ class AmazonDynamoDB:
                 Overwrite=True
             )
 
+    @staticmethod
+    def _index_definition(index_name, pk_item, sk_item, attributes):
+        """
+        Global secondary index definition, projecting only the given non key attributes if any
+        """
+        if attributes:
+            projection = {"ProjectionType": "INCLUDE", "NonKeyAttributes": list(attributes)}
+        else:
+            projection = {"ProjectionType": "ALL"}
+        return {
+            "IndexName": index_name,
+            "KeySchema": [
+                {"AttributeName": pk_item, "KeyType": "HASH"},
+                {"AttributeName": sk_item, "KeyType": "RANGE"},
+            ],
+            "Projection": projection,
+        }
+
+    def _add_index(self, table_name, attribute_definitions, index):
+        """
+        Add a global secondary index to an existing table, unless present, and wait until it is active
+        """
+        description = self._dynamodb_client.describe_table(TableName=table_name)["Table"]
+        if any(existing["IndexName"] == index["IndexName"]
+               for existing in description.get("GlobalSecondaryIndexes", [])):
+            print(f"Index {index['IndexName']} already exists, skipping index creation step")
+            return
+        print(f"Adding index {index['IndexName']} to table {table_name}...")
+        self._dynamodb_client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=attribute_definitions,
+            GlobalSecondaryIndexUpdates=[{"Create": index}],
+        )
+        while True:
+            description = self._dynamodb_client.describe_table(TableName=table_name)["Table"]
+            status = next(existing["IndexStatus"] for existing in description["GlobalSecondaryIndexes"]
+                          if existing["IndexName"] == index["IndexName"])
+            if status == "ACTIVE":
+                break
+            time.sleep(10)
+        print(f"Index {index['IndexName']} added successfully!")
+
     def delete_dynamodb_table(self, kb_name, table_name):
         """
         Delete the dynamoDB table and its parameter in parameter store
@@ -118,6 +176,9 @@ if __name__ == '__main__':
             data['table_name'],
             data['pk_item'],
             data['sk_item'],
+            data.get('index_name'),
+            data.get('index_sk_item'),
+            data.get('index_attributes'),
         )
         print(f"Table Name: {data['table_name']}")
     if args.mode == "delete":
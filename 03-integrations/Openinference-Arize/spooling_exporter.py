@@ -0,0 +1,437 @@
+"""
+Disk-backed spooling for OTLP span export
+
+This module provides a span exporter that persists each batch handed to it by the
+BatchSpanProcessor to a local segment log and returns immediately. A background
+thread drains the log into the wrapped exporter (usually OTLPSpanExporter), with
+retry and backoff, so a slow or unavailable backend no longer fills the
+BatchSpanProcessor queue and drops spans.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import Link, SpanContext, SpanKind, TraceFlags, TraceState
+from opentelemetry.trace.status import Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+CURSOR_FILE = "cursor"
+
+
+def encode_span(span: ReadableSpan) -> Dict[str, Any]:
+    """Encode a finished span as a JSON compatible dict, see decode_span."""
+    scope = span.instrumentation_scope
+    return {
+        "name": span.name,
+        "context": _encode_context(span.context),
+        "parent": _encode_context(span.parent),
+        "kind": span.kind.name,
+        "start_time": span.start_time,
+        "end_time": span.end_time,
+        "attributes": dict(span.attributes or {}),
+        "events": [
+            {"name": event.name, "timestamp": event.timestamp, "attributes": dict(event.attributes or {})}
+            for event in span.events
+        ],
+        "links": [
+            {"context": _encode_context(link.context), "attributes": dict(link.attributes or {})}
+            for link in span.links
+        ],
+        "status": [span.status.status_code.name, span.status.description],
+        "resource": [dict(span.resource.attributes), span.resource.schema_url],
+        "scope": [scope.name, scope.version, scope.schema_url] if scope is not None else None,
+    }
+
+
+def decode_span(data: Dict[str, Any]) -> ReadableSpan:
+    """Rebuild a ReadableSpan from the output of encode_span."""
+    scope = data["scope"]
+    status_code, status_description = data["status"]
+    resource_attributes, schema_url = data["resource"]
+    return ReadableSpan(
+        name=data["name"],
+        context=_decode_context(data["context"]),
+        parent=_decode_context(data["parent"]),
+        resource=Resource(decode_attributes(resource_attributes), schema_url),
+        attributes=decode_attributes(data["attributes"]),
+        events=[
+            Event(event["name"], decode_attributes(event["attributes"]), event["timestamp"])
+            for event in data["events"]
+        ],
+        links=[
+            Link(_decode_context(link["context"]), decode_attributes(link["attributes"]))
+            for link in data["links"]
+        ],
+        kind=SpanKind[data["kind"]],
+        status=Status(StatusCode[status_code], status_description),
+        start_time=data["start_time"],
+        end_time=data["end_time"],
+        instrumentation_scope=InstrumentationScope(*scope) if scope is not None else None,
+    )
+
+
+def _encode_context(context: Optional[SpanContext]) -> Optional[List[Any]]:
+    if context is None:
+        return None
+    return [
+        format(context.trace_id, "032x"),
+        format(context.span_id, "016x"),
+        int(context.trace_flags),
+        list(context.trace_state.items()) if context.trace_state else [],
+        context.is_remote,
+    ]
+
+
+def _decode_context(data: Optional[List[Any]]) -> Optional[SpanContext]:
+    if data is None:
+        return None
+    trace_id, span_id, trace_flags, trace_state, is_remote = data
+    return SpanContext(
+        trace_id=int(trace_id, 16),
+        span_id=int(span_id, 16),
+        is_remote=is_remote,
+        trace_flags=TraceFlags(trace_flags),
+        trace_state=TraceState([tuple(item) for item in trace_state]),
+    )
+
+
+def decode_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON turns attribute sequences into lists; the SDK stores them as tuples."""
+    return {key: tuple(value) if isinstance(value, list) else value for key, value in attributes.items()}
+
+
+class SpoolingSpanExporter(SpanExporter):
+    """
+    SpanExporter that appends each batch to an append-only segment log on disk and
+    exports it to the wrapped exporter from a background thread.
+
+    Delivery is at least once: a batch whose export succeeded just before a crash
+    may be sent again on restart. When the spool exceeds max_spool_bytes the oldest
+    segments are discarded, so loss only happens once the disk budget is spent.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        spool_dir: str,
+        max_spool_bytes: int = 256 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+        fsync_every_batches: int = 16,
+        fsync_interval_seconds: float = 1.0,
+        initial_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0,
+        shutdown_timeout_seconds: float = 10.0,
+    ):
+        """
+        Initialize the exporter and start draining any spool left by a previous run.
+
+        Args:
+            exporter: Exporter receiving the spooled batches, e.g. OTLPSpanExporter
+            spool_dir: Directory holding the segment files, created if missing
+            max_spool_bytes: Disk budget of the spool. Past it the oldest segments
+                are deleted, dropping their spans
+            segment_bytes: Size at which the active segment is sealed and a new one
+                started. Fully exported segments are deleted
+            fsync_every_batches: Batches appended between two fsync calls
+            fsync_interval_seconds: Longest time an appended batch waits for fsync
+            initial_backoff_seconds: Delay before the first retry of a failed export,
+                doubled on every further failure
+            max_backoff_seconds: Cap on the retry delay
+            shutdown_timeout_seconds: Time shutdown waits for the spool to drain.
+                What remains is exported on the next start
+        """
+        self.exporter = exporter
+        self.spool_dir = spool_dir
+        self.max_spool_bytes = max_spool_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_every_batches = fsync_every_batches
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.initial_backoff_seconds = initial_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.shutdown_timeout_seconds = shutdown_timeout_seconds
+        self.dropped_spans = 0
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._lock = threading.Condition()
+        self._segments = self._existing_segments()
+        self._read_segment, self._read_offset, saved_spans = self._load_cursor()
+        self._segment_sizes = {seq: self._segment_size(seq) for seq in self._segments}
+        self._segment_spans = self._restore_segment_spans(saved_spans)
+        self._writer = None
+        self._write_segment = None
+        self._unsynced_batches = 0
+        self._last_sync = time.monotonic()
+        self._spool_bytes = sum(self._segment_sizes.values())
+        self._shutdown = False
+        self._drain_deadline = None
+
+        self._drainer = threading.Thread(target=self._drain, name="SpoolingSpanExporter", daemon=True)
+        self._drainer.start()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Append the batch to the spool. Returns once it is written, not exported."""
+        if self._shutdown:
+            return SpanExportResult.FAILURE
+        record = json.dumps([encode_span(span) for span in spans], separators=(",", ":")) + "\n"
+        data = record.encode("utf-8")
+        try:
+            with self._lock:
+                self._append(data, len(spans))
+                self._lock.notify_all()
+        except OSError:
+            logger.exception("Failed to spool %d spans", len(spans))
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Sync the spool to disk and wait until it is drained into the exporter."""
+        deadline = time.monotonic() + timeout_millis / 1000
+        with self._lock:
+            self._sync()
+            while self._pending():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return self.exporter.force_flush(max(int((deadline - time.monotonic()) * 1000), 0))
+
+    def shutdown(self):
+        """Drain for up to shutdown_timeout_seconds, then stop and keep the rest on disk."""
+        with self._lock:
+            self._sync()
+            self._drain_deadline = time.monotonic() + self.shutdown_timeout_seconds
+            self._shutdown = True
+            self._lock.notify_all()
+        self._drainer.join(self.shutdown_timeout_seconds + self.max_backoff_seconds)
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self.exporter.shutdown()
+
+    # Segment log
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.spool_dir, f"{SEGMENT_PREFIX}{seq:020d}{SEGMENT_SUFFIX}")
+
+    def _segment_size(self, seq: int) -> int:
+        try:
+            return os.path.getsize(self._segment_path(seq))
+        except OSError:
+            return 0
+
+    def _existing_segments(self) -> List[int]:
+        """Sequence numbers of the segment files already in the spool directory."""
+        segments = []
+        for name in os.listdir(self.spool_dir):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                segments.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _load_cursor(self) -> Tuple[Optional[int], int, Dict[int, List[int]]]:
+        """
+        Segment and offset of the next batch to export, as saved by the drainer,
+        and the saved span counts of the segments.
+        """
+        first = (self._segments[0] if self._segments else None), 0, {}
+        try:
+            with open(os.path.join(self.spool_dir, CURSOR_FILE)) as cursor:
+                position, _, spans = cursor.read().partition("\n")
+            seq, offset = (int(value) for value in position.split())
+            saved_spans = {int(seq): value for seq, value in json.loads(spans or "{}").items()}
+        except (OSError, ValueError):
+            return first
+        if seq not in self._segments:
+            return first
+        return seq, offset, saved_spans
+
+    def _restore_segment_spans(self, saved_spans: Dict[int, List[int]]) -> Dict[int, int]:
+        """
+        Spans not yet exported per segment. Counts saved with the cursor are used for
+        segments that did not grow since; the others are counted once, on startup.
+        """
+        segment_spans = {}
+        for seq in self._segments:
+            count, size = saved_spans.get(seq, (None, None))
+            if count is None or size != self._segment_sizes[seq]:
+                count = self._count_spans(seq, self._read_offset if seq == self._read_segment else 0)
+            segment_spans[seq] = count
+        return segment_spans
+
+    def _save_cursor(self):
+        """
+        Save the read position and the span counts of the segments. Lock held.
+        The tmp file is synced before the rename so a crash leaves the old or the new
+        cursor, never an empty one.
+        """
+        path = os.path.join(self.spool_dir, CURSOR_FILE)
+        spans = {seq: [count, self._segment_sizes[seq]] for seq, count in self._segment_spans.items()}
+        with open(path + ".tmp", "w") as cursor:
+            cursor.write(f"{self._read_segment} {self._read_offset}\n{json.dumps(spans)}")
+            cursor.flush()
+            os.fsync(cursor.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _append(self, data: bytes, spans: int):
+        """Append a record of spans to the active segment. Must be called with the lock held."""
+        if self._writer is None or self._writer.tell() >= self.segment_bytes:
+            self._roll()
+        self._writer.write(data)
+        self._writer.flush()
+        self._spool_bytes += len(data)
+        self._segment_sizes[self._write_segment] += len(data)
+        self._segment_spans[self._write_segment] += spans
+        self._unsynced_batches += 1
+        if self._unsynced_batches >= self.fsync_every_batches:
+            self._sync()
+        else:
+            self._sync_if_due()
+        self._enforce_budget()
+
+    def _roll(self):
+        """Seal the active segment and open the next one."""
+        if self._writer is not None:
+            self._sync()
+            self._writer.close()
+        seq = self._segments[-1] + 1 if self._segments else 0
+        self._segments.append(seq)
+        self._segment_spans[seq] = 0
+        self._segment_sizes[seq] = 0
+        self._write_segment = seq
+        self._writer = open(self._segment_path(seq), "ab")
+        if self._read_segment is None:
+            self._read_segment, self._read_offset = seq, 0
+
+    def _sync(self):
+        if self._writer is not None and self._unsynced_batches:
+            os.fsync(self._writer.fileno())
+        self._unsynced_batches = 0
+        self._last_sync = time.monotonic()
+
+    def _sync_if_due(self):
+        if self._unsynced_batches and time.monotonic() - self._last_sync >= self.fsync_interval_seconds:
+            self._sync()
+
+    def _enforce_budget(self):
+        """Delete the oldest segments while the spool exceeds its disk budget."""
+        while self._spool_bytes > self.max_spool_bytes and len(self._segments) > 1:
+            seq = self._segments[0]
+            dropped = self._segment_spans.get(seq, 0)
+            self.dropped_spans += dropped
+            logger.warning("Spool over %d bytes, dropping %d spans of segment %d", self.max_spool_bytes, dropped, seq)
+            self._delete_segment(seq)
+
+    def _count_spans(self, seq: int, offset: int) -> int:
+        """Spans in the records of a segment from offset on, read from disk."""
+        count = 0
+        with open(self._segment_path(seq), "rb") as segment:
+            segment.seek(offset)
+            for line in segment:
+                try:
+                    count += len(json.loads(line))
+                except ValueError:
+                    continue
+        return count
+
+    def _delete_segment(self, seq: int):
+        self._spool_bytes -= self._segment_sizes.pop(seq, 0)
+        self._segments.remove(seq)
+        self._segment_spans.pop(seq, None)
+        os.remove(self._segment_path(seq))
+        if seq == self._read_segment:
+            self._read_segment = self._segments[0] if self._segments else None
+            self._read_offset = 0
+
+    def _pending(self) -> bool:
+        """Whether spooled batches remain to be exported. Lock held."""
+        if self._read_segment is None:
+            return False
+        if self._read_segment != self._segments[-1]:
+            return True
+        return self._read_offset < self._segment_sizes[self._read_segment]
+
+    def _next_record(self) -> Optional[Tuple[int, int, bytes]]:
+        """
+        The next complete record as (segment, end offset, data), moving past fully
+        exported segments. Lock held.
+        """
+        while self._read_segment is not None:
+            seq = self._read_segment
+            with open(self._segment_path(seq), "rb") as segment:
+                segment.seek(self._read_offset)
+                line = segment.readline()
+            if line.endswith(b"\n"):
+                return seq, self._read_offset + len(line), line
+            if seq == self._write_segment:
+                # Active segment: the next record is not written yet
+                return None
+            # Sealed segment fully read, including a record torn by a crash
+            self._delete_segment(seq)
+            self._save_cursor()
+        return None
+
+    # Drain thread
+
+    def _drain(self):
+        backoff = self.initial_backoff_seconds
+        while True:
+            with self._lock:
+                record = self._next_record()
+                while record is None and not self._shutdown:
+                    self._lock.wait(self.fsync_interval_seconds)
+                    self._sync_if_due()
+                    record = self._next_record()
+                if record is None or self._deadline_passed():
+                    return
+
+            seq, end_offset, data = record
+            spans = []
+            try:
+                spans = [decode_span(item) for item in json.loads(data)]
+            except (ValueError, KeyError, TypeError):
+                logger.error("Skipping unreadable spool record in segment %d", seq)
+                result = SpanExportResult.SUCCESS
+            else:
+                try:
+                    result = self.exporter.export(spans)
+                except Exception:
+                    logger.exception("Spooled export raised")
+                    result = SpanExportResult.FAILURE
+
+            if result == SpanExportResult.SUCCESS:
+                backoff = self.initial_backoff_seconds
+                with self._lock:
+                    if self._read_segment == seq:
+                        self._read_offset = end_offset
+                        self._segment_spans[seq] = max(self._segment_spans[seq] - len(spans), 0)
+                        self._save_cursor()
+                    self._lock.notify_all()
+                continue
+
+            delay = backoff * random.uniform(0.5, 1.0)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+            logger.warning("Export of spooled batch failed, retrying in %.2fs", delay)
+            retry_at = time.monotonic() + delay
+            with self._lock:
+                while not self._deadline_passed() and (remaining := retry_at - time.monotonic()) > 0:
+                    if self._shutdown:
+                        remaining = min(remaining, self._drain_deadline - time.monotonic())
+                    self._lock.wait(max(remaining, 0))
+                    self._sync_if_due()
+                if self._deadline_passed():
+                    return
+
+    def _deadline_passed(self) -> bool:
+        return self._shutdown and time.monotonic() >= self._drain_deadline
@@ -0,0 +1,749 @@
+"""
+Offline conversion of Strands span dumps to OpenInference
+
+This module reads spans that were exported without the OpenInference processor and
+runs them through StrandsToOpenInferenceProcessor, so historical traces can be
+backfilled into Arize without replaying the agents. It reads, optionally gzipped:
+
+    - OTLP/JSON export requests, one per line as written by the collector file
+      exporter, or concatenated
+    - OTLP protobuf export requests, each prefixed with its 4 byte big-endian
+      length as written by the collector file exporter, or a single request
+    - the JSON printed by ConsoleSpanExporter
+
+Spans are streamed and buffered per trace until the trace's root span is read, and
+converted spans are written in batches as OTLP/JSON lines or sent to an OTLP
+endpoint, so memory stays bounded however large the dumps are.
+
+    python strands_to_openinference_convert.py dumps/ --output converted.jsonl.gz
+    python strands_to_openinference_convert.py traces.jsonl --endpoint otlp.arize.com:443 \\
+        --header space_id=... --header api_key=...
+"""
+
+import argparse
+import base64
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import Link, SpanContext, SpanKind, TraceFlags, TraceState
+from opentelemetry.trace.status import Status, StatusCode
+
+from otlp_receiver import iter_fields
+from spooling_exporter import decode_attributes
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor, StrandsToOpenInferenceSpanExporter
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+# OTLP numbers span kinds from SPAN_KIND_UNSPECIFIED = 0, the SDK from INTERNAL = 0
+OTLP_SPAN_KINDS = [SpanKind.INTERNAL, SpanKind.INTERNAL, SpanKind.SERVER, SpanKind.CLIENT,
+                   SpanKind.PRODUCER, SpanKind.CONSUMER]
+# Span.flags bits recording whether the parent span context is remote
+FLAG_HAS_IS_REMOTE = 0x100
+FLAG_IS_REMOTE = 0x200
+
+_WHITESPACE = re.compile(r"\s*")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def iter_dump_files(paths: Iterable[str]) -> Iterator[str]:
+    """Expand directories into the files below them, in name order, skipping hidden files."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories[:] = sorted(name for name in subdirectories if not name.startswith("."))
+            for filename in sorted(filenames):
+                if not filename.startswith("."):
+                    yield os.path.join(directory, filename)
+
+
+def read_dump(path: str) -> Iterator[ReadableSpan]:
+    """Stream the spans of a dump file, detecting its format from the first bytes."""
+    with open(path, "rb") as raw:
+        stream = gzip.GzipFile(fileobj=raw) if raw.peek(2)[:2] == GZIP_MAGIC else raw
+        head = stream.peek(64)[:64].lstrip()
+        if not head or head[:1] in b"{[":
+            for value in iter_json_values(stream):
+                yield from spans_from_json(value)
+        else:
+            for request in iter_protobuf_requests(stream):
+                yield from spans_from_otlp_protobuf(request)
+
+
+def iter_json_values(stream: IO[bytes]) -> Iterator[Any]:
+    """Decode the JSON values of a stream one at a time, whether on one line each or not."""
+    text = io.TextIOWrapper(stream, encoding="utf-8")
+    decoder = json.JSONDecoder()
+    buffer, pos, read_size = "", 0, READ_CHUNK_BYTES
+    while True:
+        chunk = text.read(read_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                # Incomplete value: read at least as much again so large values decode in O(n)
+                read_size = max(READ_CHUNK_BYTES, len(buffer) - pos)
+                break
+            yield value
+        if not chunk:
+            return
+
+
+def iter_protobuf_requests(stream: IO[bytes]) -> Iterator[memoryview]:
+    """
+    Yield the serialized export requests of a protobuf dump. A request always
+    starts with its resource_spans field (tag 0x0A), while a length prefix starts
+    with a zero byte below 16 MiB, so a single unframed request is recognized and
+    read whole.
+    """
+    if stream.peek(1)[:1] == b"\x0a":
+        yield memoryview(stream.read())
+        return
+    while True:
+        prefix = stream.read(4)
+        if not prefix:
+            return
+        if len(prefix) < 4:
+            raise ValueError("Truncated length prefix at the end of a protobuf dump")
+        (length,) = struct.unpack(">I", prefix)
+        request = stream.read(length)
+        if len(request) < length:
+            raise ValueError("Truncated export request at the end of a protobuf dump")
+        yield memoryview(request)
+
+
+def spans_from_json(value: Any) -> Iterator[ReadableSpan]:
+    """Spans of a decoded JSON value: an OTLP/JSON export request, a console span or a list of either."""
+    if isinstance(value, list):
+        for item in value:
+            yield from spans_from_json(item)
+    elif isinstance(value, dict) and "resourceSpans" in value:
+        yield from spans_from_otlp_json(value)
+    elif isinstance(value, dict) and "context" in value and "name" in value:
+        yield span_from_console_json(value)
+    else:
+        logger.warning("Skipping a JSON value that is neither an OTLP export request nor a span")
+
+
+def spans_from_otlp_json(request: Dict[str, Any]) -> Iterator[ReadableSpan]:
+    """Spans of an OTLP/JSON ExportTraceServiceRequest."""
+    for resource_spans in request.get("resourceSpans", []):
+        resource = Resource(
+            _attributes_from_otlp_json(resource_spans.get("resource", {}).get("attributes")),
+            resource_spans.get("schemaUrl") or None,
+        )
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            scope = scope_spans.get("scope", {})
+            scope = InstrumentationScope(scope.get("name", ""), scope.get("version") or None,
+                                         scope_spans.get("schemaUrl") or None)
+            for span in scope_spans.get("spans", []):
+                yield _span_from_otlp_json(span, resource, scope)
+
+
+def _span_from_otlp_json(span: Dict[str, Any], resource: Resource, scope: InstrumentationScope) -> ReadableSpan:
+    kind = span.get("kind", 0)
+    status = span.get("status", {})
+    status_code = status.get("code", 0)
+    return _build_span(
+        name=span.get("name", ""),
+        trace_id=_id_from_otlp_json(span["traceId"]),
+        span_id=_id_from_otlp_json(span["spanId"]),
+        parent_span_id=_id_from_otlp_json(span.get("parentSpanId")),
+        flags=int(span.get("flags", TraceFlags.SAMPLED)),
+        trace_state=span.get("traceState"),
+        kind=SpanKind[kind[len("SPAN_KIND_"):]] if isinstance(kind, str) else OTLP_SPAN_KINDS[kind],
+        start_time=int(span.get("startTimeUnixNano", 0)),
+        end_time=int(span.get("endTimeUnixNano", 0)),
+        attributes=_attributes_from_otlp_json(span.get("attributes")),
+        events=[
+            Event(event.get("name", ""), _attributes_from_otlp_json(event.get("attributes")),
+                  int(event.get("timeUnixNano", 0)))
+            for event in span.get("events", [])
+        ],
+        links=[
+            Link(_context(_id_from_otlp_json(link["traceId"]), _id_from_otlp_json(link["spanId"]),
+                          int(link.get("flags", TraceFlags.SAMPLED)), link.get("traceState")),
+                 _attributes_from_otlp_json(link.get("attributes")))
+            for link in span.get("links", [])
+        ],
+        status_code=StatusCode[status_code[len("STATUS_CODE_"):]] if isinstance(status_code, str)
+        else StatusCode(status_code),
+        status_message=status.get("message"),
+        resource=resource,
+        scope=scope,
+    )
+
+
+def _id_from_otlp_json(value: Optional[str]) -> int:
+    """OTLP/JSON carries ids as hex, protobuf's JSON mapping as base64."""
+    if not value:
+        return 0
+    if len(value) in (16, 32):
+        return int(value, 16)
+    return int.from_bytes(base64.b64decode(value), "big")
+
+
+def _attributes_from_otlp_json(key_values: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    attributes = {}
+    for key_value in key_values or ():
+        value = _value_from_otlp_json(key_value.get("value", {}))
+        if value is not None:
+            attributes[key_value["key"]] = value
+    return attributes
+
+
+def _value_from_otlp_json(value: Dict[str, Any]) -> Any:
+    if "stringValue" in value:
+        return value["stringValue"]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return float(value["doubleValue"])
+    if "boolValue" in value:
+        return value["boolValue"]
+    if "arrayValue" in value:
+        return tuple(_value_from_otlp_json(item) for item in value["arrayValue"].get("values", []))
+    if "kvlistValue" in value:
+        return json.dumps(_attributes_from_otlp_json(value["kvlistValue"].get("values")))
+    if "bytesValue" in value:
+        return value["bytesValue"]
+    return None
+
+
+def span_from_console_json(data: Dict[str, Any]) -> ReadableSpan:
+    """
+    Rebuild a span from the output of ReadableSpan.to_json, as printed by
+    ConsoleSpanExporter. Timestamps there have microsecond precision, and remote
+    parents are not marked, so every span with a parent is treated as a child.
+    """
+    context = data["context"]
+    trace_id = int(context["trace_id"], 16)
+    status = data.get("status") or {}
+    resource = data.get("resource") or {}
+    return _build_span(
+        name=data["name"],
+        trace_id=trace_id,
+        span_id=int(context["span_id"], 16),
+        parent_span_id=int(data["parent_id"], 16) if data.get("parent_id") else 0,
+        flags=TraceFlags.SAMPLED,
+        trace_state=None,
+        kind=SpanKind[data.get("kind", "SpanKind.INTERNAL").rpartition(".")[2]],
+        start_time=_time_from_console_json(data.get("start_time")),
+        end_time=_time_from_console_json(data.get("end_time")),
+        attributes=decode_attributes(data.get("attributes") or {}),
+        events=[
+            Event(event["name"], decode_attributes(event.get("attributes") or {}),
+                  _time_from_console_json(event.get("timestamp")))
+            for event in data.get("events", [])
+        ],
+        links=[
+            Link(_context(int(link["context"]["trace_id"], 16), int(link["context"]["span_id"], 16),
+                          TraceFlags.SAMPLED, None),
+                 decode_attributes(link.get("attributes") or {}))
+            for link in data.get("links", [])
+        ],
+        status_code=StatusCode[status.get("status_code", "UNSET")],
+        status_message=status.get("description"),
+        resource=Resource(decode_attributes(resource.get("attributes") or {}), resource.get("schema_url") or None),
+        scope=None,
+    )
+
+
+def _time_from_console_json(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    elapsed = datetime.fromisoformat(value.replace("Z", "+00:00")) - _EPOCH
+    return elapsed // timedelta(microseconds=1) * 1000
+
+
+def spans_from_otlp_protobuf(data: memoryview) -> Iterator[ReadableSpan]:
+    """
+    Spans of a serialized ExportTraceServiceRequest, decoded with the wire walker of
+    otlp_receiver rather than the generated protobuf classes.
+    """
+    for field, wire_type, resource_spans in iter_fields(data):
+        if field != 1 or wire_type != 2:
+            continue
+        resource_attributes, schema_url, scope_spans_list = {}, None, []
+        for field, wire_type, value in iter_fields(resource_spans):
+            if field == 1 and wire_type == 2:
+                resource_attributes = _attributes_from_protobuf(value, attributes_field=1)
+            elif field == 2 and wire_type == 2:
+                scope_spans_list.append(value)
+            elif field == 3 and wire_type == 2:
+                schema_url = str(value, "utf-8") or None
+        resource = Resource(resource_attributes, schema_url)
+        for scope_spans in scope_spans_list:
+            yield from _spans_from_scope_spans(scope_spans, resource)
+
+
+def _spans_from_scope_spans(data: memoryview, resource: Resource) -> Iterator[ReadableSpan]:
+    scope_name, scope_version, schema_url, spans = "", None, None, []
+    for field, wire_type, value in iter_fields(data):
+        if field == 1 and wire_type == 2:
+            for scope_field, scope_wire_type, scope_value in iter_fields(value):
+                if scope_field == 1 and scope_wire_type == 2:
+                    scope_name = str(scope_value, "utf-8")
+                elif scope_field == 2 and scope_wire_type == 2:
+                    scope_version = str(scope_value, "utf-8") or None
+        elif field == 2 and wire_type == 2:
+            spans.append(value)
+        elif field == 3 and wire_type == 2:
+            schema_url = str(value, "utf-8") or None
+    scope = InstrumentationScope(scope_name, scope_version, schema_url)
+    for span in spans:
+        yield _span_from_protobuf(span, resource, scope)
+
+
+def _span_from_protobuf(data: memoryview, resource: Resource, scope: InstrumentationScope) -> ReadableSpan:
+    span = {"name": "", "trace_id": 0, "span_id": 0, "parent_span_id": 0, "flags": int(TraceFlags.SAMPLED),
+            "trace_state": None, "kind": SpanKind.INTERNAL, "start_time": 0, "end_time": 0,
+            "attributes": {}, "events": [], "links": [], "status_code": StatusCode.UNSET, "status_message": None}
+    for field, wire_type, value in iter_fields(data):
+        if field == 1:
+            span["trace_id"] = int.from_bytes(value, "big")
+        elif field == 2:
+            span["span_id"] = int.from_bytes(value, "big")
+        elif field == 3:
+            span["trace_state"] = str(value, "utf-8")
+        elif field == 4:
+            span["parent_span_id"] = int.from_bytes(value, "big")
+        elif field == 5:
+            span["name"] = str(value, "utf-8")
+        elif field == 6:
+            span["kind"] = OTLP_SPAN_KINDS[value]
+        elif field == 7:
+            span["start_time"] = int.from_bytes(value, "little")
+        elif field == 8:
+            span["end_time"] = int.from_bytes(value, "little")
+        elif field == 9:
+            span["attributes"].update(_attributes_from_protobuf(value))
+        elif field == 11:
+            span["events"].append(_event_from_protobuf(value))
+        elif field == 13:
+            span["links"].append(_link_from_protobuf(value))
+        elif field == 15:
+            for status_field, status_wire_type, status_value in iter_fields(value):
+                if status_field == 2:
+                    span["status_message"] = str(status_value, "utf-8")
+                elif status_field == 3:
+                    span["status_code"] = StatusCode(status_value)
+        elif field == 16:
+            span["flags"] = int.from_bytes(value, "little")
+    return _build_span(resource=resource, scope=scope, **span)
+
+
+def _event_from_protobuf(data: memoryview) -> Event:
+    name, attributes, timestamp = "", {}, 0
+    for field, wire_type, value in iter_fields(data):
+        if field == 1:
+            timestamp = int.from_bytes(value, "little")
+        elif field == 2:
+            name = str(value, "utf-8")
+        elif field == 3:
+            attributes.update(_attributes_from_protobuf(value))
+    return Event(name, attributes, timestamp)
+
+
+def _link_from_protobuf(data: memoryview) -> Link:
+    trace_id = span_id = 0
+    trace_state, flags, attributes = None, int(TraceFlags.SAMPLED), {}
+    for field, wire_type, value in iter_fields(data):
+        if field == 1:
+            trace_id = int.from_bytes(value, "big")
+        elif field == 2:
+            span_id = int.from_bytes(value, "big")
+        elif field == 3:
+            trace_state = str(value, "utf-8")
+        elif field == 4:
+            attributes.update(_attributes_from_protobuf(value))
+        elif field == 6:
+            flags = int.from_bytes(value, "little")
+    return Link(_context(trace_id, span_id, flags, trace_state), attributes)
+
+
+def _attributes_from_protobuf(data: memoryview, attributes_field: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Decode a KeyValue message, or with attributes_field the repeated KeyValue field
+    of an enclosing message such as Resource.
+    """
+    if attributes_field is not None:
+        attributes = {}
+        for field, wire_type, value in iter_fields(data):
+            if field == attributes_field and wire_type == 2:
+                attributes.update(_attributes_from_protobuf(value))
+        return attributes
+    key, value = "", None
+    for field, wire_type, field_value in iter_fields(data):
+        if field == 1:
+            key = str(field_value, "utf-8")
+        elif field == 2:
+            value = _value_from_protobuf(field_value)
+    return {key: value} if value is not None else {}
+
+
+def _value_from_protobuf(data: memoryview) -> Any:
+    for field, wire_type, value in iter_fields(data):
+        if field == 1:
+            return str(value, "utf-8")
+        if field == 2:
+            return bool(value)
+        if field == 3:
+            return value - (1 << 64) if value >= 1 << 63 else value
+        if field == 4:
+            return struct.unpack("<d", value)[0]
+        if field == 5:
+            return tuple(_value_from_protobuf(item) for item_field, _, item in iter_fields(value) if item_field == 1)
+        if field == 6:
+            return json.dumps(_attributes_from_protobuf(value, attributes_field=1))
+        if field == 7:
+            return base64.b64encode(value).decode("ascii")
+    return None
+
+
+def _context(trace_id: int, span_id: int, flags: int, trace_state: Optional[str], is_remote: bool = False) -> SpanContext:
+    return SpanContext(
+        trace_id=trace_id,
+        span_id=span_id,
+        is_remote=is_remote,
+        trace_flags=TraceFlags(flags & 0xFF),
+        trace_state=TraceState.from_header([trace_state]) if trace_state else None,
+    )
+
+
+def _build_span(
+    name: str,
+    trace_id: int,
+    span_id: int,
+    parent_span_id: int,
+    flags: int,
+    trace_state: Optional[str],
+    kind: SpanKind,
+    start_time: Optional[int],
+    end_time: Optional[int],
+    attributes: Dict[str, Any],
+    events: List[Event],
+    links: List[Link],
+    status_code: StatusCode,
+    status_message: Optional[str],
+    resource: Resource,
+    scope: Optional[InstrumentationScope],
+) -> ReadableSpan:
+    parent = None
+    if parent_span_id:
+        parent_is_remote = flags & (FLAG_HAS_IS_REMOTE | FLAG_IS_REMOTE) == FLAG_HAS_IS_REMOTE | FLAG_IS_REMOTE
+        parent = _context(trace_id, parent_span_id, flags, None, is_remote=parent_is_remote)
+    return ReadableSpan(
+        name=name,
+        context=_context(trace_id, span_id, flags, trace_state),
+        parent=parent,
+        resource=resource,
+        attributes=attributes,
+        events=events,
+        links=links,
+        kind=kind,
+        # Status only keeps a description for errors and warns about any other
+        status=Status(status_code, status_message if status_code == StatusCode.ERROR else None),
+        start_time=start_time,
+        end_time=end_time,
+        instrumentation_scope=scope,
+    )
+
+
+def spans_to_otlp_json(spans: Sequence[ReadableSpan]) -> Dict[str, Any]:
+    """Encode spans as an OTLP/JSON ExportTraceServiceRequest, grouped by resource and scope."""
+    resources: Dict[int, Dict[str, Any]] = {}
+    for span in spans:
+        resource = span.resource
+        resource_spans = resources.get(id(resource))
+        if resource_spans is None:
+            resource_spans = resources[id(resource)] = {
+                "resource": {"attributes": _attributes_to_otlp_json(resource.attributes)},
+                "scopes": {},
+            }
+            if resource.schema_url:
+                resource_spans["schemaUrl"] = resource.schema_url
+        scope = span.instrumentation_scope
+        scope_key = (scope.name, scope.version, scope.schema_url) if scope is not None else ("", None, None)
+        scope_spans = resource_spans["scopes"].get(scope_key)
+        if scope_spans is None:
+            scope_spans = resource_spans["scopes"][scope_key] = {"scope": {"name": scope_key[0]}, "spans": []}
+            if scope_key[1]:
+                scope_spans["scope"]["version"] = scope_key[1]
+            if scope_key[2]:
+                scope_spans["schemaUrl"] = scope_key[2]
+        scope_spans["spans"].append(_span_to_otlp_json(span))
+    for resource_spans in resources.values():
+        resource_spans["scopeSpans"] = list(resource_spans.pop("scopes").values())
+    return {"resourceSpans": list(resources.values())}
+
+
+def _span_to_otlp_json(span: ReadableSpan) -> Dict[str, Any]:
+    context = span.get_span_context()
+    flags = int(context.trace_flags)
+    encoded = {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "name": span.name,
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time or 0),
+        "endTimeUnixNano": str(span.end_time or 0),
+        "attributes": _attributes_to_otlp_json(span.attributes),
+    }
+    if span.parent is not None:
+        encoded["parentSpanId"] = format(span.parent.span_id, "016x")
+        flags |= FLAG_HAS_IS_REMOTE | (FLAG_IS_REMOTE if span.parent.is_remote else 0)
+    encoded["flags"] = flags
+    if context.trace_state:
+        encoded["traceState"] = context.trace_state.to_header()
+    if span.events:
+        encoded["events"] = [
+            {"timeUnixNano": str(event.timestamp), "name": event.name,
+             "attributes": _attributes_to_otlp_json(event.attributes)}
+            for event in span.events
+        ]
+    if span.links:
+        encoded["links"] = [
+            {"traceId": format(link.context.trace_id, "032x"), "spanId": format(link.context.span_id, "016x"),
+             "attributes": _attributes_to_otlp_json(link.attributes)}
+            for link in span.links
+        ]
+    if span.status.status_code != StatusCode.UNSET:
+        encoded["status"] = {"code": span.status.status_code.value}
+        if span.status.description:
+            encoded["status"]["message"] = span.status.description
+    return encoded
+
+
+def _attributes_to_otlp_json(attributes) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _value_to_otlp_json(value)} for key, value in (attributes or {}).items()]
+
+
+def _value_to_otlp_json(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    if isinstance(value, Sequence):
+        return {"arrayValue": {"values": [_value_to_otlp_json(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+class OtlpJsonLinesExporter(SpanExporter):
+    """
+    SpanExporter writing each batch as one OTLP/JSON export request per line, the
+    format of the collector file exporter, gzipped when the path ends in .gz.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path.endswith(".gz"):
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def export(self, spans) -> SpanExportResult:
+        self._file.write(json.dumps(spans_to_otlp_json(spans), separators=(",", ":")))
+        self._file.write("\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        self._file.close()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        self._file.flush()
+        return True
+
+
+class DumpConverter:
+    """
+    Converts dumped spans trace by trace and exports them in batches.
+
+    Spans are buffered per trace until the root span of the trace is added, which
+    in a dump written by a BatchSpanProcessor follows its descendants. When more
+    than max_buffered_spans are buffered, the oldest trace is converted as it is;
+    its spans still get OpenInference attributes, only the graph and trace timing
+    attributes that need the whole trace can be incomplete.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        processor: Optional[StrandsToOpenInferenceProcessor] = None,
+        batch_size: int = 512,
+        max_buffered_spans: int = 100000,
+    ):
+        """
+        Initialize the converter.
+
+        Args:
+            exporter: Exporter that receives the converted spans
+            processor: Processor doing the conversion, created with defer_transform=True
+                and a max_tracked_spans of at least max_buffered_spans + 1, the
+                largest trace replayed through it at once
+            batch_size: Number of converted spans handed to the exporter at a time
+            max_buffered_spans: Number of spans buffered while waiting for root spans
+        """
+        self.processor = processor or StrandsToOpenInferenceProcessor(
+            defer_transform=True, max_tracked_spans=max_buffered_spans + 1
+        )
+        if not self.processor.defer_transform:
+            raise ValueError("The processor must be created with defer_transform=True")
+        if self.processor.max_tracked_spans <= max_buffered_spans:
+            raise ValueError(f"The processor must track more than max_buffered_spans ({max_buffered_spans}) "
+                             f"spans, it would evict spans of large traces mid-conversion")
+        self.exporter = exporter
+        self.converter = StrandsToOpenInferenceSpanExporter(exporter, self.processor)
+        self.batch_size = batch_size
+        self.max_buffered_spans = max_buffered_spans
+        self.traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self.buffered_spans = 0
+        self.pending: List[ReadableSpan] = []
+        self.stats = {"spans_read": 0, "spans_written": 0, "spans_failed": 0, "traces": 0, "partial_traces": 0}
+
+    def add(self, span: ReadableSpan):
+        """Buffer a dumped span, converting its trace once the root span arrives."""
+        self.stats["spans_read"] += 1
+        trace_id = span.get_span_context().trace_id
+        self.traces.setdefault(trace_id, []).append(span)
+        self.buffered_spans += 1
+        if self.processor._is_root_span(span):
+            self._convert_trace(trace_id, complete=True)
+        while self.buffered_spans > self.max_buffered_spans:
+            self._convert_trace(next(iter(self.traces)), complete=False)
+
+    def finish(self) -> Dict[str, int]:
+        """Convert the traces still buffered, export what is pending and return the stats."""
+        while self.traces:
+            self._convert_trace(next(iter(self.traces)), complete=False)
+        self._export(final=True)
+        self.exporter.force_flush()
+        return dict(self.stats)
+
+    def _convert_trace(self, trace_id: int, complete: bool):
+        """Replay the span lifecycle of a trace through the processor and convert its spans."""
+        spans = self.traces.pop(trace_id)
+        self.buffered_spans -= len(spans)
+        processor = self.processor
+        spans.sort(key=lambda span: span.start_time or 0)
+        for span in spans:
+            processor.on_start(span)
+        spans.sort(key=lambda span: (processor._is_root_span(span), span.end_time or 0))
+        for span in spans:
+            processor.on_end(span)
+        try:
+            self.pending.extend(self.converter._convert_span(span) for span in spans)
+        finally:
+            if not complete:
+                processor._release_trace(trace_id)
+        self.stats["traces" if complete else "partial_traces"] += 1
+        self._export()
+
+    def _export(self, final: bool = False):
+        while len(self.pending) >= self.batch_size or (final and self.pending):
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            if self.exporter.export(batch) == SpanExportResult.SUCCESS:
+                self.stats["spans_written"] += len(batch)
+            else:
+                self.stats["spans_failed"] += len(batch)
+                logger.warning("Failed to export a batch of %d converted spans", len(batch))
+
+
+def convert_dumps(
+    paths: Iterable[str],
+    exporter: SpanExporter,
+    processor: Optional[StrandsToOpenInferenceProcessor] = None,
+    batch_size: int = 512,
+    max_buffered_spans: int = 100000,
+) -> Dict[str, int]:
+    """Convert the spans of the given dump files and directories, see DumpConverter."""
+    converter = DumpConverter(exporter, processor, batch_size, max_buffered_spans)
+    for path in iter_dump_files(paths):
+        logger.info("Converting %s", path)
+        for span in read_dump(path):
+            converter.add(span)
+    return converter.finish()
+
+
+def _otlp_exporter(endpoint: str, protocol: str, headers: Dict[str, str]) -> SpanExporter:
+    if protocol == "grpc":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    return OTLPSpanExporter(endpoint=endpoint, headers=headers or None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert Strands span dumps to OpenInference")
+    parser.add_argument("dumps", nargs="+",
+                        help="Dump files or directories: OTLP/JSON, OTLP protobuf or ConsoleSpanExporter output")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="Write OTLP/JSON lines to this file, gzipped if it ends in .gz")
+    target.add_argument("--endpoint", help="Send the converted spans to this OTLP endpoint")
+    parser.add_argument("--protocol", choices=["grpc", "http/protobuf"], default="grpc")
+    parser.add_argument("--header", action="append", default=[], metavar="KEY=VALUE",
+                        help="Header sent with every OTLP export, such as space_id or api_key")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--max-buffered-spans", type=int, default=100000)
+    parser.add_argument("--trace-timing", action="store_true",
+                        help="Add a timing summary of each trace to its root span")
+    parser.add_argument("--trace-usage", action="store_true",
+                        help="Add the token counts of each trace to its root span")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.output:
+        exporter = OtlpJsonLinesExporter(args.output)
+    else:
+        try:
+            exporter = _otlp_exporter(args.endpoint, args.protocol,
+                                      dict(header.split("=", 1) for header in args.header))
+        except ImportError as e:
+            parser.error(f"{e}: install opentelemetry-exporter-otlp-proto-grpc or -http")
+    processor = StrandsToOpenInferenceProcessor(debug=args.debug, defer_transform=True,
+                                                max_tracked_spans=args.max_buffered_spans + 1,
+                                                trace_timing=args.trace_timing, trace_usage=args.trace_usage)
+
+    started = time.monotonic()
+    try:
+        stats = convert_dumps(args.dumps, exporter, processor, args.batch_size, args.max_buffered_spans)
+    finally:
+        exporter.shutdown()
+    elapsed = time.monotonic() - started
+    logger.info("Converted %d spans in %.1f s (%.0f spans/s): %s", stats["spans_written"], elapsed,
+                stats["spans_read"] / elapsed if elapsed else 0.0, stats)
+    return 1 if stats["spans_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,38 +5,465 @@ This module provides a span processor that converts Strands telemetry data
 to OpenInference format for compatibility with Arize AI.
 """
 
+import base64
+import binascii
+import hashlib
 import json
 import logging
-from typing import Any, Dict, List, Optional, Set
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
 from datetime import datetime
 
-from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry import metrics
+from opentelemetry.attributes import BoundedAttributes
+from opentelemetry.metrics import MeterProvider, Observation
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
 from opentelemetry.trace import Span
 
 logger = logging.getLogger(__name__)
 
+DEDUP_ATTRIBUTE_KEYS = ("system_prompt", "gen_ai.system_prompt", "gen_ai.system_instructions")
+
+FIDELITY_FULL = "full"
+FIDELITY_TRUNCATED = "truncated"
+FIDELITY_MINIMAL = "minimal"
+FIDELITY_ATTRIBUTE = "strands_openinference.fidelity"
+
+# Attributes kept on spans transformed at minimal fidelity, besides span kind, graph
+# node, model, token counts and invocation parameters
+MINIMAL_FIDELITY_KEYS = (
+    "session.id", "user.id", "tool.name", "tool.id", "tool.status",
+    "gen_ai.event.start_time", "gen_ai.event.end_time",
+)
+
+TIMING_ATTRIBUTE_PREFIX = "strands_openinference.timing."
+USAGE_ATTRIBUTE_PREFIX = "strands_openinference.usage."
+
+# Token counts summed per trace: (summary field, Strands attributes in order of
+# preference, token_prices entry)
+USAGE_FIELDS = (
+    ("prompt_tokens", ("gen_ai.usage.prompt_tokens", "gen_ai.usage.input_tokens"), "input"),
+    ("completion_tokens", ("gen_ai.usage.completion_tokens", "gen_ai.usage.output_tokens"), "output"),
+    ("total_tokens", ("gen_ai.usage.total_tokens",), None),
+    ("cache_read_tokens", ("gen_ai.usage.cache_read_input_tokens",), "cache_read"),
+    ("cache_write_tokens", ("gen_ai.usage.cache_write_input_tokens",), "cache_write"),
+)
+
+# Attributes, and the flattened attributes under them, that may hold serialized JSON.
+# input.value and output.value hold JSON when their mime_type says so.
+JSON_ATTRIBUTE_PREFIXES = (
+    "llm.input_messages", "llm.output_messages", "llm.invocation_parameters",
+    "metadata", "tool.metadata", TIMING_ATTRIBUTE_PREFIX,
+)
+
+# Strands attributes that are mapped elsewhere and never copied into metadata
+METADATA_SKIP_KEYS = frozenset({"gen_ai.prompt", "gen_ai.completion", "agent.tools", "gen_ai.agent.tools"})
+
+DATA_URI_PREFIX = re.compile(r"data:[\w.+-]+/[\w.+-]+;base64,")
+BASE64_PATTERN = re.compile(r"[A-Za-z0-9+/]+={0,2}")
+
+# Strands attributes holding JSON messages, parsed once by the content limits and
+# handed to _map_messages as objects
+MESSAGE_ATTRIBUTE_KEYS = ("gen_ai.prompt", "gen_ai.completion")
+
+
+def batch_queue_pressure(span_processor: SpanProcessor) -> Callable[[], float]:
+    """
+    Callable returning how full the queue of a BatchSpanProcessor is, from 0 to 1,
+    for StrandsToOpenInferenceProcessor(export_queue_pressure=...).
+    """
+    batch_processor = getattr(span_processor, "_batch_processor", span_processor)
+    queue = getattr(batch_processor, "_queue", None)
+    if queue is None:
+        queue = getattr(batch_processor, "queue", None)
+    if queue is None or not queue.maxlen:
+        raise ValueError(f"Cannot read the export queue of {type(span_processor).__name__}")
+    return lambda: len(queue) / queue.maxlen
+
+
+@lru_cache(maxsize=256)
+def json_key_fragment(key: str) -> str:
+    """JSON object member prefix '"key":' for a recurring message field name."""
+    return json.dumps(key) + ":"
+
+
+class FieldKeys(dict):
+    """
+    Interned keys "<prefix>.<field>" for one prefix, built on first lookup. The
+    number of remembered fields is capped, as they come from message contents.
+    """
+
+    __slots__ = ("prefix", "max_fields")
+
+    def __init__(self, prefix: str, max_fields: int = 256):
+        super().__init__()
+        self.prefix = prefix
+        self.max_fields = max_fields
+
+    def __missing__(self, field: str) -> str:
+        key = sys.intern(f"{self.prefix}.{field}")
+        if len(self) < self.max_fields:
+            self[field] = key
+        return key
+
+
+class FlattenedKeyTable:
+    """
+    Interned flattened attribute names such as "llm.input_messages.3.message.role",
+    so that mapping a message looks its keys up instead of formatting them.
+    """
+
+    def __init__(self, max_index: int = 1024):
+        self.max_index = max_index
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def for_index(self, prefix: str, idx: int) -> FieldKeys:
+        """Keys of the fields under "<prefix>.<idx>"."""
+        tables = self._tables.get(prefix)
+        if tables is not None and idx < len(tables):
+            return tables[idx]
+        if idx >= self.max_index:
+            return FieldKeys(f"{prefix}.{idx}")
+        # Tables are only ever appended to, under the lock, so lookups need none
+        with self._lock:
+            tables = self._tables.setdefault(prefix, [])
+            while len(tables) <= idx:
+                tables.append(FieldKeys(f"{prefix}.{len(tables)}"))
+            return tables[idx]
+
+
+FLATTENED_KEYS = FlattenedKeyTable()
+MESSAGE_FIELD_KEYS = FieldKeys("message")
+
+
+class TraceShard:
+    """
+    Bookkeeping of the traces hashed to one shard of the processor. Mutations, and
+    reads spanning several entries, hold the shard's lock; single lookups do not.
+    """
+
+    __slots__ = ("lock", "span_hierarchy", "trace_spans", "trace_llm_messages", "processed_spans")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.span_hierarchy = OrderedDict()
+        self.trace_spans = {}
+        self.trace_llm_messages = {}
+        self.processed_spans = set()
+
+
+class ShardedView:
+    """Read-only view of one TraceShard structure across all shards, for inspection."""
+
+    def __init__(self, shards: List[TraceShard], field: str):
+        self._parts = [getattr(shard, field) for shard in shards]
+
+    def __len__(self) -> int:
+        return sum(map(len, self._parts))
+
+    def __iter__(self):
+        for part in self._parts:
+            yield from list(part)
+
+    def __contains__(self, key) -> bool:
+        return any(key in part for part in self._parts)
+
+    def get(self, key, default=None):
+        for part in self._parts:
+            if key in part:
+                return part[key]
+        return default
+
+
+class KeyPatterns:
+    """
+    Attribute key patterns compiled for matching: exact keys go into a set and
+    patterns ending in "*" into a character trie of their prefixes. "*" alone
+    matches every key; a "*" anywhere else is rejected.
+    """
+
+    _END = ""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.exact = set()
+        self.trie = {}
+        self.match_all = False
+        for pattern in patterns:
+            prefix, wildcard, rest = pattern.partition("*")
+            if rest or (not wildcard and not prefix):
+                raise ValueError(f"Invalid attribute key pattern {pattern!r}: use a key or a prefix ending in '*'")
+            if not wildcard:
+                self.exact.add(pattern)
+            elif not prefix:
+                self.match_all = True
+            else:
+                node = self.trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node[self._END] = True
+
+    def __contains__(self, key: str) -> bool:
+        if self.match_all or key in self.exact:
+            return True
+        node = self.trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+
+class MetadataKeyFilter(dict):
+    """
+    Whether an attribute key may be copied into metadata: it matches the allowlist,
+    when there is one, and not the denylist. Decisions are memoized per key, up to
+    max_keys distinct keys.
+    """
+
+    __slots__ = ("allowlist", "denylist", "max_keys")
+
+    def __init__(self, allowlist: Optional[Iterable[str]] = None, denylist: Optional[Iterable[str]] = None,
+                 max_keys: int = 4096):
+        super().__init__()
+        self.allowlist = KeyPatterns(allowlist) if allowlist is not None else None
+        self.denylist = KeyPatterns(denylist or ())
+        self.max_keys = max_keys
+
+    def __missing__(self, key: str) -> bool:
+        allowed = (self.allowlist is None or key in self.allowlist) and key not in self.denylist
+        if len(self) < self.max_keys:
+            self[key] = allowed
+        return allowed
+
+
+class JsonSerializer:
+    """
+    Compact JSON encoder used by the processor for attribute values. Produces the
+    same output as json.dumps(value, separators=(",", ":")).
+    """
+
+    name = "json"
+
+    def dumps(self, value: Any) -> str:
+        """Serialize a value to a compact JSON string."""
+        return json.dumps(value, separators=(",", ":"))
+
+
 class StrandsToOpenInferenceProcessor(SpanProcessor):
     """
     SpanProcessor that converts Strands telemetry attributes to OpenInference format
     for compatibility with Arize AI.
     """
 
-    def __init__(self, debug: bool = False):
+    def __init__(
+        self,
+        debug: bool = False,
+        max_tracked_spans: int = 10000,
+        defer_transform: bool = False,
+        json_serializer: Optional[JsonSerializer] = None,
+        max_content_bytes: Optional[int] = None,
+        max_attribute_bytes: Optional[int] = None,
+        attribute_byte_budgets: Optional[Dict[str, int]] = None,
+        strip_binary: bool = False,
+        binary_min_bytes: int = 256,
+        delta_messages: bool = False,
+        dedup_content: bool = False,
+        dedup_window_seconds: Optional[float] = None,
+        max_dedup_entries: int = 10000,
+        meter_provider: Optional[MeterProvider] = None,
+        export_queue_pressure: Optional[Callable[[], float]] = None,
+        truncate_pressure: float = 0.5,
+        minimal_pressure: float = 0.8,
+        degraded_content_bytes: int = 1024,
+        trace_timing: bool = False,
+        shards: int = 16,
+        metadata_allowlist: Optional[Iterable[str]] = None,
+        metadata_denylist: Optional[Iterable[str]] = None,
+        trace_usage: bool = False,
+        token_prices: Optional[Dict[str, Dict[str, float]]] = None,
+        span_metrics: bool = False,
+    ):
         """
         Initialize the processor.
         
         Args:
             debug: Whether to log debug information
+            max_tracked_spans: Hard cap on the spans kept in the span hierarchy.
+                Entries are normally released when their trace's root span ends;
+                past this cap the least recently used spans are evicted, a span
+                being used when it starts, ends, or one of its children does.
+            defer_transform: Only track the span hierarchy in on_end and leave the
+                transform to a StrandsToOpenInferenceSpanExporter wrapping the
+                exporter of a BatchSpanProcessor.
+            json_serializer: Encoder for JSON attribute values, a JsonSerializer
+                or any object with the same dumps method. Defaults to the
+                standard library.
+            max_content_bytes: Byte budget for each text value inside prompts,
+                completions, tool payloads and metadata. Longer text keeps its head
+                and tail around a truncation marker, so JSON payloads stay valid.
+            max_attribute_bytes: Byte budget for every string attribute written
+                by the processor, applied after serialization.
+            attribute_byte_budgets: Per-attribute overrides of max_attribute_bytes,
+                keyed by attribute name prefix (e.g. "llm.input_messages").
+            strip_binary: Replace base64 and binary content, such as image or
+                document blocks, with a placeholder carrying its size and hash.
+            binary_min_bytes: Shortest string considered for base64 detection.
+            delta_messages: Emit on each LLM span only the input messages added
+                since the previous LLM span of the trace, plus an offset and a
+                reference to that span, so trace size grows linearly with turns.
+            dedup_content: Emit tool definitions and system prompts in full only the
+                first time their content hash is seen; later spans carry just the
+                hash in llm.tools_hash or <attribute>_hash.
+            dedup_window_seconds: Scope of deduplication. None deduplicates within a
+                trace; a number deduplicates across traces for that many seconds.
+            max_dedup_entries: Cap on remembered content hashes, evicted LRU.
+            meter_provider: MeterProvider for the processor's own metrics. Defaults
+                to the global provider.
+            export_queue_pressure: Callable returning how full the export queue is,
+                from 0 to 1, see batch_queue_pressure. When set, content is reduced
+                as the queue fills instead of having whole spans dropped.
+            truncate_pressure: Queue fill from which message and tool content is
+                truncated to degraded_content_bytes per text value.
+            minimal_pressure: Queue fill from which spans only carry their kind,
+                graph node, model, token counts, invocation parameters, session
+                and timings.
+            degraded_content_bytes: Content byte budget at truncated fidelity.
+            trace_timing: Add a timing summary of the whole trace to its root span:
+                time in LLM calls and tools, time per tool and the critical path.
+                Off by default, as it tracks every span until the root ends.
+            shards: Number of lock-striped shards holding the per-trace bookkeeping.
+                All spans of a trace map to the same shard, so threads ending spans
+                of different traces rarely wait on each other.
+            metadata_allowlist: Patterns of the leftover attributes copied into the
+                metadata attribute; all of them when None. A pattern is an exact
+                key, or a prefix ending in "*" such as "aws.*".
+            metadata_denylist: Patterns of leftover attributes never copied into
+                metadata, checked after the allowlist.
+            trace_usage: Add the token counts of all LLM spans of the trace,
+                including cache reads and writes, to its root span. Off by default.
+            token_prices: USD per million tokens by model id, as a dict with
+                "input", "output", "cache_read" and "cache_write" entries (missing
+                entries cost nothing), used to add an estimated trace cost.
+            span_metrics: Record the transform duration and attribute sizes of every
+                span as histograms. Off by default, as sizing the attributes walks
+                them twice per span; cache evictions, degraded spans and failures
+                are counted either way.
         """
         super().__init__()
         self.debug = debug
-        self.processed_spans = set()
+        self.defer_transform = defer_transform
+        self.json_serializer = json_serializer or JsonSerializer()
+        self.max_content_bytes = max_content_bytes
+        self.max_attribute_bytes = max_attribute_bytes
+        self.attribute_byte_budgets = sorted(
+            (attribute_byte_budgets or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.strip_binary = strip_binary
+        self.binary_min_bytes = binary_min_bytes
+        self.delta_messages = delta_messages
+        self.dedup_content = dedup_content
+        self.dedup_window_seconds = dedup_window_seconds
+        self.max_dedup_entries = max_dedup_entries
+        self.content_hashes = OrderedDict()
+        self.trace_digests: Dict[int, Set[str]] = {}
+        self._dedup_lock = threading.Lock()
+        self.max_tracked_spans = max_tracked_spans
         self.current_cycle_id = None
-        self.span_hierarchy = {}
+        self.trace_shards = [TraceShard() for _ in range(max(1, shards))]
+        self._shard_hierarchies = [shard.span_hierarchy for shard in self.trace_shards]
+        self.export_queue_pressure = export_queue_pressure
+        self.truncate_pressure = truncate_pressure
+        self.minimal_pressure = minimal_pressure
+        self.degraded_content_bytes = degraded_content_bytes
+        self.trace_timing = trace_timing
+        self.trace_usage = trace_usage
+        self.token_prices = token_prices or {}
+        self.span_metrics = span_metrics
+        self.metadata_key_filter = None
+        if metadata_allowlist is not None or metadata_denylist:
+            self.metadata_key_filter = MetadataKeyFilter(metadata_allowlist, metadata_denylist)
+        self._create_instruments(meter_provider)
+
+    def _create_instruments(self, meter_provider: Optional[MeterProvider]):
+        """Create the metrics describing the processor's own overhead."""
+        meter = metrics.get_meter(__name__, meter_provider=meter_provider)
+        self.transform_duration = meter.create_histogram(
+            "strands_openinference.transform.duration",
+            unit="ms",
+            description="Time spent transforming a span to OpenInference format",
+        )
+        self.attribute_size = meter.create_histogram(
+            "strands_openinference.attribute.size",
+            unit="By",
+            description="Approximate size of span attributes before (in) and after (out) the transform",
+        )
+        self.evictions = meter.create_counter(
+            "strands_openinference.evictions",
+            description="Entries evicted from the processor caches because they reached their cap",
+        )
+        self.degraded_spans = meter.create_counter(
+            "strands_openinference.degraded_spans",
+            description="Spans transformed at reduced fidelity because the export queue was filling up",
+        )
+        self.serialization_failures = meter.create_counter(
+            "strands_openinference.serialization.failures",
+            description="Values that could not be JSON serialized, and spans whose transform failed",
+        )
+        meter.create_observable_gauge(
+            "strands_openinference.spans_in_flight",
+            callbacks=[self._observe_spans_in_flight],
+            description="Spans currently tracked in the span hierarchy",
+        )
+
+    def _observe_spans_in_flight(self, options):
+        """Callback reporting the size of the span hierarchy."""
+        return [Observation(self._tracked_span_count())]
+
+    @property
+    def span_hierarchy(self) -> ShardedView:
+        """Tracked spans by span id, across all shards."""
+        return ShardedView(self.trace_shards, "span_hierarchy")
+
+    @property
+    def trace_spans(self) -> ShardedView:
+        """Ids of the tracked spans by trace id, across all shards."""
+        return ShardedView(self.trace_shards, "trace_spans")
+
+    @property
+    def trace_llm_messages(self) -> ShardedView:
+        """Last LLM span id and message digests by trace id, across all shards."""
+        return ShardedView(self.trace_shards, "trace_llm_messages")
+
+    @property
+    def processed_spans(self) -> ShardedView:
+        """Ids of the tracked spans already transformed, across all shards."""
+        return ShardedView(self.trace_shards, "processed_spans")
+
+    def _shard(self, trace_id: int) -> TraceShard:
+        """The shard holding the bookkeeping of a trace."""
+        return self.trace_shards[trace_id % len(self.trace_shards)]
+
+    def _span_info(self, span_context) -> Optional[Dict[str, Any]]:
+        """Hierarchy entry of a span, or None when it is not tracked."""
+        return self._shard(span_context.trace_id).span_hierarchy.get(span_context.span_id)
+
+    def _tracked_span_count(self) -> int:
+        return sum(map(len, self._shard_hierarchies))
 
     def on_start(self, span, parent_context=None):
         """Called when a span is started. Track span hierarchy."""
-        span_id = span.get_span_context().span_id
+        span_context = span.get_span_context()
+        span_id = span_context.span_id
+        trace_id = span_context.trace_id
         parent_id = None
         
         if parent_context and hasattr(parent_context, 'span_id'):
@@ -44,48 +471,366 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         elif span.parent and hasattr(span.parent, 'span_id'):
             parent_id = span.parent.span_id
             
-        self.span_hierarchy[span_id] = {
+        span_info = {
             'name': span.name,
             'span_id': span_id,
+            'trace_id': trace_id,
             'parent_id': parent_id,
             'start_time': datetime.now().isoformat()
         }
+        shard = self._shard(trace_id)
+        with shard.lock:
+            shard.span_hierarchy[span_id] = span_info
+            shard.trace_spans.setdefault(trace_id, set()).add(span_id)
+            if parent_id in shard.span_hierarchy:
+                shard.span_hierarchy.move_to_end(parent_id)
+        
+        if self._tracked_span_count() > self.max_tracked_spans:
+            self._evict_spans()
+
+    def _evict_spans(self):
+        """
+        Evict the least recently used spans of the fullest shard until the span
+        hierarchy is back under its cap. Only one shard lock is held at a time.
+        """
+        while self._tracked_span_count() > self.max_tracked_spans:
+            shard = max(self.trace_shards, key=lambda shard: len(shard.span_hierarchy))
+            with shard.lock:
+                if not shard.span_hierarchy:
+                    continue
+                evicted_id, evicted_info = shard.span_hierarchy.popitem(last=False)
+                self._forget_span(shard, evicted_id, evicted_info.get('trace_id'))
+            self.evictions.add(1, {"cache": "span_hierarchy"})
+            if self.debug:
+                logger.info("Evicted span %s from span hierarchy (cap %d)", evicted_id, self.max_tracked_spans)
+
+    def _touch_span(self, trace_id: int, span_id: int, parent_id: Optional[int]):
+        """Mark an ended span and its parent as the most recently used of their shard."""
+        shard = self._shard(trace_id)
+        with shard.lock:
+            span_hierarchy = shard.span_hierarchy
+            if span_id in span_hierarchy:
+                span_hierarchy.move_to_end(span_id)
+            if parent_id in span_hierarchy:
+                span_hierarchy.move_to_end(parent_id)
+
+    def _is_root_span(self, span: Span) -> bool:
+        """A span is the local root of its trace when it has no parent in this process."""
+        return span.parent is None or getattr(span.parent, 'is_remote', False)
+
+    def _forget_span(self, shard: TraceShard, span_id: int, trace_id: Optional[int]):
+        """Drop the per-trace and processed bookkeeping for a single span. Called with the shard's lock held."""
+        shard.processed_spans.discard(span_id)
+        trace_span_ids = shard.trace_spans.get(trace_id)
+        if trace_span_ids is not None:
+            trace_span_ids.discard(span_id)
+            if not trace_span_ids:
+                del shard.trace_spans[trace_id]
+                shard.trace_llm_messages.pop(trace_id, None)
+
+    def _release_trace(self, trace_id: int):
+        """Release every tracked entry of a trace once its root span has ended."""
+        shard = self._shard(trace_id)
+        with shard.lock:
+            shard.trace_llm_messages.pop(trace_id, None)
+            for span_id in shard.trace_spans.pop(trace_id, ()):
+                shard.span_hierarchy.pop(span_id, None)
+                shard.processed_spans.discard(span_id)
+        if self.trace_digests:
+            with self._dedup_lock:
+                for digest in self.trace_digests.pop(trace_id, ()):
+                    self.content_hashes.pop((trace_id, digest), None)
 
     def on_end(self, span: Span):
         """
         Called when a span ends. Transform the span attributes from Strands format
         to OpenInference format.
         """
-        if not hasattr(span, '_attributes') or not span._attributes:
+        span_context = span.get_span_context()
+        span_id = span_context.span_id
+        span_info = self._span_info(span_context)
+        if span_info is not None:
+            self._touch_span(span_context.trace_id, span_id, span_info['parent_id'])
+            if self.trace_timing or self.trace_usage:
+                self._record_span_end(span, span_info)
+
+        if self.defer_transform:
             return
 
-        original_attrs = dict(span._attributes)
-        span_id = span.get_span_context().span_id
-        
-        if span_id in self.span_hierarchy:
-            self.span_hierarchy[span_id]['attributes'] = original_attrs
+        try:
+            self._process_span_end(span, span_id, span_info)
+        finally:
+            if self._is_root_span(span):
+                self._release_trace(span_context.trace_id)
+
+    def _process_span_end(self, span: Span, span_id: int, span_info: Optional[Dict[str, Any]]):
+        """Transform the attributes of an ended span in place."""
+        transformed_attrs = self._transform_span(span, span_id, span_info)
+        if transformed_attrs is not None:
+            self._replace_attributes(span, transformed_attrs)
+
+    def _transform_span(self, span: Span, span_id: int, span_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Compute the OpenInference attributes of an ended span. Returns None when the
+        span has no attributes or the transform failed, in which case the original
+        attributes should be kept.
+        """
+        if not hasattr(span, '_attributes') or not span._attributes:
+            return None
+
+        # Read-only view of the stored attributes; the transform never mutates it
+        original_attrs = self._attribute_view(span._attributes)
         
         try:
             if "event_loop.cycle_id" in original_attrs:
                 self.current_cycle_id = original_attrs.get("event_loop.cycle_id")
             
+            started = time.perf_counter()
             transformed_attrs = self._transform_attributes(original_attrs, span)
-            span._attributes.clear()
-            span._attributes.update(transformed_attrs)
-            self.processed_spans.add(span_id)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if span_info is not None:
+                shard = self._shard(span_info['trace_id'])
+                with shard.lock:
+                    shard.processed_spans.add(span_id)
+            
+            if (self.trace_timing or self.trace_usage) and self._is_root_span(span):
+                root_info, infos = self._trace_span_infos(span)
+                if self.trace_timing:
+                    self._add_trace_timing(root_info, infos, transformed_attrs)
+                if self.trace_usage:
+                    self._add_trace_usage(infos, transformed_attrs)
+            
+            if self.span_metrics:
+                kind = {"openinference.span.kind": transformed_attrs["openinference.span.kind"]}
+                self.transform_duration.record(elapsed_ms, kind)
+                self.attribute_size.record(self._attribute_size(original_attrs), {**kind, "direction": "in"})
+                self.attribute_size.record(self._attribute_size(transformed_attrs), {**kind, "direction": "out"})
             
             if self.debug:
-                logger.info(f"Transformed span '{span.name}': {len(original_attrs)} -> {len(transformed_attrs)} attributes")
+                logger.info("Transformed span '%s': %d -> %d attributes in %.3f ms",
+                            span.name, len(original_attrs), len(transformed_attrs), elapsed_ms)
+            return transformed_attrs
                 
         except Exception as e:
-            logger.error(f"Failed to transform span '{span.name}': {e}", exc_info=True)
-            span._attributes.clear()
-            span._attributes.update(original_attrs)
+            self.serialization_failures.add(1, {"stage": "span"})
+            logger.error("Failed to transform span '%s': %s", span.name, e, exc_info=True)
+            return None
+
+    def _record_span_end(self, span: Span, span_info: Dict[str, Any]):
+        """Keep what the trace timing and usage summaries need from an ended span."""
+        attributes = span.attributes or {}
+        span_info['start_ns'] = span.start_time
+        span_info['end_ns'] = span.end_time
+        span_info['kind'] = self._determine_span_kind(span, attributes)
+        if span_info['kind'] == "TOOL":
+            span_info['tool_name'] = attributes.get("tool.name") or span.name.replace("Tool:", "", 1).strip()
+        elif span_info['kind'] == "LLM" and self.trace_usage:
+            usage = {}
+            for field, keys, _ in USAGE_FIELDS:
+                for key in keys:
+                    value = attributes.get(key)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        usage[field] = value
+                        break
+            if usage:
+                span_info['usage'] = usage
+                span_info['model'] = attributes.get("gen_ai.request.model")
+
+    def _trace_span_infos(self, span: Span):
+        """Snapshot of the hierarchy entries of a root span and of every span of its trace."""
+        span_context = span.get_span_context()
+        shard = self._shard(span_context.trace_id)
+        with shard.lock:
+            root_info = shard.span_hierarchy.get(span_context.span_id)
+            infos = [shard.span_hierarchy.get(span_id) for span_id in shard.trace_spans.get(span_context.trace_id, ())]
+        return root_info, [info for info in infos if info is not None]
+
+    def _add_trace_timing(self, root_info: Optional[Dict[str, Any]], infos: List[Dict[str, Any]],
+                          result: Dict[str, Any]):
+        """
+        Summarize the timings of the ended spans of the root span's trace: total
+        time in LLM calls and in tools, time and count per tool, and the critical
+        path from the root down through cycles as [span name, ms] segments.
+        """
+        if root_info is None or 'end_ns' not in root_info:
+            return
+        
+        llm_ns = tool_ns = 0
+        tools = {}
+        children = {}
+        for info in infos:
+            if 'end_ns' not in info:
+                continue
+            duration = info['end_ns'] - info['start_ns']
+            if info['kind'] == "LLM":
+                llm_ns += duration
+            elif info['kind'] == "TOOL":
+                tool_ns += duration
+                tool = tools.setdefault(info['tool_name'], {"count": 0, "ms": 0.0})
+                tool["count"] += 1
+                tool["ms"] += duration / 1e6
+            children.setdefault(info['parent_id'], []).append(info)
+        
+        for tool in tools.values():
+            tool["ms"] = round(tool["ms"], 3)
+        path = []
+        self._critical_path(root_info, root_info['start_ns'], root_info['end_ns'], children, path)
+        segments = []
+        for name, duration in reversed(path):
+            if segments and segments[-1][0] == name:
+                segments[-1][1] += duration
+            else:
+                segments.append([name, duration])
+        
+        result[TIMING_ATTRIBUTE_PREFIX + "llm_ms"] = round(llm_ns / 1e6, 3)
+        result[TIMING_ATTRIBUTE_PREFIX + "tool_ms"] = round(tool_ns / 1e6, 3)
+        if tools:
+            result[TIMING_ATTRIBUTE_PREFIX + "tools"] = self.json_serializer.dumps(tools)
+        result[TIMING_ATTRIBUTE_PREFIX + "critical_path"] = self.json_serializer.dumps(
+            [[name, round(duration / 1e6, 3)] for name, duration in segments]
+        )
+
+    def _add_trace_usage(self, infos: List[Dict[str, Any]], result: Dict[str, Any]):
+        """
+        Sum the token counts of the LLM spans of the root span's trace, and estimate
+        their cost from token_prices. Models without a price are listed instead.
+        """
+        totals = dict.fromkeys((field for field, _, _ in USAGE_FIELDS), 0)
+        llm_calls = 0
+        cost = 0.0
+        unpriced_models = set()
+        for info in infos:
+            usage = info.get('usage')
+            if usage is None:
+                continue
+            llm_calls += 1
+            for field, value in usage.items():
+                totals[field] += value
+            if 'total_tokens' not in usage:
+                totals['total_tokens'] += usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+            if not self.token_prices:
+                continue
+            prices = self.token_prices.get(info['model'])
+            if prices is None:
+                unpriced_models.add(str(info['model']))
+                continue
+            for field, _, price_key in USAGE_FIELDS:
+                if price_key is not None:
+                    cost += usage.get(field, 0) * prices.get(price_key, 0.0) / 1e6
+        if not llm_calls:
+            return
+        
+        result[USAGE_ATTRIBUTE_PREFIX + "llm_calls"] = llm_calls
+        for field, value in totals.items():
+            result[USAGE_ATTRIBUTE_PREFIX + field] = value
+        if self.token_prices:
+            result[USAGE_ATTRIBUTE_PREFIX + "cost_usd"] = round(cost, 6)
+        if unpriced_models:
+            result[USAGE_ATTRIBUTE_PREFIX + "unpriced_models"] = tuple(sorted(unpriced_models))
+
+    def _critical_path(self, info: Dict[str, Any], start: int, end: int, children: Dict[int, list], path: list):
+        """
+        Append to path, latest first, the (span name, ns) segments of the critical
+        path of a span within [start, end]: walking back from its end, the child that
+        finished last is on the path, then the last one to finish before that child
+        started, and so on. Time not covered by a child belongs to the span itself.
+        """
+        cursor = end
+        for child in sorted(children.get(info['span_id'], ()), key=lambda child: child['end_ns'], reverse=True):
+            if cursor <= start:
+                break
+            if child['start_ns'] >= cursor:
+                continue
+            child_end = min(child['end_ns'], cursor)
+            if child_end < cursor:
+                path.append((info['name'], cursor - child_end))
+            child_start = max(child['start_ns'], start)
+            self._critical_path(child, child_start, child_end, children, path)
+            cursor = child_start
+        if cursor > start:
+            path.append((info['name'], cursor - start))
+
+    def _attribute_size(self, attrs: Dict[str, Any]) -> int:
+        """Cheap size estimate of attributes: text length of keys and string values."""
+        return sum(len(key) + (len(value) if isinstance(value, str) else 8) for key, value in attrs.items())
+
+    def _attribute_view(self, attributes: Mapping[str, Any]) -> Mapping[str, Any]:
+        """The plain dict behind BoundedAttributes, avoiding its per-key accessors."""
+        stored = getattr(attributes, '_dict', None)
+        return stored if isinstance(stored, dict) else attributes
+
+    def _replace_attributes(self, span: Span, attrs: Dict[str, Any]):
+        """
+        Rewrite the span attributes in place: Strands-only keys are deleted and
+        OpenInference keys are written into the stored dict. Values of primitive
+        types need no cleaning, so only other values go through BoundedAttributes
+        validation. Recent SDKs freeze the attributes before on_end runs, so the
+        immutability flag is lifted for the rewrite.
+        """
+        span_attributes = span._attributes
+        stored = self._attribute_view(span_attributes)
+        if stored is span_attributes or getattr(span_attributes, 'max_value_len', None) is not None:
+            # Values may need truncating, so every value goes through the validated path
+            self._rewrite_attributes(span_attributes, attrs.items(), clear=True)
+            return
+
+        items = attrs.items()
+        maxlen = getattr(span_attributes, 'maxlen', None)
+        if maxlen is not None and len(attrs) > maxlen:
+            # Same outcome as inserting every key into the full dict: the oldest are dropped
+            overflow = len(attrs) - maxlen
+            items = list(items)[overflow:]
+            span_attributes.dropped += overflow
+            logger.warning("Span '%s' exceeds the attribute limit of %d, dropping %d attributes",
+                           span.name, maxlen, overflow)
+            stored.clear()
+        else:
+            for key in [key for key in stored if key not in attrs]:
+                del stored[key]
+
+        unchecked = []
+        for key, value in items:
+            if type(value) in (str, int, float, bool):
+                stored[key] = value
+            else:
+                unchecked.append((key, value))
+        if unchecked:
+            self._rewrite_attributes(span_attributes, unchecked)
+
+    def _rewrite_attributes(self, span_attributes, items, clear: bool = False):
+        """Set attributes through BoundedAttributes validation, lifting immutability."""
+        immutable = getattr(span_attributes, '_immutable', False)
+        if immutable:
+            span_attributes._immutable = False
+        try:
+            if clear:
+                span_attributes.clear()
+            for key, value in items:
+                span_attributes[key] = value
+        finally:
+            if immutable:
+                span_attributes._immutable = True
 
     def _transform_attributes(self, attrs: Dict[str, Any], span: Span) -> Dict[str, Any]:
         """
         Transform Strands attributes to OpenInference format.
         """
+        fidelity = self._current_fidelity()
+        if fidelity == FIDELITY_MINIMAL:
+            return self._minimal_attributes(attrs, span)
+        
+        content_bytes = self.max_content_bytes
+        if fidelity == FIDELITY_TRUNCATED:
+            content_bytes = min(content_bytes or self.degraded_content_bytes, self.degraded_content_bytes)
+        parsed_messages = {}
+        if self.strip_binary or content_bytes is not None:
+            attrs = {
+                key: self._limit_attribute_value(
+                    value, content_bytes, parsed_messages if key in MESSAGE_ATTRIBUTE_KEYS else None, key
+                )
+                for key, value in attrs.items()
+            }
+        
         result = {}
         span_kind = self._determine_span_kind(span, attrs)
         result["openinference.span.kind"] = span_kind
@@ -114,13 +859,13 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         
         # Handle different span types
         if span_kind == "LLM":
-            self._handle_chain_and_llm_span(attrs, result, prompt, completion)
+            self._handle_chain_and_llm_span(attrs, result, prompt, completion, span, parsed_messages)
         elif span_kind == "TOOL":
             self._handle_tool_span(attrs, result)
         elif span_kind == "AGENT":
-            self._handle_agent_span(attrs, result, prompt)
+            self._handle_agent_span(attrs, result, prompt, span)
         elif span_kind == "CHAIN":
-            self._handle_chain_and_llm_span(attrs, result, prompt, completion)
+            self._handle_chain_and_llm_span(attrs, result, prompt, completion, parsed_messages=parsed_messages)
         
         # Handle token usage
         self._map_token_usage(attrs, result)
@@ -135,21 +880,55 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             if key in attrs:
                 result[key] = attrs[key]
         
-        self._add_metadata(attrs, result)    
+        deduplicated_keys = self._dedup_attributes(attrs, result, span) if self.dedup_content else ()
+        self._add_metadata(attrs, result, deduplicated_keys)
+        
+        if self.max_attribute_bytes is not None or self.attribute_byte_budgets:
+            self._apply_attribute_budgets(result)
+        if fidelity != FIDELITY_FULL:
+            result[FIDELITY_ATTRIBUTE] = fidelity
+        return result
+
+    def _current_fidelity(self) -> str:
+        """Fidelity level for the next span, from the fill of the export queue."""
+        if self.export_queue_pressure is None:
+            return FIDELITY_FULL
+        pressure = self.export_queue_pressure()
+        if pressure >= self.minimal_pressure:
+            fidelity = FIDELITY_MINIMAL
+        elif pressure >= self.truncate_pressure:
+            fidelity = FIDELITY_TRUNCATED
+        else:
+            return FIDELITY_FULL
+        self.degraded_spans.add(1, {"fidelity": fidelity})
+        return fidelity
+
+    def _minimal_attributes(self, attrs: Dict[str, Any], span: Span) -> Dict[str, Any]:
+        """
+        Cheap, high-value attributes only: enough for latency, token and cost
+        dashboards, without messages, tool payloads or metadata.
+        """
+        result = {"openinference.span.kind": self._determine_span_kind(span, attrs)}
+        self._set_graph_node_attributes(span, attrs, result)
+        if model_id := attrs.get("gen_ai.request.model"):
+            result["llm.model_name"] = model_id
+        self._map_token_usage(attrs, result)
+        self._map_invocation_parameters(attrs, result)
+        for key in MINIMAL_FIDELITY_KEYS:
+            if key in attrs:
+                result[key] = attrs[key]
+        result[FIDELITY_ATTRIBUTE] = FIDELITY_MINIMAL
         return result
     
     def _determine_span_kind(self, span: Span, attrs: Dict[str, Any]) -> str:
         """Determine the OpenInference span kind."""
         span_name = span.name
-        
         if "Model invoke" in span_name:
             return "LLM"
-        elif span_name.startswith("Tool:"):
+        if span_name.startswith("Tool:"):
             return "TOOL"
-        elif attrs.get("agent.name") or attrs.get("gen_ai.agent.name"):
+        if attrs.get("agent.name") or attrs.get("gen_ai.agent.name"):
             return "AGENT"
-        elif "Cycle" in span_name:
-            return "CHAIN"
         return "CHAIN"
     
     def _set_graph_node_attributes(self, span: Span, attrs: Dict[str, Any], result: Dict[str, Any]):
@@ -159,12 +938,14 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         """
         span_name = span.name
         span_kind = result["openinference.span.kind"]        
-        span_id = span.get_span_context().span_id
+        span_context = span.get_span_context()
+        span_id = span_context.span_id
         
-        # Get parent information from span hierarchy
-        span_info = self.span_hierarchy.get(span_id, {})
+        # Get parent information from span hierarchy; a parent always shares the span's shard
+        span_hierarchy = self._shard(span_context.trace_id).span_hierarchy
+        span_info = span_hierarchy.get(span_id, {})
         parent_id = span_info.get('parent_id')
-        parent_info = self.span_hierarchy.get(parent_id, {}) if parent_id else {}
+        parent_info = span_hierarchy.get(parent_id, {}) if parent_id else {}
         parent_name = parent_info.get('name', '')
         
         if span_kind == "AGENT":
@@ -193,28 +974,49 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             else:
                 result["graph.node.parent_id"] = "strands_agent"
 
-        if self.debug:
-            logger.info(f"span_name: {span_name}")
-            logger.info(f"span_kind: {span_kind}")
-            logger.info(f"span_id: {span_id}")
-            logger.info(f"span_info: {span_info}")
-            logger.info(f"parent_id: {parent_id}")
-            logger.info(f"parent_info: {parent_info}")
-            logger.info(f"parent_name: {parent_name}")
-            logger.info("==========================")
-            logger.info(f"Span: {span_name} || (ID: {span_id})")
-            logger.info(f"  Parent: {parent_name} || (ID: {parent_id})")
-            logger.info(f"  Graph Node: {result.get('graph.node.id')} -> Parent: {result.get('graph.node.parent_id')}")
-
-    def _handle_chain_and_llm_span(self, attrs: Dict[str, Any], result: Dict[str, Any], prompt: Any, completion: Any):
-        """Handle LLM-specific attributes."""
+        if self.debug and logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Span: %s (%s, ID: %s) || Parent: %s (ID: %s) || Graph Node: %s -> Parent: %s",
+                span_name, span_kind, span_id, parent_name, parent_id,
+                result.get('graph.node.id'), result.get('graph.node.parent_id'),
+                extra={
+                    "span_name": span_name,
+                    "span_kind": span_kind,
+                    "span_id": span_id,
+                    "parent_id": parent_id,
+                    "parent_name": parent_name,
+                    "graph_node_id": result.get('graph.node.id'),
+                    "graph_node_parent_id": result.get('graph.node.parent_id'),
+                },
+            )
+
+    def _handle_chain_and_llm_span(
+        self,
+        attrs: Dict[str, Any],
+        result: Dict[str, Any],
+        prompt: Any,
+        completion: Any,
+        span: Optional[Span] = None,
+        parsed_messages: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Handle LLM-specific attributes. parsed_messages holds prompt and completion
+        values already parsed from JSON by the content limits, by attribute name.
+        """
+        input_messages = None
+        output_messages = None
+        parsed_messages = parsed_messages or {}
+        
         if prompt:
-            self._map_messages(prompt, result, is_input=True)
+            delta_span = span if self.delta_messages else None
+            input_messages = self._map_messages(parsed_messages.get("gen_ai.prompt", prompt), result,
+                                                is_input=True, delta_span=delta_span)
         
         if completion:
-            self._map_messages(completion, result, is_input=False)
+            output_messages = self._map_messages(parsed_messages.get("gen_ai.completion", completion), result,
+                                                 is_input=False)
         
-        self._add_input_output_values(attrs, result)
+        self._add_input_output_values(attrs, result, input_messages, output_messages)
         self._map_invocation_parameters(attrs, result)
     
     def _handle_tool_span(self, attrs: Dict[str, Any], result: Dict[str, Any]):
@@ -232,22 +1034,23 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             result["tool.description"] = tool_description
         
         if tool_params := attrs.get("tool.parameters"):
-            result["tool.parameters"] = self._serialize_value(tool_params)
+            serialized_params = self._serialize_value(tool_params)
+            result["tool.parameters"] = serialized_params
             tool_call = {
                 "tool_call.id": attrs.get("tool.id", ""),
                 "tool_call.function.name": attrs.get("tool.name", ""),
-                "tool_call.function.arguments": self._serialize_value(tool_params)
+                "tool_call.function.arguments": serialized_params
             }
             
             input_message = {
                 "message.role": "assistant",
                 "message.tool_calls": [tool_call]
             }
-            result["llm.input_messages"] = json.dumps([input_message], separators=(",", ":"))
+            result["llm.input_messages"] = self.json_serializer.dumps([input_message])
             result["llm.input_messages.0.message.role"] = "assistant"
             result["tool_call.id"] = attrs.get("tool.id", "")
             result["tool_call.function.name"] = attrs.get("tool.name", "")
-            result["tool_call.function.arguments"] = self._serialize_value(tool_params)
+            result["tool_call.function.arguments"] = serialized_params
         
             for key, value in tool_call.items():
                 result[f"llm.input_messages.0.message.tool_calls.0.{key}"] = value
@@ -261,17 +1064,18 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 if "error" in tool_result:
                     result["tool.error"] = self._serialize_value(tool_result.get("error"))
 
+            serialized_content = self._serialize_value(tool_result_content)
             output_message = {
                 "message.role": "tool",
-                "message.content": self._serialize_value(tool_result_content),
+                "message.content": serialized_content,
                 "message.tool_call_id": attrs.get("tool.id", "")
             }
 
             if tool_name := attrs.get("tool.name"):
                 output_message["message.name"] = tool_name
-            result["llm.output_messages"] = json.dumps([output_message], separators=(",", ":"))
+            result["llm.output_messages"] = self.json_serializer.dumps([output_message])
             result["llm.output_messages.0.message.role"] = "tool"
-            result["llm.output_messages.0.message.content"] = self._serialize_value(tool_result_content)
+            result["llm.output_messages.0.message.content"] = serialized_content
             result["llm.output_messages.0.message.tool_call_id"] = attrs.get("tool.id", "")
             
             if tool_name:
@@ -289,29 +1093,41 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 tool_metadata[key] = self._serialize_value(value)
         
         if tool_metadata:
-            result["tool.metadata"] = json.dumps(tool_metadata, separators=(",", ":"))
+            result["tool.metadata"] = self.json_serializer.dumps(tool_metadata)
     
-    def _handle_agent_span(self, attrs: Dict[str, Any], result: Dict[str, Any], prompt: Any):
+    def _handle_agent_span(self, attrs: Dict[str, Any], result: Dict[str, Any], prompt: Any, span: Optional[Span] = None):
         """Handle agent-specific attributes."""
         result["llm.system"] = "strands-agents"
         result["llm.provider"] = "strands-agents"
         
         if tools := (attrs.get("agent.tools") or attrs.get("gen_ai.agent.tools")):
-            self._map_tools(tools, result)
+            self._map_tools(tools, result, span)
         
         if prompt:
             input_message = {
                 "message.role": "user",
                 "message.content": str(prompt)
             }
-            result["llm.input_messages"] = json.dumps([input_message], separators=(",", ":"))
+            result["llm.input_messages"] = self.json_serializer.dumps([input_message])
             result["input.value"] = str(prompt)
             result["llm.input_messages.0.message.role"] = "user"
             result["llm.input_messages.0.message.content"] = str(prompt)
         self._add_input_output_values(attrs, result)  
     
-    def _map_messages(self, messages_data: Any, result: Dict[str, Any], is_input: bool):
-        """Map Strands messages to OpenInference message format."""
+    def _map_messages(
+        self,
+        messages_data: Any,
+        result: Dict[str, Any],
+        is_input: bool,
+        delta_span: Optional[Span] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Map Strands messages to OpenInference message format. Returns the normalized
+        messages so callers can build further values without re-parsing the JSON.
+        
+        With delta_span set, only the messages added since the previous LLM span of
+        the same trace are emitted, see _delta_offset.
+        """
         key_prefix = "llm.input_messages" if is_input else "llm.output_messages"
         
         if isinstance(messages_data, str):
@@ -321,25 +1137,76 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 messages_data = [{"role": "user" if is_input else "assistant", "content": messages_data}]
         
         messages_list = self._normalize_messages(messages_data)
-        result[key_prefix] = json.dumps(messages_list, separators=(",", ":"))
-
-        for idx, msg in enumerate(messages_list):
+        
+        # Each value is encoded once: the fragment feeds both the flattened key and
+        # the JSON array stored under key_prefix.
+        message_fields = []
+        message_fragments = []
+        for msg in messages_list:
+            fields = []
+            message_fields.append(fields)
             if not isinstance(msg, dict):
+                message_fragments.append(self.json_serializer.dumps(msg))
                 continue
-                
+            
+            field_fragments = []
             for sub_key, sub_val in msg.items():
                 clean_key = sub_key.replace("message.", "") if sub_key.startswith("message.") else sub_key
-                dotted_key = f"{key_prefix}.{idx}.message.{clean_key}"
+                fragment = self.json_serializer.dumps(sub_val)
+                field_fragments.append(json_key_fragment(sub_key) + fragment)
                 
                 if clean_key == "tool_calls" and isinstance(sub_val, list):
                     # Handle tool calls with proper structure
                     for tool_idx, tool_call in enumerate(sub_val):
                         if isinstance(tool_call, dict):
+                            tool_call_keys = FLATTENED_KEYS.for_index("message.tool_calls", tool_idx)
                             for tool_key, tool_val in tool_call.items():
-                                tool_dotted_key = f"{key_prefix}.{idx}.message.tool_calls.{tool_idx}.{tool_key}"
-                                result[tool_dotted_key] = self._serialize_value(tool_val)
+                                fields.append((tool_call_keys[tool_key], self._serialize_value(tool_val)))
+                elif isinstance(sub_val, (str, int, float, bool)) or sub_val is None:
+                    fields.append((MESSAGE_FIELD_KEYS[clean_key], sub_val))
                 else:
-                    result[dotted_key] = self._serialize_value(sub_val)
+                    fields.append((MESSAGE_FIELD_KEYS[clean_key], fragment))
+            message_fragments.append("{" + ",".join(field_fragments) + "}")
+        
+        offset = 0
+        if delta_span is not None:
+            offset = self._delta_offset(delta_span, message_fragments, result)
+        
+        result[key_prefix] = "[" + ",".join(message_fragments[offset:]) + "]"
+        for idx, fields in enumerate(message_fields[offset:]):
+            message_keys = FLATTENED_KEYS.for_index(key_prefix, idx)
+            for suffix, value in fields:
+                result[message_keys[suffix]] = value
+        
+        return messages_list[offset:]
+    
+    def _delta_offset(self, span: Span, message_fragments: List[str], result: Dict[str, Any]) -> int:
+        """
+        Number of leading messages already emitted by the previous LLM span of the
+        trace. When the conversation extends that span's input, the offset and the
+        previous span id are recorded so the full history can be rebuilt by
+        following the chain of LLM spans.
+        """
+        span_context = span.get_span_context()
+        trace_id = span_context.trace_id
+        shard = self._shard(trace_id)
+        digests = [hash(fragment) for fragment in message_fragments]
+        with shard.lock:
+            if trace_id not in shard.trace_spans:
+                return 0
+            previous = shard.trace_llm_messages.get(trace_id)
+            shard.trace_llm_messages[trace_id] = (span_context.span_id, digests)
+        if previous is None:
+            return 0
+        
+        previous_span_id, previous_digests = previous
+        offset = len(previous_digests)
+        if offset == 0 or digests[:offset] != previous_digests:
+            return 0
+        
+        result["llm.input_messages_delta.offset"] = offset
+        result["llm.input_messages_delta.previous_span_id"] = format(previous_span_id, "016x")
+        return offset
     
     def _normalize_messages(self, data: Any) -> List[Dict[str, Any]]:
         """Normalize messages data to a consistent list format."""
@@ -377,8 +1244,14 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         
         return result
     
-    def _map_tools(self, tools_data: Any, result: Dict[str, Any]):
+    def _map_tools(self, tools_data: Any, result: Dict[str, Any], span: Optional[Span] = None):
         """Map tools from Strands to OpenInference format."""
+        if self.dedup_content and span is not None:
+            digest = self._content_digest(tools_data)
+            result["llm.tools_hash"] = digest
+            if not self._first_occurrence(span, digest):
+                return
+        
         if isinstance(tools_data, str):
             try:
                 tools_data = json.loads(tools_data)
@@ -405,9 +1278,9 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         
         if openinf_tools:
             for idx, tool in enumerate(openinf_tools):
+                tool_keys = FLATTENED_KEYS.for_index("llm.tools", idx)
                 for key, value in tool.items():
-                    dotted_key = f"llm.tools.{idx}.{key}"
-                    result[dotted_key] = self._serialize_value(value)
+                    result[tool_keys[key]] = self._serialize_value(value)
     
     def _map_token_usage(self, attrs: Dict[str, Any], result: Dict[str, Any]):
         """Map token usage metrics."""
@@ -415,6 +1288,8 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             ("gen_ai.usage.prompt_tokens", "llm.token_count.prompt"),
             ("gen_ai.usage.completion_tokens", "llm.token_count.completion"),
             ("gen_ai.usage.total_tokens", "llm.token_count.total"),
+            ("gen_ai.usage.cache_read_input_tokens", "llm.token_count.prompt_details.cache_read"),
+            ("gen_ai.usage.cache_write_input_tokens", "llm.token_count.prompt_details.cache_write"),
         ]
         
         for strands_key, openinf_key in token_mappings:
@@ -436,10 +1311,20 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 params[param_key] = attrs[key]
         
         if params:
-            result["llm.invocation_parameters"] = json.dumps(params, separators=(",", ":"))
+            result["llm.invocation_parameters"] = self.json_serializer.dumps(params)
     
-    def _add_input_output_values(self, attrs: Dict[str, Any], result: Dict[str, Any]):
-        """Add input.value and output.value for Arize compatibility."""
+    def _add_input_output_values(
+        self,
+        attrs: Dict[str, Any],
+        result: Dict[str, Any],
+        input_messages: Optional[List[Dict[str, Any]]] = None,
+        output_messages: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        Add input.value and output.value for Arize compatibility. LLM spans reuse the
+        messages produced by _map_messages, and the already serialized input messages
+        are embedded in input.value as is.
+        """
         span_kind = result.get("openinference.span.kind")
         model_name = result.get("llm.model_name") or attrs.get("gen_ai.request.model") or "unknown"
         invocation_params = {}
@@ -450,59 +1335,42 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 pass
         
         if span_kind == "LLM":
-            if "llm.input_messages" in result:
-                try:
-                    input_messages = json.loads(result["llm.input_messages"])
-                    if input_messages:
-                        input_structure = {
-                            "messages": input_messages,
-                            "model": model_name
-                        }
-                        if max_tokens := invocation_params.get("max_tokens"):
-                            input_structure["max_tokens"] = max_tokens
-                        
-                        result["input.value"] = json.dumps(input_structure, separators=(",", ":"))
-                        result["input.mime_type"] = "application/json"
-                except:
-                    if prompt_content := result.get("llm.input_messages.0.message.content"):
-                        result["input.value"] = prompt_content
-                        result["input.mime_type"] = "application/json"
-
-            if "llm.output_messages" in result:
-                try:
-                    output_messages = json.loads(result["llm.output_messages"])
-                    if output_messages and len(output_messages) > 0:
-                        first_msg = output_messages[0]
-                        content = first_msg.get("message.content", "")
-                        role = first_msg.get("message.role", "assistant")
-                        finish_reason = first_msg.get("message.finish_reason", "stop")
-                        output_structure = {
-                            "id": attrs.get("gen_ai.response.id"),
-                            "choices": [{
-                                "finish_reason": finish_reason,
-                                "index": 0,
-                                "logprobs": None,
-                                "message": {
-                                    "content": content,
-                                    "role": role,
-                                    "refusal": None,
-                                    "annotations": []
-                                }
-                            }],
-                            "model": model_name,
-                            "usage": {
-                                "completion_tokens": result.get("llm.token_count.completion"),
-                                "prompt_tokens": result.get("llm.token_count.prompt"),
-                                "total_tokens": result.get("llm.token_count.total")
-                            }
+            if input_messages:
+                input_value = '{"messages":' + result["llm.input_messages"] + ',"model":' + self.json_serializer.dumps(model_name)
+                if max_tokens := invocation_params.get("max_tokens"):
+                    input_value += ',"max_tokens":' + self.json_serializer.dumps(max_tokens)
+                
+                result["input.value"] = input_value + "}"
+                result["input.mime_type"] = "application/json"
+
+            if output_messages:
+                first_msg = output_messages[0]
+                content = first_msg.get("message.content", "")
+                role = first_msg.get("message.role", "assistant")
+                finish_reason = first_msg.get("message.finish_reason", "stop")
+                output_structure = {
+                    "id": attrs.get("gen_ai.response.id"),
+                    "choices": [{
+                        "finish_reason": finish_reason,
+                        "index": 0,
+                        "logprobs": None,
+                        "message": {
+                            "content": content,
+                            "role": role,
+                            "refusal": None,
+                            "annotations": []
                         }
-                        
-                        result["output.value"] = json.dumps(output_structure, separators=(",", ":"))
-                        result["output.mime_type"] = "application/json"
-                except:
-                    if completion_content := result.get("llm.output_messages.0.message.content"):
-                        result["output.value"] = completion_content
-                        result["output.mime_type"] = "application/json"
+                    }],
+                    "model": model_name,
+                    "usage": {
+                        "completion_tokens": result.get("llm.token_count.completion"),
+                        "prompt_tokens": result.get("llm.token_count.prompt"),
+                        "total_tokens": result.get("llm.token_count.total")
+                    }
+                }
+                
+                result["output.value"] = self.json_serializer.dumps(output_structure)
+                result["output.mime_type"] = "application/json"
                     
         elif span_kind == "AGENT":
             if prompt := attrs.get("gen_ai.prompt"):
@@ -518,14 +1386,14 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 if isinstance(tool_params, str):
                     result["input.value"] = tool_params
                 else:
-                    result["input.value"] = json.dumps(tool_params, separators=(",", ":"))
+                    result["input.value"] = self.json_serializer.dumps(tool_params)
                 result["input.mime_type"] = "application/json"
             
             if tool_result := attrs.get("tool.result"):
                 if isinstance(tool_result, str):
                     result["output.value"] = tool_result
                 else:
-                    result["output.value"] = json.dumps(tool_result, separators=(",", ":"))
+                    result["output.value"] = self.json_serializer.dumps(tool_result)
                 result["output.mime_type"] = "application/json"
                 
         elif span_kind == "CHAIN":
@@ -533,27 +1401,29 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 if isinstance(prompt, str):
                     result["input.value"] = prompt
                 else:
-                    result["input.value"] = json.dumps(prompt, separators=(",", ":"))
+                    result["input.value"] = self.json_serializer.dumps(prompt)
                 result["input.mime_type"] = "text/plain" if isinstance(prompt, str) else "application/json"
             
             if completion := attrs.get("gen_ai.completion"):
                 if isinstance(completion, str):
                     result["output.value"] = completion  
                 else:
-                    result["output.value"] = json.dumps(completion, separators=(",", ":"))
+                    result["output.value"] = self.json_serializer.dumps(completion)
                 result["output.mime_type"] = "text/plain" if isinstance(completion, str) else "application/json"
     
-    def _add_metadata(self, attrs: Dict[str, Any], result: Dict[str, Any]):
-        """Add remaining attributes to metadata."""
+    def _add_metadata(self, attrs: Dict[str, Any], result: Dict[str, Any], deduplicated_keys=()):
+        """Add remaining attributes, minus filtered out keys, to metadata."""
         metadata = {}
-        skip_keys = {"gen_ai.prompt", "gen_ai.completion", "agent.tools", "gen_ai.agent.tools"}
+        key_filter = self.metadata_key_filter
         
         for key, value in attrs.items():
-            if key not in skip_keys and key not in result:
+            if key in METADATA_SKIP_KEYS or key in result or key in deduplicated_keys:
+                continue
+            if key_filter is None or key_filter[key]:
                 metadata[key] = self._serialize_value(value)
         
         if metadata:
-            result["metadata"] = json.dumps(metadata, separators=(",", ":"))
+            result["metadata"] = self.json_serializer.dumps(metadata)
     
     def _serialize_value(self, value: Any) -> Any:
         """Ensure a value is serializable."""
@@ -561,14 +1431,278 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             return value
         
         try:
-            return json.dumps(value, separators=(",", ":"))
+            return self.json_serializer.dumps(value)
         except (TypeError, OverflowError):
+            self.serialization_failures.add(1, {"stage": "value"})
             return str(value)
 
+    def _dedup_attributes(self, attrs: Dict[str, Any], result: Dict[str, Any], span: Span) -> Set[str]:
+        """
+        Record the content hash of large repeated attributes such as the system
+        prompt. Returns the keys already emitted in full, to leave out of metadata.
+        """
+        deduplicated_keys = set()
+        for key in DEDUP_ATTRIBUTE_KEYS:
+            if (value := attrs.get(key)) is None:
+                continue
+            digest = self._content_digest(value)
+            result[f"{key}_hash"] = digest
+            if not self._first_occurrence(span, digest):
+                deduplicated_keys.add(key)
+        return deduplicated_keys
+
+    def _content_digest(self, value: Any) -> str:
+        """Short content hash of an attribute value."""
+        text = value if isinstance(value, str) else self.json_serializer.dumps(value)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def _first_occurrence(self, span: Span, digest: str) -> bool:
+        """
+        Whether content with this digest should be emitted in full, i.e. it was not
+        seen yet in the span's trace, or within the dedup time window.
+        """
+        trace_id = None
+        if self.dedup_window_seconds is None:
+            trace_id = span.get_span_context().trace_id
+            key = (trace_id, digest)
+        else:
+            key = digest
+        now = time.monotonic()
+        evicted = 0
+        with self._dedup_lock:
+            seen_at = self.content_hashes.get(key)
+            if seen_at is not None and (self.dedup_window_seconds is None or now - seen_at < self.dedup_window_seconds):
+                self.content_hashes.move_to_end(key)
+                return False
+            
+            self.content_hashes[key] = now
+            self.content_hashes.move_to_end(key)
+            if trace_id is not None:
+                self.trace_digests.setdefault(trace_id, set()).add(digest)
+            while len(self.content_hashes) > self.max_dedup_entries:
+                evicted_key, _ = self.content_hashes.popitem(last=False)
+                evicted += 1
+                if isinstance(evicted_key, tuple):
+                    digests = self.trace_digests.get(evicted_key[0])
+                    if digests is not None:
+                        digests.discard(evicted_key[1])
+                        if not digests:
+                            del self.trace_digests[evicted_key[0]]
+        if evicted:
+            self.evictions.add(evicted, {"cache": "content_hashes"})
+        return True
+
+    def _limit_attribute_value(
+        self,
+        value: Any,
+        content_bytes: Optional[int],
+        parsed_values: Optional[Dict[str, Any]] = None,
+        key: Optional[str] = None,
+    ) -> Any:
+        """
+        Strip binary content and truncate text in a Strands attribute value. JSON
+        strings are parsed so the limits apply to the text inside them; with
+        parsed_values given, the limited object is also kept there under key so
+        that it need not be parsed again.
+        """
+        if isinstance(value, str):
+            if value[:1] in ("[", "{"):
+                try:
+                    parsed = json.loads(value)
+                except json.JSONDecodeError:
+                    return self._limit_content(value, content_bytes)
+                limited = self._limit_content(parsed, content_bytes)
+                if parsed_values is not None:
+                    parsed_values[key] = limited
+                return value if limited is parsed else self.json_serializer.dumps(limited)
+            return self._limit_content(value, content_bytes)
+        return self._limit_content(value, content_bytes)
+
+    def _limit_content(self, value: Any, content_bytes: Optional[int]) -> Any:
+        """
+        Recursively apply binary stripping and the content byte budget. Returns
+        value itself when nothing in it changed.
+        """
+        if isinstance(value, str):
+            if self.strip_binary and self._is_binary_text(value):
+                return self._binary_placeholder(value.encode("utf-8"))
+            if content_bytes is not None:
+                return self._truncate_text(value, content_bytes)
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            return self._binary_placeholder(value) if self.strip_binary else value
+        if isinstance(value, dict):
+            limited = {key: self._limit_content(item, content_bytes) for key, item in value.items()}
+            return value if all(limited[key] is item for key, item in value.items()) else limited
+        if isinstance(value, (list, tuple)):
+            limited = [self._limit_content(item, content_bytes) for item in value]
+            return value if all(new is old for new, old in zip(limited, value)) else limited
+        return value
+
+    def _is_binary_text(self, text: str) -> bool:
+        """
+        Whether a string is base64 encoded binary data: a base64 data URI, or
+        padded base64 that decodes. Long alphanumeric ids and tokens also fit the
+        base64 alphabet, so without "+", "/" or padding a string is kept as text.
+        """
+        if len(text) < self.binary_min_bytes:
+            return False
+        if DATA_URI_PREFIX.match(text):
+            return True
+        if len(text) % 4 or BASE64_PATTERN.fullmatch(text) is None:
+            return False
+        if "+" not in text and "/" not in text and not text.endswith("="):
+            return False
+        try:
+            base64.b64decode(text, validate=True)
+        except binascii.Error:
+            return False
+        return True
+
+    def _binary_placeholder(self, data: bytes) -> str:
+        """Placeholder standing in for binary content."""
+        return f"<binary {len(data)} bytes sha256:{hashlib.sha256(data).hexdigest()[:16]}>"
+
+    def _truncate_text(self, text: str, budget: int) -> str:
+        """Keep the head and tail of text within budget bytes around a truncation marker."""
+        if len(text) * 4 <= budget:
+            return text
+        encoded = text.encode("utf-8")
+        if len(encoded) <= budget:
+            return text
+        
+        marker = f"...[truncated {len(encoded)} bytes]..."
+        if len(marker) >= budget:
+            return marker[:max(budget, 0)]
+        keep = budget - len(marker)
+        tail_len = keep // 2
+        head = encoded[:keep - tail_len].decode("utf-8", "ignore")
+        tail = encoded[len(encoded) - tail_len:].decode("utf-8", "ignore") if tail_len else ""
+        return f"{head}...[truncated {len(encoded) - keep} bytes]...{tail}"
+
+    def _apply_attribute_budgets(self, result: Dict[str, Any]):
+        """
+        Truncate string attributes that exceed their byte budget. JSON attributes
+        are truncated inside their text values, so they stay valid JSON.
+        """
+        for key, value in result.items():
+            if not isinstance(value, str):
+                continue
+            budget = self.max_attribute_bytes
+            for prefix, prefix_budget in self.attribute_byte_budgets:
+                if key.startswith(prefix):
+                    budget = prefix_budget
+                    break
+            if budget is None or len(value) * 4 <= budget or len(value.encode("utf-8")) <= budget:
+                continue
+            if self._is_json_attribute(key, value, result):
+                result[key] = self._limit_json_attribute(value, budget)
+            else:
+                result[key] = self._truncate_text(value, budget)
+
+    def _is_json_attribute(self, key: str, value: str, result: Dict[str, Any]) -> bool:
+        """Whether an attribute written by the processor may hold serialized JSON."""
+        if value[:1] not in ("[", "{"):
+            return False
+        if key in ("input.value", "output.value"):
+            return result.get(key[:-len("value")] + "mime_type") == "application/json"
+        return key.startswith(JSON_ATTRIBUTE_PREFIXES)
+
+    def _limit_json_attribute(self, value: str, budget: int) -> str:
+        """
+        Fit a JSON attribute into budget bytes by truncating the text values inside
+        it, halving the content byte budget until the serialized value fits. A value
+        whose structure alone is too large becomes a JSON string of the truncation
+        marker.
+        """
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            return self._truncate_text(value, budget)
+        content_bytes = budget // 2
+        while content_bytes >= 16:
+            limited = self.json_serializer.dumps(self._limit_content(parsed, content_bytes))
+            if len(limited.encode("utf-8")) <= budget:
+                return limited
+            content_bytes //= 2
+        marker = json.dumps(f"...[truncated {len(value.encode('utf-8'))} bytes]...")
+        return marker if len(marker) <= budget else "null"
+
     def shutdown(self):
         """Called when the processor is shutdown."""
         pass
 
     def force_flush(self, timeout_millis=None):
         """Called to force flush."""
-        return True
\ No newline at end of file
+        return True
+
+
+class StrandsToOpenInferenceSpanExporter(SpanExporter):
+    """
+    SpanExporter that converts Strands spans to OpenInference format before handing
+    them to a wrapped exporter. Placed inside a BatchSpanProcessor, the transform
+    runs on the batch worker thread instead of the thread that ended the span.
+
+    The processor must be registered on the tracer provider with
+    defer_transform=True so that it keeps tracking the span hierarchy.
+    """
+
+    def __init__(self, exporter: SpanExporter, processor: StrandsToOpenInferenceProcessor):
+        """
+        Initialize the exporter.
+        
+        Args:
+            exporter: Exporter that receives the converted spans
+            processor: Processor tracking the span hierarchy, used for the transform
+        """
+        self.exporter = exporter
+        self.processor = processor
+
+    def export(self, spans) -> SpanExportResult:
+        """Convert a batch of spans and forward it to the wrapped exporter."""
+        return self.exporter.export([self._convert_span(span) for span in spans])
+
+    def _convert_span(self, span: ReadableSpan) -> ReadableSpan:
+        """Build a copy of the span carrying the OpenInference attributes."""
+        span_context = span.get_span_context()
+        span_id = span_context.span_id
+        span_info = self.processor._span_info(span_context)
+
+        try:
+            transformed_attrs = self.processor._transform_span(span, span_id, span_info)
+        finally:
+            if self.processor._is_root_span(span):
+                self.processor._release_trace(span_context.trace_id)
+
+        if transformed_attrs is None:
+            return span
+
+        original_attributes = span._attributes
+        attributes = BoundedAttributes(
+            maxlen=getattr(original_attributes, 'maxlen', None),
+            attributes=transformed_attrs,
+            immutable=True,
+            max_value_len=getattr(original_attributes, 'max_value_len', None),
+        )
+        return ReadableSpan(
+            name=span.name,
+            context=span_context,
+            parent=span.parent,
+            resource=span.resource,
+            attributes=attributes,
+            events=span.events,
+            links=span.links,
+            kind=span.kind,
+            status=span.status,
+            start_time=span.start_time,
+            end_time=span.end_time,
+            instrumentation_scope=span.instrumentation_scope,
+        )
+
+    def shutdown(self):
+        """Shut down the wrapped exporter."""
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Force flush the wrapped exporter."""
+        return self.exporter.force_flush(timeout_millis)
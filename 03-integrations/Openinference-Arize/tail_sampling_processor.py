@@ -0,0 +1,173 @@
+"""
+Tail-based sampling for Strands agent traces
+
+This module provides a span processor that buffers the spans of each trace until
+its root span ends, then decides whether to forward the whole trace to the wrapped
+span processor (usually a BatchSpanProcessor feeding the OTLP exporter).
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+logger = logging.getLogger(__name__)
+
+# Total tokens of an LLM span, after and before the OpenInference transform
+TOKEN_COUNT_KEYS = ("llm.token_count.total", "gen_ai.usage.total_tokens")
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    SpanProcessor that keeps every trace with an error, a slow root span or a high
+    token count, and samples the remaining traces at a fixed rate.
+
+    Register it after StrandsToOpenInferenceProcessor so that it buffers the
+    converted spans.
+    """
+
+    def __init__(
+        self,
+        span_processor: SpanProcessor,
+        sample_rate: float = 0.1,
+        latency_threshold_ms: Optional[float] = 30000,
+        token_threshold: Optional[int] = 10000,
+        keep_errors: bool = True,
+        max_buffered_spans: int = 20000,
+        max_decisions: int = 10000,
+    ):
+        """
+        Initialize the processor.
+
+        Args:
+            span_processor: Processor receiving the spans of kept traces
+            sample_rate: Fraction of the remaining traces to keep, decided from the
+                trace id so every process makes the same choice
+            latency_threshold_ms: Keep traces whose root span lasted at least this
+                long. None disables the check
+            token_threshold: Keep traces whose LLM spans report at least this many
+                total tokens together. None disables the check
+            keep_errors: Keep traces containing a span with an error status
+            max_buffered_spans: Cap on spans buffered across open traces. Past it
+                the oldest open trace is decided early with what it has so far
+            max_decisions: Number of decided traces remembered so that spans ending
+                after their root span follow the same decision
+        """
+        super().__init__()
+        self.span_processor = span_processor
+        self.sample_rate = sample_rate
+        self.latency_threshold_ms = latency_threshold_ms
+        self.token_threshold = token_threshold
+        self.keep_errors = keep_errors
+        self.max_buffered_spans = max_buffered_spans
+        self.max_decisions = max_decisions
+        self.traces = OrderedDict()
+        self.decisions = OrderedDict()
+        self.buffered_spans = 0
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        """Called when a span is started. Forwarded to the wrapped processor."""
+        self.span_processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        """Buffer the span, deciding its trace once the root span has ended."""
+        trace_id = span.get_span_context().trace_id
+        forward = []
+
+        with self._lock:
+            decision = self.decisions.get(trace_id)
+            if decision is not None:
+                if decision:
+                    forward.append(span)
+            else:
+                trace = self.traces.get(trace_id)
+                if trace is None:
+                    trace = self.traces[trace_id] = {'spans': [], 'error': False, 'tokens': 0}
+                self._record_span(trace, span)
+
+                if self._is_root_span(span):
+                    forward.extend(self._decide(trace_id, span))
+
+                while self.buffered_spans > self.max_buffered_spans and self.traces:
+                    oldest_trace_id = next(iter(self.traces))
+                    forward.extend(self._decide(oldest_trace_id, None))
+
+        for ended_span in forward:
+            self.span_processor.on_end(ended_span)
+
+    def _record_span(self, trace: Dict[str, Any], span: ReadableSpan):
+        """Add a span to its trace buffer and update the keep signals."""
+        trace['spans'].append(span)
+        self.buffered_spans += 1
+
+        if span.status.status_code == StatusCode.ERROR:
+            trace['error'] = True
+        attributes = span.attributes or {}
+        if str(attributes.get("tool.status", "")).lower() == "error":
+            trace['error'] = True
+        if self._is_llm_span(span, attributes):
+            for key in TOKEN_COUNT_KEYS:
+                tokens = attributes.get(key)
+                if isinstance(tokens, int):
+                    trace['tokens'] += tokens
+                    break
+
+    def _is_llm_span(self, span: ReadableSpan, attributes) -> bool:
+        """
+        Whether a span is a model call. Agent spans also carry token counts, the
+        totals of their model calls, and are left out so they are not counted twice.
+        """
+        span_kind = attributes.get("openinference.span.kind")
+        if span_kind is not None:
+            return span_kind == "LLM"
+        return "Model invoke" in span.name
+
+    def _is_root_span(self, span: ReadableSpan) -> bool:
+        """A span is the local root of its trace when it has no parent in this process."""
+        return span.parent is None or getattr(span.parent, 'is_remote', False)
+
+    def _decide(self, trace_id: int, root_span: Optional[ReadableSpan]) -> list:
+        """
+        Decide whether to keep a buffered trace and release its buffer. Returns the
+        spans to forward. Must be called with the lock held.
+        """
+        trace = self.traces.pop(trace_id)
+        self.buffered_spans -= len(trace['spans'])
+        keep = self._should_keep(trace_id, trace, root_span)
+
+        self.decisions[trace_id] = keep
+        while len(self.decisions) > self.max_decisions:
+            self.decisions.popitem(last=False)
+
+        if root_span is None:
+            logger.debug("Decided trace %032x early (buffer cap), keep=%s", trace_id, keep)
+        return trace['spans'] if keep else []
+
+    def _should_keep(self, trace_id: int, trace: Dict[str, Any], root_span: Optional[ReadableSpan]) -> bool:
+        """Apply the keep rules, then the sampling rate."""
+        if self.keep_errors and trace['error']:
+            return True
+        if self.token_threshold is not None and trace['tokens'] >= self.token_threshold:
+            return True
+        if self.latency_threshold_ms is not None and root_span is not None and root_span.end_time:
+            if (root_span.end_time - root_span.start_time) / 1e6 >= self.latency_threshold_ms:
+                return True
+        return (trace_id & 0xFFFFFFFFFFFFFFFF) < self.sample_rate * (1 << 64)
+
+    def shutdown(self):
+        """Decide every open trace with what it has, then shut down the wrapped processor."""
+        with self._lock:
+            forward = []
+            while self.traces:
+                forward.extend(self._decide(next(iter(self.traces)), None))
+        for span in forward:
+            self.span_processor.on_end(span)
+        self.span_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Force flush the wrapped processor. Open traces stay buffered."""
+        return self.span_processor.force_flush(timeout_millis)
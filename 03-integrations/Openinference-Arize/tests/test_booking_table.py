@@ -0,0 +1,261 @@
+"""
+Unit tests for the shared booking table access, against a moto DynamoDB and SSM.
+"""
+
+import os
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+
+import boto3
+
+from prereqs.dynamodb import AmazonDynamoDB, read_yaml_file
+
+try:
+    import moto
+except ImportError:
+    moto = None
+
+try:
+    import strands  # noqa: F401
+    import batch_create_booking
+    import batch_get_booking_details
+    import get_booking_details
+    import list_bookings
+except ImportError:
+    get_booking_details = None
+
+import booking_table
+
+PREREQS_CONFIG = read_yaml_file(os.path.join(os.path.dirname(__file__), os.pardir, "prereqs", "prereqs_config.yaml"))
+TABLE_NAME = PREREQS_CONFIG["table_name"]
+
+
+def create_booking_table(table_name=TABLE_NAME, with_index=True):
+    """The booking table as the prereqs create it."""
+    AmazonDynamoDB().create_dynamodb(
+        PREREQS_CONFIG["knowledge_base_name"],
+        table_name,
+        PREREQS_CONFIG["pk_item"],
+        PREREQS_CONFIG["sk_item"],
+        *([PREREQS_CONFIG["index_name"], PREREQS_CONFIG["index_sk_item"], PREREQS_CONFIG["index_attributes"]]
+          if with_index else []),
+    )
+
+
+@unittest.skipIf(moto is None, "moto is not installed")
+class MotoTestCase(unittest.TestCase):
+    """Runs each test against fresh moto DynamoDB and SSM, counting the AWS calls made."""
+
+    def setUp(self):
+        environment = mock.patch.dict(os.environ, {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+        })
+        environment.start()
+        self.addCleanup(environment.stop)
+        aws = moto.mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        boto3.setup_default_session()
+        self.calls = Counter()
+        boto3.DEFAULT_SESSION.events.register(
+            "before-call", lambda model, **kwargs: self.calls.update([model.name]))
+        booking_table.reset_booking_table()
+        self.addCleanup(booking_table.reset_booking_table)
+        create_booking_table()
+        self.calls.clear()
+
+
+class TestBookingTable(MotoTestCase):
+    def test_table_name_read_once(self):
+        for idx in range(10):
+            booking_table.get_booking_table().put_item(Item={"booking_id": str(idx), "restaurant_name": "Nonna"})
+
+        self.assertEqual(self.calls, Counter({"PutItem": 10, "GetParameter": 1}))
+        self.assertIs(booking_table.get_booking_table(), booking_table.get_booking_table())
+
+    def test_table_name_refreshed_after_ttl(self):
+        self.assertEqual(booking_table.get_booking_table().name, TABLE_NAME)
+        create_booking_table("restaurant-assistant-bookings-v2")
+        self.assertEqual(booking_table.get_booking_table().name, TABLE_NAME)
+
+        expired = time.monotonic() + booking_table.TABLE_NAME_TTL_SECONDS + 1
+        with mock.patch.object(booking_table.time, "monotonic", return_value=expired):
+            self.assertEqual(booking_table.get_booking_table().name, "restaurant-assistant-bookings-v2")
+            self.assertEqual(booking_table.get_booking_table().name, "restaurant-assistant-bookings-v2")
+        self.assertEqual(self.calls["GetParameter"], 2)
+
+    def test_threads_share_table_name_not_resources(self):
+        tables = []
+
+        def use_table():
+            table = booking_table.get_booking_table()
+            table.get_item(Key={"booking_id": "1", "restaurant_name": "Nonna"})
+            tables.append(table)
+
+        threads = [threading.Thread(target=use_table) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(table) for table in tables}), 4)
+        self.assertEqual(self.calls, Counter({"GetItem": 4, "GetParameter": 1}))
+
+
+def make_bookings(count, restaurant_name="Nonna"):
+    return [{"booking_id": f"{idx:08d}", "restaurant_name": restaurant_name, "name": f"Guest {idx}",
+             "date": "2025-07-01", "hour": "20:00", "num_guests": idx % 8 + 1} for idx in range(count)]
+
+
+class TestBatchBookings(MotoTestCase):
+    def test_thousands_of_bookings_chunked(self):
+        bookings = make_bookings(2500)
+        self.assertEqual(booking_table.batch_put_bookings(bookings), [])
+        self.assertEqual(self.calls["BatchWriteItem"], 100)
+
+        keys = [booking_table.booking_key(booking["booking_id"], "Nonna") for booking in bookings]
+        keys += [booking_table.booking_key("missing", "Nonna"), keys[0]]
+        items, unprocessed = booking_table.batch_get_bookings(keys)
+
+        self.assertEqual(unprocessed, [])
+        self.assertEqual(self.calls["BatchGetItem"], 26)
+        self.assertEqual(sorted(item["booking_id"] for item in items), [booking["booking_id"] for booking in bookings])
+        self.assertEqual(items[0]["num_guests"], int(items[0]["booking_id"]) % 8 + 1)
+
+    def test_duplicate_keys_written_once(self):
+        first, second = make_bookings(2)
+        self.assertEqual(booking_table.batch_put_bookings([first, second, {**first, "name": "Late"}]), [])
+
+        items, _ = booking_table.batch_get_bookings([first, second])
+        self.assertEqual(sorted(item["name"] for item in items), ["Guest 1", "Late"])
+
+    def test_unprocessed_keys_resent(self):
+        booking_table.batch_put_bookings(make_bookings(150))
+        dynamodb = booking_table._local.dynamodb
+        batch_get_item = dynamodb.batch_get_item
+
+        def serve_half(RequestItems):
+            request = RequestItems[TABLE_NAME]
+            keys = request["Keys"]
+            response = batch_get_item(RequestItems={TABLE_NAME: {**request, "Keys": keys[:len(keys) // 2 or 1]}})
+            if len(keys) > 1:
+                response["UnprocessedKeys"] = {TABLE_NAME: {"Keys": keys[len(keys) // 2:]}}
+            return response
+
+        with mock.patch.object(dynamodb, "batch_get_item", side_effect=serve_half), \
+                mock.patch.object(booking_table, "_backoff") as backoff:
+            items, unprocessed = booking_table.batch_get_bookings(make_bookings(150))
+        self.assertEqual((len(items), unprocessed), (150, []))
+        self.assertGreater(backoff.call_count, 0)
+
+    def test_unprocessed_items_returned_after_max_attempts(self):
+        booking_table.get_booking_table()
+        dynamodb = booking_table._local.dynamodb
+        bookings = make_bookings(30)
+
+        def serve_none(RequestItems):
+            return {"UnprocessedItems": RequestItems}
+
+        with mock.patch.object(dynamodb, "batch_write_item", side_effect=serve_none) as batch_write_item, \
+                mock.patch.object(booking_table, "_backoff"):
+            unprocessed = booking_table.batch_put_bookings(bookings)
+        self.assertEqual(unprocessed, bookings)
+        self.assertEqual(batch_write_item.call_count, 2 * booking_table.BATCH_MAX_ATTEMPTS)
+
+
+class TestDateIndex(MotoTestCase):
+    def test_prereqs_index_matches_booking_table(self):
+        index, = boto3.client("dynamodb").describe_table(TableName=TABLE_NAME)["Table"]["GlobalSecondaryIndexes"]
+        self.assertEqual(index["IndexName"], booking_table.DATE_INDEX_NAME)
+        self.assertEqual([key["AttributeName"] for key in index["KeySchema"]], ["restaurant_name", "date"])
+        self.assertEqual(index["Projection"]["ProjectionType"], "INCLUDE")
+        self.assertLessEqual(set(booking_table.DATE_QUERY_FIELDS),
+                             set(index["Projection"]["NonKeyAttributes"]) | {"booking_id"})
+
+    def test_index_added_to_existing_table(self):
+        create_booking_table("old-bookings", with_index=False)
+        create_booking_table("old-bookings")
+        create_booking_table("old-bookings")
+
+        indexes = boto3.client("dynamodb").describe_table(TableName="old-bookings")["Table"]["GlobalSecondaryIndexes"]
+        self.assertEqual([index["IndexName"] for index in indexes], [booking_table.DATE_INDEX_NAME])
+        self.assertEqual(self.calls["UpdateTable"], 1)
+
+    def test_query_reads_only_matching_bookings(self):
+        bookings = make_bookings(3000)
+        for booking in bookings:
+            booking["date"] = f"2025-07-{int(booking['booking_id']) % 30 + 1:02d}"
+        bookings += [{**booking, "restaurant_name": "Bistro"} for booking in bookings[:100]]
+        booking_table.batch_put_bookings(bookings)
+        self.calls.clear()
+
+        listed = list(booking_table.iter_bookings_by_date("Nonna", "2025-07-01", page_size=40))
+        self.assertEqual(sorted(booking["booking_id"] for booking in listed),
+                         [booking["booking_id"] for booking in bookings[:3000] if booking["date"] == "2025-07-01"])
+        self.assertEqual(set(listed[0]), set(booking_table.DATE_QUERY_FIELDS))
+        self.assertEqual(self.calls, Counter({"Query": 3}))
+
+    def test_stops_reading_when_consumer_stops(self):
+        booking_table.batch_put_bookings(make_bookings(100))
+        self.calls.clear()
+
+        pages = booking_table.iter_bookings_by_date("Nonna", "2025-07-01", page_size=10)
+        first = [next(pages) for _ in range(10)]
+        self.assertEqual(self.calls, Counter({"Query": 1}))
+
+        rest = list(booking_table.iter_bookings_by_date("Nonna", "2025-07-01", first[-1]["booking_id"]))
+        self.assertEqual(len({booking["booking_id"] for booking in first + rest}), 100)
+
+
+@unittest.skipIf(get_booking_details is None, "strands-agents is not installed")
+class TestBookingTools(MotoTestCase):
+    def test_lookup_is_a_single_dynamodb_call(self):
+        booking_table.get_booking_table().put_item(Item={"booking_id": "1", "restaurant_name": "Nonna", "name": "Anna"})
+        self.calls.clear()
+
+        for _ in range(5):
+            details = get_booking_details.get_booking_details(booking_id="1", restaurant_name="Nonna")
+        self.assertEqual(details["name"], "Anna")
+        self.assertEqual(self.calls, Counter({"GetItem": 5}))
+
+    def test_batch_tools(self):
+        booking_table.get_booking_table()
+        self.calls.clear()
+
+        result = batch_create_booking.batch_create_booking({"toolUseId": "t1", "input": {"bookings": [
+            {"date": "2025-07-01", "hour": "20:00", "restaurant_name": "Nonna", "guest_name": f"Guest {idx}",
+             "num_guests": 2} for idx in range(40)
+        ]}})
+        self.assertEqual(result["status"], "success")
+        lines = result["content"][0]["text"].splitlines()
+        self.assertEqual(lines[0], "40 of 40 reservations created. Booking ids:")
+        booking_ids = [line.split(":")[0] for line in lines[1:]]
+
+        details = batch_get_booking_details.batch_get_booking_details(
+            bookings=[{"booking_id": booking_id, "restaurant_name": "Nonna"} for booking_id in booking_ids + ["missing"]])
+        self.assertEqual(len(details["bookings"]), 40)
+        self.assertEqual(details["not_found"], ["missing"])
+        self.assertEqual(self.calls, Counter({"BatchWriteItem": 2, "BatchGetItem": 1}))
+
+    def test_batch_booking_ids_distinct(self):
+        with mock.patch.object(batch_create_booking.uuid, "uuid4", side_effect=["aaaaaaaa-1", "aaaaaaaa-2", "bbbbbbbb-1"]):
+            self.assertEqual(sorted(batch_create_booking.new_booking_ids(2)), ["aaaaaaaa", "bbbbbbbb"])
+
+    def test_list_bookings_pages(self):
+        booking_table.batch_put_bookings(make_bookings(70))
+
+        first = list_bookings.list_bookings(restaurant_name="Nonna", date="2025-07-01")
+        second = list_bookings.list_bookings(restaurant_name="Nonna", date="2025-07-01",
+                                             after_booking_id=first["next_booking_id"])
+        self.assertEqual((len(first["bookings"]), len(second["bookings"])), (50, 20))
+        self.assertNotIn("next_booking_id", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+"""
+Unit tests for the knowledge base prereqs, against moto S3 and fake clients on a fake clock.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import types
+import unittest
+from collections import Counter
+from unittest import mock
+
+import boto3
+
+try:
+    import moto
+except ImportError:
+    moto = None
+
+try:
+    from opensearchpy import AuthorizationException, NotFoundError
+    from prereqs import knowledge_base
+    from prereqs.knowledge_base import KnowledgeBasesForAmazonBedrock, wait_until
+except ImportError:
+    knowledge_base = None
+
+BUCKET_NAME = "restaurant-assistant-data"
+
+
+def write_documents(directory, count, prefix="doc"):
+    for idx in range(count):
+        with open(os.path.join(directory, f"{prefix}-{idx:05d}.txt"), "w") as document:
+            document.write(f"Menu {idx}\n" * 20)
+
+
+@unittest.skipIf(knowledge_base is None, "the knowledge base dependencies are not installed")
+@unittest.skipIf(moto is None, "moto is not installed")
+class TestUploadDirectory(unittest.TestCase):
+    def setUp(self):
+        environment = mock.patch.dict(os.environ, {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+        })
+        environment.start()
+        self.addCleanup(environment.stop)
+        aws = moto.mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.kb_files = os.path.join(self.directory, "kb_files")
+        os.mkdir(self.kb_files)
+        write_documents(self.kb_files, 40)
+
+        self.kb = KnowledgeBasesForAmazonBedrock(suffix="test")
+        self.kb.create_s3_bucket(BUCKET_NAME)
+        self.calls = Counter()
+        self.kb.s3_client.meta.events.register(
+            "before-call", lambda model, **kwargs: self.calls.update([model.name]))
+
+    def bucket_keys(self):
+        return sorted(obj["Key"] for obj in boto3.client("s3").list_objects_v2(Bucket=BUCKET_NAME)["Contents"])
+
+    def test_first_run_uploads_everything(self):
+        uploaded = self.kb.upload_directory(self.kb_files, BUCKET_NAME, max_workers=4)
+
+        self.assertEqual(sorted(uploaded), sorted(os.listdir(self.kb_files)))
+        self.assertEqual(self.bucket_keys(), sorted(os.listdir(self.kb_files)))
+        self.assertEqual(self.calls["PutObject"], 40)
+        self.assertTrue(os.path.exists(f"{self.kb_files}.{BUCKET_NAME}.upload-manifest.json"))
+
+    def test_rerun_uploads_only_changed_files(self):
+        self.kb.upload_directory(self.kb_files, BUCKET_NAME)
+        self.assertEqual(self.kb.upload_directory(self.kb_files, BUCKET_NAME), [])
+
+        with open(os.path.join(self.kb_files, "doc-00007.txt"), "a") as document:
+            document.write("New dessert\n")
+        write_documents(self.kb_files, 1, prefix="new")
+        self.calls.clear()
+
+        self.assertEqual(sorted(self.kb.upload_directory(self.kb_files, BUCKET_NAME)), ["doc-00007.txt", "new-00000.txt"])
+        self.assertEqual(self.calls["PutObject"], 2)
+        body = boto3.client("s3").get_object(Bucket=BUCKET_NAME, Key="doc-00007.txt")["Body"].read()
+        self.assertTrue(body.endswith(b"New dessert\n"))
+
+    def test_objects_missing_from_bucket_uploaded_again(self):
+        self.kb.upload_directory(self.kb_files, BUCKET_NAME)
+        boto3.client("s3").delete_object(Bucket=BUCKET_NAME, Key="doc-00003.txt")
+
+        self.assertEqual(self.kb.upload_directory(self.kb_files, BUCKET_NAME), ["doc-00003.txt"])
+
+    def test_failed_uploads_retried_on_next_run(self):
+        upload_file = self.kb.s3_client.upload_file
+
+        def fail_one(path, bucket, key, **kwargs):
+            if key == "doc-00011.txt":
+                raise OSError("connection reset")
+            return upload_file(path, bucket, key, **kwargs)
+
+        with mock.patch.object(self.kb.s3_client, "upload_file", side_effect=fail_one):
+            with self.assertRaises(OSError):
+                self.kb.upload_directory(self.kb_files, BUCKET_NAME)
+        self.assertEqual(len(self.bucket_keys()), 39)
+
+        self.assertEqual(self.kb.upload_directory(self.kb_files, BUCKET_NAME), ["doc-00011.txt"])
+
+    def test_same_name_in_subdirectories_uploaded_under_relative_keys(self):
+        for subdirectory in ("lunch", "dinner"):
+            os.mkdir(os.path.join(self.kb_files, subdirectory))
+            write_documents(os.path.join(self.kb_files, subdirectory), 1, prefix="menu")
+
+        self.kb.upload_directory(self.kb_files, BUCKET_NAME)
+
+        self.assertIn("lunch/menu-00000.txt", self.bucket_keys())
+        self.assertIn("dinner/menu-00000.txt", self.bucket_keys())
+        self.assertEqual(self.kb.upload_directory(self.kb_files, BUCKET_NAME), [])
+
+    def test_interrupted_upload_keeps_finished_files(self):
+        upload_file = self.kb.s3_client.upload_file
+
+        def interrupt_at_twenty(path, bucket, key, **kwargs):
+            if key == "doc-00020.txt":
+                raise KeyboardInterrupt
+            return upload_file(path, bucket, key, **kwargs)
+
+        with mock.patch.object(self.kb.s3_client, "upload_file", side_effect=interrupt_at_twenty):
+            with self.assertRaises(KeyboardInterrupt):
+                self.kb.upload_directory(self.kb_files, BUCKET_NAME, max_workers=1)
+        finished = self.bucket_keys()
+        self.calls.clear()
+
+        uploaded = self.kb.upload_directory(self.kb_files, BUCKET_NAME)
+
+        self.assertEqual(sorted(uploaded), sorted(set(os.listdir(self.kb_files)) - set(finished)))
+        self.assertEqual(self.calls["PutObject"], 40 - len(finished))
+
+
+class FakeClock:
+    """Stands in for the time module of knowledge_base; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeAossClient:
+    def __init__(self, clock, ready_at):
+        self.clock, self.ready_at = clock, ready_at
+
+    def create_collection(self, name, type):
+        return {"createCollectionDetail": {"id": "abc123", "arn": "arn:collection/abc123"}}
+
+    def batch_get_collection(self, names):
+        status = "ACTIVE" if self.clock.now >= self.ready_at else "CREATING"
+        return {"collectionDetails": [{"name": names[0], "id": "abc123", "arn": "arn:collection/abc123",
+                                       "status": status}]}
+
+
+class FakeIndices:
+    def __init__(self, clock, authorized_at, ready_at):
+        self.clock, self.authorized_at, self.ready_at = clock, authorized_at, ready_at
+        self.created = False
+
+    def create(self, index, body):
+        if self.clock.now < self.authorized_at:
+            raise AuthorizationException(403, "security_exception", {})
+        self.created = True
+        return {"acknowledged": True, "index": index}
+
+    def exists(self, index):
+        return self.created
+
+
+class FakeOpenSearch:
+    def __init__(self, clock, authorized_at, ready_at):
+        self.clock = clock
+        self.indices = FakeIndices(clock, authorized_at, ready_at)
+
+    def search(self, index, body):
+        if self.clock.now < self.indices.ready_at:
+            raise NotFoundError(404, "index_not_found_exception", {})
+        return {"hits": {"total": {"value": 0}}}
+
+
+class FakeBedrockAgentClient:
+    def __init__(self, clock, kb_ready_at, job_done_at):
+        self.clock, self.kb_ready_at, self.job_done_at = clock, kb_ready_at, job_done_at
+
+    def get_knowledge_base(self, knowledgeBaseId):
+        status = "ACTIVE" if self.clock.now >= self.kb_ready_at else "UPDATING"
+        return {"knowledgeBase": {"knowledgeBaseId": knowledgeBaseId, "status": status}}
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId):
+        assert self.clock.now >= self.kb_ready_at
+        return {"ingestionJob": {"ingestionJobId": "job-1", "status": "STARTING"}}
+
+    def get_ingestion_job(self, knowledgeBaseId, dataSourceId, ingestionJobId):
+        status = "COMPLETE" if self.clock.now >= self.job_done_at else "IN_PROGRESS"
+        return {"ingestionJob": {"ingestionJobId": ingestionJobId, "status": status}}
+
+
+@unittest.skipIf(knowledge_base is None, "the knowledge base dependencies are not installed")
+class TestReadinessPolling(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        fake_time = types.SimpleNamespace(monotonic=self.clock.monotonic, sleep=self.clock.sleep)
+        patch = mock.patch.object(knowledge_base, "time", fake_time)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.random = random.Random(7)
+        self.kb = KnowledgeBasesForAmazonBedrock.__new__(KnowledgeBasesForAmazonBedrock)
+        self.kb.region_name = "us-east-1"
+
+    def assert_ready_soon_after(self, ready_at, max_delay=30):
+        self.assertGreaterEqual(self.clock.now, ready_at)
+        # the last delay is at most twice the time already waited, plus the initial delay
+        self.assertLessEqual(self.clock.now, ready_at + min(max_delay, 2 * ready_at + 1))
+
+    def test_backoff_tracks_readiness(self):
+        for _ in range(20):
+            self.clock.now, self.clock.sleeps = 0.0, []
+            ready_at = self.random.uniform(0, 600)
+            self.assertEqual(wait_until(lambda: self.clock.now >= ready_at and "ready", "resource",
+                                        timeout=900), "ready")
+            self.assert_ready_soon_after(ready_at)
+            self.assertTrue(all(sleep <= 30 for sleep in self.clock.sleeps))
+            self.assertLessEqual(len(self.clock.sleeps), 5 + ready_at / 15)
+
+    def test_deadline(self):
+        with self.assertRaises(TimeoutError):
+            wait_until(lambda: None, "resource", timeout=120)
+        self.assertEqual(self.clock.now, 120)
+
+    def test_collection(self):
+        ready_at = self.random.uniform(30, 300)
+        self.kb.aoss_client = FakeAossClient(self.clock, ready_at)
+        with mock.patch.object(self.kb, "create_oss_policy_attach_bedrock_execution_role", return_value=True):
+            host, _, collection_id, _ = self.kb.create_oss("restaurant-assistant", "policy", {})
+
+        self.assertEqual((host, collection_id), ("abc123.us-east-1.aoss.amazonaws.com", "abc123"))
+        self.assert_ready_soon_after(ready_at)
+
+    def test_vector_index(self):
+        authorized_at = self.random.uniform(5, 60)
+        ready_at = authorized_at + self.random.uniform(1, 30)
+        self.kb.oss_client = FakeOpenSearch(self.clock, authorized_at, ready_at)
+        self.kb.create_vector_index("restaurant-assistant-index")
+
+        self.assertTrue(self.kb.oss_client.indices.created)
+        self.assert_ready_soon_after(ready_at)
+
+    def test_synchronize_data(self):
+        kb_ready_at = self.random.uniform(5, 60)
+        job_done_at = kb_ready_at + self.random.uniform(10, 600)
+        self.kb.bedrock_agent_client = FakeBedrockAgentClient(self.clock, kb_ready_at, job_done_at)
+        self.kb.synchronize_data("kb-1", "ds-1")
+
+        self.assert_ready_soon_after(job_done_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
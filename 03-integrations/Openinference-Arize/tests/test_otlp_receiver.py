@@ -0,0 +1,80 @@
+"""
+Unit tests for the local OTLP receiver stand-in.
+"""
+
+import gzip
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+from otlp_receiver import OtlpReceiver, count_spans_json, count_spans_protobuf
+
+
+def varint(value):
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def length_delimited(field_number, payload):
+    """Encode a protobuf length-delimited field."""
+    return varint(field_number << 3 | 2) + varint(len(payload)) + payload
+
+
+def export_request(spans_per_scope):
+    """A serialized ExportTraceServiceRequest with one resource and the given scopes."""
+    span = length_delimited(5, b"Model invoke") + bytes([0x39]) + bytes(8)  # name, start_time_unix_nano
+    scopes = b"".join(
+        length_delimited(2, length_delimited(1, b"strands") + b"".join(length_delimited(2, span) for _ in range(count)))
+        for count in spans_per_scope
+    )
+    return length_delimited(1, length_delimited(1, b"") + scopes)
+
+
+def post(url, body, content_type, encoding=None):
+    request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": content_type})
+    if encoding:
+        request.add_header("Content-Encoding", encoding)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status
+
+
+class TestSpanCounting(unittest.TestCase):
+    def test_protobuf_spans_counted_across_scopes(self):
+        self.assertEqual(count_spans_protobuf(export_request([2, 3])), 5)
+        self.assertEqual(count_spans_protobuf(b""), 0)
+
+    def test_json_spans_counted(self):
+        request = {"resourceSpans": [{"scopeSpans": [{"spans": [{}, {}]}, {"spans": [{}]}]}]}
+        self.assertEqual(count_spans_json(json.dumps(request).encode()), 3)
+
+
+class TestOtlpReceiver(unittest.TestCase):
+    def test_http_exports_counted(self):
+        body = export_request([4])
+        with OtlpReceiver() as receiver:
+            self.assertEqual(post(receiver.http_endpoint, body, "application/x-protobuf"), 200)
+            self.assertEqual(post(receiver.http_endpoint, gzip.compress(body), "application/x-protobuf", "gzip"), 200)
+
+            stats = receiver.stats
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["spans"], 8)
+        self.assertEqual(stats["bytes"], len(body) + len(gzip.compress(body)))
+
+    def test_unavailable_receiver_rejects_exports(self):
+        with OtlpReceiver() as receiver:
+            receiver.available = False
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                post(receiver.http_endpoint, export_request([1]), "application/x-protobuf")
+
+            self.assertEqual(raised.exception.code, 503)
+            self.assertEqual(receiver.stats["rejected"], 1)
+            self.assertEqual(receiver.stats["spans"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+Unit tests for the disk-backed spooling span exporter.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from spooling_exporter import SpoolingSpanExporter, decode_span, encode_span
+
+
+class StandInExporter(InMemorySpanExporter):
+    """Backend stand-in that can be made slow or unavailable."""
+
+    def __init__(self, delay=0.0, available=True):
+        super().__init__()
+        self.delay = delay
+        self.available = threading.Event()
+        if available:
+            self.available.set()
+        self.attempts = 0
+
+    def export(self, spans):
+        self.attempts += 1
+        time.sleep(self.delay)
+        if not self.available.is_set():
+            return SpanExportResult.FAILURE
+        return super().export(spans)
+
+
+def make_spans(count, tracer_provider=None):
+    tracer = (tracer_provider or TracerProvider()).get_tracer("test", "1.0")
+    spans = []
+    for idx in range(count):
+        span = tracer.start_span(f"span {idx}", kind=SpanKind.CLIENT, attributes={"idx": idx, "tags": ("a", "b")})
+        span.add_event("event", {"detail": "x"})
+        span.set_status(Status(StatusCode.ERROR, "boom"))
+        span.end()
+        spans.append(span)
+    return spans
+
+
+class TestSpanCodec(unittest.TestCase):
+    def test_round_trip_preserves_span(self):
+        span = make_spans(1)[0]
+        decoded = decode_span(encode_span(span))
+
+        self.assertEqual(decoded.name, span.name)
+        self.assertEqual(decoded.context.trace_id, span.context.trace_id)
+        self.assertEqual(decoded.context.span_id, span.context.span_id)
+        self.assertEqual(dict(decoded.attributes), dict(span.attributes))
+        self.assertEqual(decoded.kind, SpanKind.CLIENT)
+        self.assertEqual(decoded.status.status_code, StatusCode.ERROR)
+        self.assertEqual(decoded.events[0].attributes, {"detail": "x"})
+        self.assertEqual((decoded.start_time, decoded.end_time), (span.start_time, span.end_time))
+        self.assertEqual(decoded.instrumentation_scope.version, "1.0")
+        self.assertEqual(decoded.to_json(), span.to_json())
+
+
+class TestSpoolingSpanExporter(unittest.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+
+    def make_exporter(self, backend, **kwargs):
+        kwargs.setdefault("initial_backoff_seconds", 0.01)
+        kwargs.setdefault("max_backoff_seconds", 0.05)
+        kwargs.setdefault("shutdown_timeout_seconds", 0.5)
+        return SpoolingSpanExporter(backend, self.spool_dir, **kwargs)
+
+    def test_slow_backend_does_not_block_export(self):
+        backend = StandInExporter(delay=0.05)
+        exporter = self.make_exporter(backend)
+        started = time.monotonic()
+        for _ in range(10):
+            self.assertEqual(exporter.export(make_spans(5)), SpanExportResult.SUCCESS)
+        self.assertLess(time.monotonic() - started, 0.25)
+
+        self.assertTrue(exporter.force_flush(5000))
+        self.assertEqual(len(backend.get_finished_spans()), 50)
+        exporter.shutdown()
+
+    def test_unavailable_backend_retried_until_delivered(self):
+        backend = StandInExporter(available=False)
+        exporter = self.make_exporter(backend)
+        exporter.export(make_spans(3))
+        self.assertFalse(exporter.force_flush(100))
+        self.assertGreater(backend.attempts, 1)
+
+        backend.available.set()
+        self.assertTrue(exporter.force_flush(5000))
+        self.assertEqual(len(backend.get_finished_spans()), 3)
+        exporter.shutdown()
+
+    def test_spool_survives_restart(self):
+        first = self.make_exporter(StandInExporter(available=False), shutdown_timeout_seconds=0.05)
+        first.export(make_spans(4))
+        first.shutdown()
+
+        backend = StandInExporter()
+        second = self.make_exporter(backend)
+        self.assertTrue(second.force_flush(5000))
+        self.assertEqual(sorted(span.name for span in backend.get_finished_spans()),
+                         [f"span {idx}" for idx in range(4)])
+        second.shutdown()
+
+    def test_drained_segments_deleted(self):
+        backend = StandInExporter()
+        exporter = self.make_exporter(backend, segment_bytes=1)
+        for _ in range(5):
+            exporter.export(make_spans(1))
+        self.assertTrue(exporter.force_flush(5000))
+
+        segments = [name for name in os.listdir(self.spool_dir) if name.startswith("segment-")]
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(len(backend.get_finished_spans()), 5)
+        exporter.shutdown()
+
+    def test_oldest_segments_dropped_over_budget(self):
+        backend = StandInExporter(available=False)
+        exporter = self.make_exporter(backend, segment_bytes=1, max_spool_bytes=4096)
+        for _ in range(20):
+            exporter.export(make_spans(1))
+
+        spool_bytes = sum(os.path.getsize(os.path.join(self.spool_dir, name))
+                          for name in os.listdir(self.spool_dir) if name.startswith("segment-"))
+        self.assertLessEqual(spool_bytes, 4096)
+        self.assertGreater(exporter.dropped_spans, 0)
+
+        backend.available.set()
+        self.assertTrue(exporter.force_flush(5000))
+        self.assertEqual(len(backend.get_finished_spans()) + exporter.dropped_spans, 20)
+        exporter.shutdown()
+
+    def test_budget_eviction_uses_span_counts(self):
+        exporter = self.make_exporter(StandInExporter(available=False), segment_bytes=1, max_spool_bytes=4096)
+        with mock.patch.object(exporter, "_count_spans", side_effect=AssertionError("segment re-read")):
+            for size in range(1, 21):
+                exporter.export(make_spans(size % 3 + 1))
+        self.assertGreater(exporter.dropped_spans, 0)
+        self.assertEqual(exporter.dropped_spans + sum(exporter._segment_spans.values()),
+                         sum(size % 3 + 1 for size in range(1, 21)))
+        exporter.shutdown()
+
+    def test_span_counts_restored_after_restart(self):
+        backend = StandInExporter()
+        first = self.make_exporter(backend, segment_bytes=1, shutdown_timeout_seconds=0.05)
+        for _ in range(3):
+            first.export(make_spans(2))
+        self.assertTrue(first.force_flush(5000))
+        backend.available.clear()
+        for _ in range(4):
+            first.export(make_spans(3))
+        first.shutdown()
+
+        second = self.make_exporter(StandInExporter(available=False), segment_bytes=1, shutdown_timeout_seconds=0.05)
+        self.assertEqual(sum(second._segment_spans.values()), 12)
+        second.shutdown()
+
+    def test_cursor_synced_before_rename(self):
+        synced, replaced = set(), []
+        fsync, replace = os.fsync, os.replace
+
+        def record_fsync(fd):
+            synced.add(os.fstat(fd).st_ino)
+            fsync(fd)
+
+        def record_replace(src, dst):
+            inode = os.stat(src).st_ino
+            replaced.append(inode in synced)
+            synced.discard(inode)
+            replace(src, dst)
+
+        with mock.patch("spooling_exporter.os.fsync", side_effect=record_fsync), \
+                mock.patch("spooling_exporter.os.replace", side_effect=record_replace):
+            exporter = self.make_exporter(StandInExporter())
+            for _ in range(5):
+                exporter.export(make_spans(1))
+            self.assertTrue(exporter.force_flush(5000))
+            exporter.shutdown()
+
+        self.assertTrue(replaced)
+        self.assertTrue(all(replaced))
+
+    def test_segment_sizes_not_read_from_disk_per_batch(self):
+        backend = StandInExporter()
+        exporter = self.make_exporter(backend, segment_bytes=2048)
+        with mock.patch("spooling_exporter.os.path.getsize", wraps=os.path.getsize) as getsize:
+            for _ in range(20):
+                exporter.export(make_spans(1))
+            self.assertTrue(exporter.force_flush(5000))
+        self.assertEqual(getsize.call_count, 0)
+        self.assertEqual(len(backend.get_finished_spans()), 20)
+        exporter.shutdown()
+
+    def run_pipeline(self, exporter):
+        """Emit spans through a small BatchSpanProcessor queue at a steady pace."""
+        provider = TracerProvider()
+        provider.add_span_processor(BatchSpanProcessor(exporter, max_queue_size=32, max_export_batch_size=8,
+                                                       schedule_delay_millis=10))
+        tracer = provider.get_tracer("test")
+        for idx in range(100):
+            with tracer.start_as_current_span(f"span {idx}"):
+                time.sleep(0.001)
+        provider.force_flush()
+        return provider
+
+    def test_batch_span_processor_queue_not_filled_by_slow_backend(self):
+        direct_backend = StandInExporter(delay=0.1)
+        self.run_pipeline(direct_backend).shutdown()
+        self.assertLess(len(direct_backend.get_finished_spans()), 100)
+
+        backend = StandInExporter(delay=0.1)
+        exporter = self.make_exporter(backend)
+        provider = self.run_pipeline(exporter)
+        self.assertTrue(exporter.force_flush(10000))
+        self.assertEqual(len(backend.get_finished_spans()), 100)
+        provider.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Unit tests for the offline Strands dump converter.
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, StatusCode
+
+from strands_to_openinference_convert import (
+    DumpConverter,
+    OtlpJsonLinesExporter,
+    convert_dumps,
+    read_dump,
+    spans_to_otlp_json,
+)
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor
+
+from .test_otlp_receiver import length_delimited, varint
+from .test_strands_to_openinference_mapping import (
+    SequentialIdGenerator,
+    make_tracer,
+    run_agent_trace,
+    without_timing,
+)
+
+
+def record_agent_trace(span_processor=None):
+    """Spans of a synthetic agent trace as a plain exporter would have dumped them."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(id_generator=SequentialIdGenerator())
+    provider.add_span_processor(span_processor or SimpleSpanProcessor(exporter))
+    run_agent_trace(provider.get_tracer("test"))
+    return exporter.get_finished_spans()
+
+
+def protobuf_span(name, span_id, parent_span_id=0, attributes=b""):
+    """A serialized Span with fixed trace id and timestamps."""
+    span = length_delimited(1, (7).to_bytes(16, "big")) + length_delimited(2, span_id.to_bytes(8, "big"))
+    if parent_span_id:
+        span += length_delimited(4, parent_span_id.to_bytes(8, "big"))
+    span += length_delimited(5, name.encode()) + varint(6 << 3) + varint(3)  # kind: SPAN_KIND_CLIENT
+    span += bytes([0x39]) + struct.pack("<Q", 1000) + bytes([0x41]) + struct.pack("<Q", 2000)
+    return span + attributes
+
+
+def protobuf_attribute(key, any_value):
+    return length_delimited(9, length_delimited(1, key.encode()) + length_delimited(2, any_value))
+
+
+def protobuf_request(*spans):
+    resource = length_delimited(1, length_delimited(1, length_delimited(1, b"service.name")
+                                                    + length_delimited(2, length_delimited(1, b"agent"))))
+    scope_spans = length_delimited(2, length_delimited(1, length_delimited(1, b"strands"))
+                                   + b"".join(length_delimited(2, span) for span in spans))
+    return length_delimited(1, resource + scope_spans)
+
+
+class TestDumpReading(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as dump:
+            dump.write(data)
+        return path
+
+    def test_otlp_json_round_trip(self):
+        spans = record_agent_trace()
+        path = self.write("dump.jsonl", b"".join(
+            json.dumps(spans_to_otlp_json(spans[start:start + 3])).encode() + b"\n" for start in range(0, len(spans), 3)
+        ))
+
+        decoded = list(read_dump(path))
+        self.assertEqual([span.to_json() for span in decoded], [span.to_json() for span in spans])
+        self.assertEqual(decoded[0].instrumentation_scope.name, "test")
+
+    def test_gzipped_console_output(self):
+        output = io.StringIO()
+        record_agent_trace(SimpleSpanProcessor(ConsoleSpanExporter(out=output)))
+        path = self.write("console.log.gz", gzip.compress(output.getvalue().encode()))
+
+        decoded = list(read_dump(path))
+        self.assertEqual([span.name for span in decoded], [span.name for span in record_agent_trace()])
+        self.assertIsNone(decoded[-1].parent)
+        self.assertEqual(decoded[0].attributes["gen_ai.usage.total_tokens"], 15)
+
+    def test_length_prefixed_protobuf(self):
+        first = protobuf_request(protobuf_span("Model invoke", 2, parent_span_id=1, attributes=(
+            protobuf_attribute("gen_ai.prompt", length_delimited(1, b"hi"))
+            + protobuf_attribute("offset", varint(3 << 3) + varint((1 << 64) - 5))
+            + protobuf_attribute("tags", length_delimited(5, length_delimited(1, length_delimited(1, b"a"))))
+        )))
+        second = protobuf_request(protobuf_span("invoke_agent", 1))
+        path = self.write("dump.binpb", b"".join(struct.pack(">I", len(request)) + request
+                                                 for request in (first, second)))
+
+        child, root = read_dump(path)
+        self.assertEqual(dict(child.attributes), {"gen_ai.prompt": "hi", "offset": -5, "tags": ("a",)})
+        self.assertEqual((child.context.trace_id, child.parent.span_id), (7, 1))
+        self.assertEqual((child.start_time, child.end_time, child.kind), (1000, 2000, SpanKind.CLIENT))
+        self.assertEqual(child.resource.attributes["service.name"], "agent")
+        self.assertEqual(child.status.status_code, StatusCode.UNSET)
+        self.assertIsNone(root.parent)
+
+    def test_unframed_protobuf_request(self):
+        path = self.write("request.pb", protobuf_request(protobuf_span("Model invoke", 2)))
+        self.assertEqual([span.name for span in read_dump(path)], ["Model invoke"])
+
+
+class TestDumpConversion(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_conversion_matches_live_processor(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(trace_timing=True))
+        run_agent_trace(tracer)
+        expected = [(span.name, without_timing(span.attributes)) for span in exporter.get_finished_spans()]
+
+        os.mkdir(os.path.join(self.directory, "day-1"))
+        dump_path = os.path.join(self.directory, "day-1", "dump.jsonl")
+        with open(dump_path, "w") as dump:
+            dump.write(json.dumps(spans_to_otlp_json(record_agent_trace())) + "\n")
+        converted = InMemorySpanExporter()
+        processor = StrandsToOpenInferenceProcessor(defer_transform=True, max_tracked_spans=100001, trace_timing=True)
+        stats = convert_dumps([self.directory], converted, processor, batch_size=4)
+
+        actual = [(span.name, without_timing(span.attributes)) for span in converted.get_finished_spans()]
+        self.assertEqual(actual, expected)
+        self.assertIn("strands_openinference.timing.llm_ms", converted.get_finished_spans()[-1].attributes)
+        self.assertEqual(stats["spans_read"], stats["spans_written"])
+        self.assertEqual((stats["traces"], stats["partial_traces"]), (1, 0))
+
+    def test_output_file_readable_as_dump(self):
+        output_path = os.path.join(self.directory, "converted.jsonl.gz")
+        exporter = OtlpJsonLinesExporter(output_path)
+        converter = DumpConverter(exporter, batch_size=3)
+        for span in record_agent_trace():
+            converter.add(span)
+        converter.finish()
+        exporter.shutdown()
+
+        converted = list(read_dump(output_path))
+        self.assertEqual(len(converted), len(record_agent_trace()))
+        self.assertEqual(converted[-1].attributes["openinference.span.kind"], "AGENT")
+
+    def test_traces_without_root_flushed_when_buffer_full(self):
+        processor = StrandsToOpenInferenceProcessor(defer_transform=True)
+        converted = InMemorySpanExporter()
+        converter = DumpConverter(converted, processor, batch_size=100, max_buffered_spans=2)
+        children = [span for span in record_agent_trace() if span.parent is not None]
+        for span in children:
+            converter.add(span)
+        stats = converter.finish()
+
+        self.assertEqual(len(converted.get_finished_spans()), len(children))
+        self.assertGreater(stats["partial_traces"], 0)
+        self.assertEqual(converter.buffered_spans, 0)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+    def test_processor_must_defer_transform(self):
+        with self.assertRaises(ValueError):
+            DumpConverter(InMemorySpanExporter(), StrandsToOpenInferenceProcessor())
+
+    def test_large_trace_keeps_parents(self):
+        children = [span for span in record_agent_trace() if span.parent is not None]
+        converted = InMemorySpanExporter()
+        converter = DumpConverter(converted, batch_size=100, max_buffered_spans=len(children))
+        self.assertGreater(converter.processor.max_tracked_spans, len(children))
+        for span in record_agent_trace():
+            converter.add(span)
+        converter.finish()
+
+        with_parent = [span for span in converted.get_finished_spans() if "graph.node.parent_id" in span.attributes]
+        self.assertEqual(len(with_parent), len(children))
+
+        with self.assertRaises(ValueError):
+            DumpConverter(InMemorySpanExporter(), StrandsToOpenInferenceProcessor(defer_transform=True),
+                          max_buffered_spans=20000)
+
+
+if __name__ == "__main__":
+    unittest.main()
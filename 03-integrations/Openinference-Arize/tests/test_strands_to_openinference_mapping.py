@@ -0,0 +1,965 @@
+"""
+Unit tests for the Strands to OpenInference span processor.
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+import os
+import threading
+import unittest
+import uuid
+from collections import OrderedDict
+from unittest import mock
+
+from opentelemetry import trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.id_generator import IdGenerator
+
+from strands_to_openinference_mapping import (
+    FIDELITY_ATTRIBUTE,
+    TIMING_ATTRIBUTE_PREFIX,
+    USAGE_ATTRIBUTE_PREFIX,
+    FlattenedKeyTable,
+    JsonSerializer,
+    KeyPatterns,
+    MetadataKeyFilter,
+    StrandsToOpenInferenceProcessor,
+    StrandsToOpenInferenceSpanExporter,
+    batch_queue_pressure,
+)
+
+
+class SequentialIdGenerator(IdGenerator):
+    """Deterministic ids so that span-id dependent attributes compare across runs."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def generate_span_id(self):
+        return next(self._ids)
+
+    def generate_trace_id(self):
+        return next(self._ids)
+
+
+def make_tracer(processor):
+    """Build a tracer whose spans go through processor and into an in-memory exporter."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(id_generator=SequentialIdGenerator())
+    provider.add_span_processor(processor)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider.get_tracer("test"), exporter
+
+
+def make_deferred_tracer(**options):
+    """Build a tracer that transforms spans on the BatchSpanProcessor worker thread."""
+    exporter = InMemorySpanExporter()
+    processor = StrandsToOpenInferenceProcessor(defer_transform=True, **options)
+    batch_processor = BatchSpanProcessor(StrandsToOpenInferenceSpanExporter(exporter, processor))
+    provider = TracerProvider(id_generator=SequentialIdGenerator())
+    provider.add_span_processor(processor)
+    provider.add_span_processor(batch_processor)
+    return provider.get_tracer("test"), exporter, processor, batch_processor
+
+
+def without_timing(attributes):
+    """Span attributes minus the trace timing summary, which varies between runs."""
+    return {key: value for key, value in attributes.items() if not key.startswith(TIMING_ATTRIBUTE_PREFIX)}
+
+
+def run_agent_trace(tracer, cycles=2):
+    """Emit one synthetic Strands agent trace: agent -> cycles -> model invoke and tool."""
+    with tracer.start_as_current_span("invoke_agent", attributes={
+        "gen_ai.agent.name": "Strands Agents",
+        "gen_ai.prompt": "Book a table",
+        "gen_ai.completion": "Done",
+    }):
+        for cycle in range(cycles):
+            with tracer.start_as_current_span(f"Cycle {cycle}", attributes={"event_loop.cycle_id": str(cycle)}):
+                with tracer.start_as_current_span("Model invoke", attributes={
+                    "gen_ai.request.model": "test-model",
+                    "gen_ai.prompt": '[{"role": "user", "content": [{"text": "Book a table"}]}]',
+                    "gen_ai.completion": '[{"text": "Calling tool"}]',
+                    "gen_ai.usage.prompt_tokens": 10,
+                    "gen_ai.usage.completion_tokens": 5,
+                    "gen_ai.usage.total_tokens": 15,
+                }):
+                    pass
+                with tracer.start_as_current_span("Tool: create_booking", attributes={
+                    "tool.name": "create_booking",
+                    "tool.id": f"tool-{cycle}",
+                    "tool.parameters": '{"guest_name": "Anna"}',
+                    "tool.result": '{"status": "success"}',
+                }):
+                    pass
+
+
+class TestSpanBookkeeping(unittest.TestCase):
+    def test_trace_entries_released_when_root_ends(self):
+        processor = StrandsToOpenInferenceProcessor()
+        tracer, exporter = make_tracer(processor)
+        run_agent_trace(tracer)
+
+        self.assertEqual(len(exporter.get_finished_spans()), 7)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+        self.assertEqual(len(processor.processed_spans), 0)
+        self.assertEqual(len(processor.trace_spans), 0)
+
+    def test_graph_parents_resolved_before_release(self):
+        processor = StrandsToOpenInferenceProcessor()
+        tracer, exporter = make_tracer(processor)
+        run_agent_trace(tracer, cycles=1)
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assertEqual(spans["Model invoke"].attributes["graph.node.parent_id"], "cycle_0")
+        self.assertEqual(spans["Cycle 0"].attributes["graph.node.parent_id"], "strands_agent")
+
+    def test_open_traces_bounded_by_cap(self):
+        processor = StrandsToOpenInferenceProcessor(max_tracked_spans=50)
+        tracer, _ = make_tracer(processor)
+        with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"}):
+            for i in range(500):
+                with tracer.start_as_current_span(f"Cycle {i}"):
+                    self.assertLessEqual(len(processor.span_hierarchy), 50)
+                    self.assertLessEqual(len(processor.processed_spans), 50)
+
+        self.assertEqual(len(processor.span_hierarchy), 0)
+        self.assertEqual(len(processor.trace_spans), 0)
+
+    def test_active_long_running_root_not_evicted(self):
+        processor = StrandsToOpenInferenceProcessor(max_tracked_spans=4, shards=1)
+        tracer, _ = make_tracer(processor)
+        long_root = tracer.start_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"})
+        short_root = tracer.start_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"})
+        short_cycle = tracer.start_span("Cycle 0", context=trace.set_span_in_context(short_root))
+        # A new cycle of the long-running trace makes its root the most recently used
+        tracer.start_span("Cycle 1", context=trace.set_span_in_context(long_root))
+        tracer.start_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"})
+
+        self.assertIn(long_root.get_span_context().span_id, processor.span_hierarchy)
+        self.assertNotIn(short_cycle.get_span_context().span_id, processor.span_hierarchy)
+
+    def test_sustained_load_keeps_structures_flat(self):
+        processor = StrandsToOpenInferenceProcessor()
+        tracer, exporter = make_tracer(processor)
+        for _ in range(200):
+            run_agent_trace(tracer, cycles=1)
+            exporter.clear()
+            self.assertEqual(len(processor.span_hierarchy), 0)
+            self.assertEqual(len(processor.processed_spans), 0)
+
+
+
+class TestDeferredTransform(unittest.TestCase):
+    def test_exporter_matches_processor_output(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        run_agent_trace(tracer)
+        expected = [(span.name, without_timing(span.attributes)) for span in exporter.get_finished_spans()]
+
+        tracer, exporter, processor, batch_processor = make_deferred_tracer()
+        run_agent_trace(tracer)
+        batch_processor.force_flush()
+        actual = [(span.name, without_timing(span.attributes)) for span in exporter.get_finished_spans()]
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+    def test_span_end_leaves_attributes_untouched(self):
+        tracer, exporter, _, batch_processor = make_deferred_tracer()
+        with tracer.start_as_current_span("Model invoke", attributes={"gen_ai.prompt": "hi"}) as span:
+            pass
+
+        self.assertEqual(dict(span.attributes), {"gen_ai.prompt": "hi"})
+        batch_processor.force_flush()
+        exported = exporter.get_finished_spans()[0]
+        self.assertEqual(exported.attributes["openinference.span.kind"], "LLM")
+
+
+
+class TestMessageMapping(unittest.TestCase):
+    def test_llm_values_derived_from_single_message_structure(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        prompt = [
+            {"role": "user", "content": [{"text": "Book a table for Anna"}]},
+            {"role": "assistant", "content": [{"text": "Sure"}],
+             "toolUse": [{"toolUseId": "t1", "name": "create_booking", "input": {"guest_name": "Anna"}}]},
+        ]
+        with tracer.start_as_current_span("Model invoke", attributes={
+            "gen_ai.request.model": "test-model",
+            "gen_ai.prompt": json.dumps(prompt),
+            "gen_ai.completion": json.dumps([{"role": "assistant", "content": "Booked"}]),
+        }):
+            pass
+
+        attributes = exporter.get_finished_spans()[0].attributes
+        input_messages = json.loads(attributes["llm.input_messages"])
+        self.assertEqual(json.loads(attributes["input.value"]), {"messages": input_messages, "model": "test-model"})
+        self.assertEqual(input_messages[1]["message.tool_calls"][0]["tool_call.function.arguments"],
+                         '{"guest_name": "Anna"}')
+        self.assertEqual(json.loads(attributes["llm.input_messages.0.message.content"]), prompt[0]["content"])
+        self.assertEqual(attributes["llm.input_messages.1.message.tool_calls.0.tool_call.id"], "t1")
+        output_value = json.loads(attributes["output.value"])
+        self.assertEqual(output_value["choices"][0]["message"]["content"], "Booked")
+
+
+    def test_flattened_keys_interned_across_spans(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        run_agent_trace(tracer, cycles=2)
+
+        first, second = [span for span in exporter.get_finished_spans() if span.name == "Model invoke"]
+        first_key = next(key for key in first.attributes if key == "llm.input_messages.0.message.role")
+        second_key = next(key for key in second.attributes if key == "llm.input_messages.0.message.role")
+        self.assertIs(first_key, second_key)
+
+    def test_key_table_bounded(self):
+        table = FlattenedKeyTable(max_index=2)
+        self.assertIs(table.for_index("llm.tools", 1), table.for_index("llm.tools", 1))
+        self.assertEqual(table.for_index("llm.tools", 5)["name"], "llm.tools.5.name")
+        self.assertEqual(len(table._tables["llm.tools"]), 2)
+
+    def test_determine_span_kind(self):
+        processor = StrandsToOpenInferenceProcessor()
+        cases = [
+            ("Model invoke", {}, "LLM"),
+            ("Tool: create_booking", {}, "TOOL"),
+            ("invoke_agent Booking", {"gen_ai.agent.name": "Booking"}, "AGENT"),
+            (f"Cycle {uuid.uuid4()}", {}, "CHAIN"),
+        ]
+        for name, attrs, kind in cases:
+            span = mock.Mock()
+            span.name = name
+            self.assertEqual(processor._determine_span_kind(span, attrs), kind)
+
+
+class TestJsonSerializer(unittest.TestCase):
+    values = [
+        {"guest_name": "Anna", "num_guests": 2, "confirmed": True, "notes": None},
+        [{"text": "Caf\u00e9 \u2028 </script>"}, 0.7, -3],
+        {1: "non-string key", "big": 2 ** 70},
+        ("tuple", "values"),
+    ]
+
+    def test_default_backend_matches_standard_library(self):
+        serializer = JsonSerializer()
+        for value in self.values:
+            self.assertEqual(serializer.dumps(value), json.dumps(value, separators=(",", ":")))
+
+    def test_processor_defaults_to_standard_library(self):
+        processor = StrandsToOpenInferenceProcessor()
+        self.assertIs(type(processor.json_serializer), JsonSerializer)
+        self.assertEqual(processor.json_serializer.dumps({"temperature": 1e-7}), '{"temperature":1e-07}')
+
+
+class TestContentLimits(unittest.TestCase):
+    def adversarial_trace(self, tracer):
+        image = base64.b64encode(os.urandom(512 * 1024)).decode()
+        prompt = [{"role": "user", "content": [
+            {"text": "Describe this menu " * 20000},
+            {"image": {"format": "png", "source": {"bytes": image}}},
+        ]}]
+        with tracer.start_as_current_span("Model invoke", attributes={
+            "gen_ai.prompt": json.dumps(prompt),
+            "gen_ai.completion": json.dumps([{"text": "A menu " * 50000}]),
+        }):
+            pass
+        with tracer.start_as_current_span("Tool: retrieve", attributes={
+            "tool.name": "retrieve",
+            "tool.parameters": json.dumps({"text": "menu " * 50000}),
+            "tool.result": json.dumps({"content": [{"document": {"format": "pdf", "source": {"bytes": image}}}]}),
+            "tool.raw_output": "x " * 100000,
+        }):
+            pass
+        return image
+
+    def test_output_bounded_on_adversarial_payloads(self):
+        processor = StrandsToOpenInferenceProcessor(
+            max_content_bytes=4096, max_attribute_bytes=16384, strip_binary=True,
+        )
+        tracer, exporter = make_tracer(processor)
+        self.adversarial_trace(tracer)
+
+        for span in exporter.get_finished_spans():
+            for key, value in span.attributes.items():
+                self.assertLessEqual(len(str(value).encode()), 16384, key)
+            self.assertLess(sum(len(str(v).encode()) for v in span.attributes.values()), 256 * 1024)
+
+    def test_binary_blocks_replaced_by_placeholder(self):
+        processor = StrandsToOpenInferenceProcessor(strip_binary=True)
+        tracer, exporter = make_tracer(processor)
+        image = self.adversarial_trace(tracer)
+        data = image.encode()
+
+        llm_span = exporter.get_finished_spans()[0]
+        content = json.loads(llm_span.attributes["llm.input_messages.0.message.content"])
+        self.assertRegex(content[1]["image"]["source"]["bytes"], rf"^<binary {len(data)} bytes sha256:[0-9a-f]{{16}}>$")
+        self.assertTrue(content[0]["text"].startswith("Describe this menu"))
+        self.assertNotIn(image[:1000], llm_span.attributes["input.value"])
+
+    def test_binary_detection_needs_base64_evidence(self):
+        processor = StrandsToOpenInferenceProcessor(strip_binary=True, binary_min_bytes=64)
+        data = base64.b64encode(bytes(range(255, 159, -1))).decode()
+        self.assertTrue(processor._is_binary_text("data:image/png;base64," + data))
+        self.assertTrue(processor._is_binary_text(data))
+        self.assertFalse(processor._is_binary_text("a1B2" * 64))
+        self.assertFalse(processor._is_binary_text(data[:-1]))
+        self.assertFalse(processor._is_binary_text(data[:64] + "\r\n" + data[64:-2]))
+
+    def test_limited_prompt_parsed_once(self):
+        processor = StrandsToOpenInferenceProcessor(max_content_bytes=64)
+        tracer, exporter = make_tracer(processor)
+        prompt = json.dumps([{"role": "user", "content": [{"text": "Book a table " * 20}]}])
+        with mock.patch("strands_to_openinference_mapping.json.loads", side_effect=json.loads) as loads:
+            with tracer.start_as_current_span("Model invoke", attributes={"gen_ai.prompt": prompt}):
+                pass
+
+        parsed = [call.args[0] for call in loads.call_args_list if call.args[0].startswith('[{"role"')]
+        self.assertEqual(parsed, [prompt])
+        content = exporter.get_finished_spans()[0].attributes["llm.input_messages.0.message.content"]
+        self.assertIn("...[truncated", content)
+
+    def test_truncation_keeps_head_and_tail(self):
+        processor = StrandsToOpenInferenceProcessor(max_attribute_bytes=200, attribute_byte_budgets={"tool.result": 100})
+        tracer, exporter = make_tracer(processor)
+        with tracer.start_as_current_span("Tool: retrieve", attributes={
+            "tool.name": "retrieve",
+            "tool.result": "HEAD" + "-" * 5000 + "TAIL",
+        }):
+            pass
+
+        attributes = exporter.get_finished_spans()[0].attributes
+        self.assertLessEqual(len(attributes["tool.result"]), 100)
+        self.assertLessEqual(len(attributes["llm.output_messages.0.message.content"]), 200)
+        self.assertRegex(attributes["tool.result"], r"^HEAD-+\.\.\.\[truncated \d+ bytes\]\.\.\.-+TAIL$")
+        self.assertEqual(attributes["tool.name"], "retrieve")
+
+    def test_json_attributes_stay_valid_under_budget(self):
+        processor = StrandsToOpenInferenceProcessor(max_attribute_bytes=2048, attribute_byte_budgets={"metadata": 300})
+        tracer, exporter = make_tracer(processor)
+        self.adversarial_trace(tracer)
+        with tracer.start_as_current_span("Tool: lookup", attributes={
+            "tool.name": "lookup", "custom.notes": "n" * 5000, "custom.tags": json.dumps(["t"] * 200),
+        }):
+            pass
+
+        for span in exporter.get_finished_spans():
+            attributes = span.attributes
+            for key in ("input.value", "output.value"):
+                if attributes.get(key[:-len("value")] + "mime_type") == "application/json" and key in attributes:
+                    json.loads(attributes[key])
+            for key in ("llm.input_messages", "llm.output_messages", "metadata"):
+                if key in attributes:
+                    json.loads(attributes[key])
+            for key, value in attributes.items():
+                budget = 300 if key == "metadata" else 2048
+                self.assertLessEqual(len(str(value).encode()), budget, key)
+
+    def test_content_limits_keep_untouched_json_as_is(self):
+        processor = StrandsToOpenInferenceProcessor(max_content_bytes=4096)
+        prompt = '[{"role": "user", "content": [{"text": "Caf\\u00e9 hours?"}]}]'
+        self.assertEqual(processor._limit_attribute_value(prompt, 4096), prompt)
+
+        limited = processor._limit_attribute_value('{"text": "%s", "n": 1}' % ("é" * 3000), 100)
+        self.assertEqual(limited, processor.json_serializer.dumps(json.loads(limited)))
+        self.assertIn("...[truncated", limited)
+
+    def test_truncation_fits_budget_smaller_than_marker(self):
+        processor = StrandsToOpenInferenceProcessor()
+        for budget in (0, 5, 20, 30):
+            self.assertLessEqual(len(processor._truncate_text("x" * 1000, budget).encode()), budget)
+
+    def test_limits_disabled_by_default(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        with tracer.start_as_current_span("Tool: retrieve", attributes={"tool.name": "retrieve", "tool.result": "r" * 5000}):
+            pass
+        self.assertEqual(exporter.get_finished_spans()[0].attributes["tool.result"], "r" * 5000)
+
+
+
+def run_conversation_trace(tracer, prompts):
+    """Emit an agent trace with one Model invoke span per prompt in prompts."""
+    with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "Strands Agents"}):
+        for cycle, prompt in enumerate(prompts):
+            with tracer.start_as_current_span(f"Cycle {cycle}"):
+                with tracer.start_as_current_span("Model invoke", attributes={
+                    "gen_ai.prompt": json.dumps(prompt),
+                    "gen_ai.completion": json.dumps([{"text": f"answer {cycle}"}]),
+                }):
+                    pass
+
+
+class TestDeltaMessages(unittest.TestCase):
+    def conversation(self, turns):
+        messages = []
+        prompts = []
+        for turn in range(turns):
+            messages.append({"role": "user", "content": [{"text": f"question {turn} " * 20}]})
+            prompts.append(list(messages))
+            messages.append({"role": "assistant", "content": [{"text": f"answer {turn}"}]})
+        return prompts
+
+    def llm_spans(self, exporter):
+        return [span for span in exporter.get_finished_spans() if span.name == "Model invoke"]
+
+    def history(self, span, spans_by_id):
+        attributes = span.attributes
+        messages = json.loads(attributes["llm.input_messages"])
+        previous_span_id = attributes.get("llm.input_messages_delta.previous_span_id")
+        if previous_span_id is None:
+            return messages
+        offset = attributes["llm.input_messages_delta.offset"]
+        return self.history(spans_by_id[previous_span_id], spans_by_id)[:offset] + messages
+
+    def test_full_history_reconstructable(self):
+        prompts = self.conversation(20)
+        tracer, full_exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        run_conversation_trace(tracer, prompts)
+        tracer, delta_exporter = make_tracer(StrandsToOpenInferenceProcessor(delta_messages=True))
+        run_conversation_trace(tracer, prompts)
+
+        delta_spans = self.llm_spans(delta_exporter)
+        spans_by_id = {format(span.context.span_id, "016x"): span for span in delta_spans}
+        for full_span, delta_span in zip(self.llm_spans(full_exporter), delta_spans):
+            self.assertEqual(self.history(delta_span, spans_by_id), json.loads(full_span.attributes["llm.input_messages"]))
+        self.assertEqual(delta_spans[5].attributes["llm.input_messages_delta.offset"], 9)
+        self.assertEqual(delta_spans[5].attributes["llm.input_messages.0.message.role"], "assistant")
+        self.assertNotIn("llm.input_messages.2.message.role", delta_spans[5].attributes)
+
+        full_bytes = sum(len(span.attributes["llm.input_messages"]) for span in self.llm_spans(full_exporter))
+        delta_bytes = sum(len(span.attributes["llm.input_messages"]) for span in delta_spans)
+        self.assertLess(delta_bytes * 5, full_bytes)
+
+    def test_rewritten_history_emitted_in_full(self):
+        prompts = self.conversation(3)
+        prompts[2] = prompts[2][2:]
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(delta_messages=True))
+        run_conversation_trace(tracer, prompts)
+
+        last = self.llm_spans(exporter)[2].attributes
+        self.assertNotIn("llm.input_messages_delta.offset", last)
+        self.assertEqual(json.loads(last["llm.input_messages"])[0]["message.content"], prompts[2][0]["content"])
+
+
+
+class TestContentDedup(unittest.TestCase):
+    tools = json.dumps([
+        {"name": "create_booking", "description": "Create a new booking", "input_schema": {"type": "object"}},
+        {"name": "delete_booking", "description": "Delete a booking", "input_schema": {"type": "object"}},
+    ])
+    system_prompt = "You are Restaurant Helper. " * 100
+
+    def run_trace(self, tracer, tools=None):
+        with tracer.start_as_current_span("invoke_agent", attributes={
+            "gen_ai.agent.name": "Strands Agents",
+            "gen_ai.agent.tools": tools or self.tools,
+        }):
+            for cycle in range(2):
+                with tracer.start_as_current_span("Model invoke", attributes={
+                    "system_prompt": self.system_prompt,
+                    "gen_ai.prompt": "hi",
+                }):
+                    pass
+
+    def test_first_occurrence_per_trace_carries_full_content(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(dedup_content=True))
+        for _ in range(2):
+            self.run_trace(tracer)
+
+            first_llm, second_llm, agent = exporter.get_finished_spans()
+            self.assertIn(self.system_prompt, first_llm.attributes["metadata"])
+            self.assertNotIn(self.system_prompt, second_llm.attributes.get("metadata", ""))
+            self.assertEqual(first_llm.attributes["system_prompt_hash"], second_llm.attributes["system_prompt_hash"])
+            self.assertEqual(agent.attributes["llm.tools.1.name"], "delete_booking")
+            self.assertIn("llm.tools_hash", agent.attributes)
+            exporter.clear()
+
+    def test_per_trace_hashes_released_with_trace(self):
+        processor = StrandsToOpenInferenceProcessor(dedup_content=True, max_dedup_entries=4)
+        tracer, _ = make_tracer(processor)
+        with mock.patch.object(processor, "evictions") as evictions:
+            for _ in range(10):
+                self.run_trace(tracer)
+
+        self.assertEqual((processor.content_hashes, processor.trace_digests), (OrderedDict(), {}))
+        evictions.add.assert_not_called()
+
+    def test_time_window_dedups_across_traces(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(dedup_content=True, dedup_window_seconds=60))
+        self.run_trace(tracer)
+        self.run_trace(tracer)
+
+        first_agent, second_agent = [span for span in exporter.get_finished_spans() if span.name == "invoke_agent"]
+        self.assertEqual(first_agent.attributes["llm.tools.0.name"], "create_booking")
+        self.assertNotIn("llm.tools.0.name", second_agent.attributes)
+        self.assertEqual(first_agent.attributes["llm.tools_hash"], second_agent.attributes["llm.tools_hash"])
+
+    def test_evicted_hash_emitted_in_full_again(self):
+        processor = StrandsToOpenInferenceProcessor(dedup_content=True, dedup_window_seconds=60, max_dedup_entries=1)
+        tracer, exporter = make_tracer(processor)
+        other_tools = json.dumps([{"name": "retrieve", "description": "Search the knowledge base"}])
+        for tools in [self.tools, other_tools, self.tools]:
+            self.run_trace(tracer, tools)
+
+        agents = [span for span in exporter.get_finished_spans() if span.name == "invoke_agent"]
+        self.assertTrue(all("llm.tools.0.name" in span.attributes for span in agents))
+        self.assertLessEqual(len(processor.content_hashes), 1)
+
+
+class TestMetadataFilter(unittest.TestCase):
+    def test_exact_and_prefix_patterns(self):
+        patterns = KeyPatterns(["aws.region", "gen_ai.usage.*", "x*"])
+
+        self.assertIn("aws.region", patterns)
+        self.assertNotIn("aws.region.name", patterns)
+        self.assertNotIn("aws", patterns)
+        self.assertIn("gen_ai.usage.", patterns)
+        self.assertIn("gen_ai.usage.cache_read_input_tokens", patterns)
+        self.assertNotIn("gen_ai.usage", patterns)
+        self.assertIn("x", patterns)
+        self.assertIn("xray.trace", patterns)
+        self.assertNotIn("", patterns)
+
+    def test_wildcard_matches_everything(self):
+        patterns = KeyPatterns(["*"])
+        self.assertIn("", patterns)
+        self.assertIn("anything.at.all", patterns)
+
+    def test_invalid_patterns_rejected(self):
+        for pattern in ["", "gen_ai.*.tokens", "*.tokens", "aws.**"]:
+            with self.assertRaises(ValueError, msg=pattern):
+                KeyPatterns([pattern])
+
+    def test_denylist_wins_over_allowlist(self):
+        key_filter = MetadataKeyFilter(allowlist=["aws.*", "session.tag"], denylist=["aws.secret*"])
+
+        self.assertTrue(key_filter["aws.region"])
+        self.assertTrue(key_filter["session.tag"])
+        self.assertFalse(key_filter["aws.secret_key"])
+        self.assertFalse(key_filter["event_loop.cycle_id"])
+        self.assertFalse(MetadataKeyFilter(allowlist=[])["aws.region"])
+        self.assertTrue(MetadataKeyFilter(denylist=["aws.*"])["event_loop.cycle_id"])
+
+    def test_decisions_memoized_up_to_cap(self):
+        key_filter = MetadataKeyFilter(denylist=["debug.*"], max_keys=2)
+        for key in ["a", "b", "debug.c", "d"]:
+            key_filter[key]
+        self.assertEqual(dict(key_filter), {"a": True, "b": True})
+        self.assertFalse(key_filter["debug.c"])
+
+    def run_metadata_span(self, processor):
+        tracer, exporter = make_tracer(processor)
+        with tracer.start_as_current_span("Model invoke", attributes={
+            "gen_ai.prompt": "hi",
+            "gen_ai.request.model": "test-model",
+            "aws.region": "us-west-2",
+            "aws.request_id": "req-1",
+            "event_loop.cycle_id": "0",
+            "internal.debug_blob": "x" * 100,
+        }):
+            pass
+        metadata = exporter.get_finished_spans()[0].attributes.get("metadata")
+        return json.loads(metadata) if metadata else None
+
+    def test_processor_filters_metadata(self):
+        self.assertEqual(set(self.run_metadata_span(StrandsToOpenInferenceProcessor())),
+                         {"aws.region", "aws.request_id", "event_loop.cycle_id", "internal.debug_blob"})
+        self.assertEqual(
+            self.run_metadata_span(StrandsToOpenInferenceProcessor(
+                metadata_allowlist=["aws.*", "event_loop.cycle_id"], metadata_denylist=["aws.request_id"])),
+            {"aws.region": "us-west-2", "event_loop.cycle_id": "0"},
+        )
+        self.assertEqual(set(self.run_metadata_span(StrandsToOpenInferenceProcessor(metadata_denylist=["internal.*"]))),
+                         {"aws.region", "aws.request_id", "event_loop.cycle_id"})
+        self.assertIsNone(self.run_metadata_span(StrandsToOpenInferenceProcessor(metadata_allowlist=[])))
+
+
+class TestProcessorMetrics(unittest.TestCase):
+    def setUp(self):
+        self.reader = InMemoryMetricReader()
+        self.meter_provider = MeterProvider(metric_readers=[self.reader])
+
+    def collect(self):
+        """Map metric name to its data points."""
+        data = self.reader.get_metrics_data()
+        return {
+            metric.name: list(metric.data.data_points)
+            for resource_metrics in data.resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        }
+
+    def test_transform_duration_and_sizes_per_span_kind(self):
+        tracer, _ = make_tracer(StrandsToOpenInferenceProcessor(meter_provider=self.meter_provider,
+                                                                span_metrics=True))
+        run_agent_trace(tracer, cycles=2)
+
+        points = self.collect()
+        durations = {p.attributes["openinference.span.kind"]: p.count
+                     for p in points["strands_openinference.transform.duration"]}
+        self.assertEqual(durations, {"AGENT": 1, "CHAIN": 2, "LLM": 2, "TOOL": 2})
+        sizes = {(p.attributes["openinference.span.kind"], p.attributes["direction"]): p.sum
+                 for p in points["strands_openinference.attribute.size"]}
+        self.assertGreater(sizes[("LLM", "out")], sizes[("LLM", "in")])
+        self.assertEqual(points["strands_openinference.spans_in_flight"][0].value, 0)
+
+    def test_span_histograms_off_by_default(self):
+        processor = StrandsToOpenInferenceProcessor(meter_provider=self.meter_provider)
+        tracer, _ = make_tracer(processor)
+        with mock.patch.object(processor, "_attribute_size") as attribute_size:
+            run_agent_trace(tracer, cycles=1)
+
+        attribute_size.assert_not_called()
+        points = self.collect()
+        self.assertNotIn("strands_openinference.transform.duration", points)
+        self.assertNotIn("strands_openinference.attribute.size", points)
+
+    def test_evictions_and_serialization_failures_counted(self):
+        processor = StrandsToOpenInferenceProcessor(max_tracked_spans=2, meter_provider=self.meter_provider)
+        tracer, _ = make_tracer(processor)
+        with tracer.start_as_current_span("invoke_agent"):
+            for cycle in range(3):
+                with tracer.start_as_current_span(f"Cycle {cycle}"):
+                    pass
+            processor._serialize_value({"unserializable": object()})
+
+            points = self.collect()
+            self.assertEqual(points["strands_openinference.spans_in_flight"][0].value, 2)
+
+        points = self.collect()
+        evictions = {p.attributes["cache"]: p.value for p in points["strands_openinference.evictions"]}
+        self.assertEqual(evictions, {"span_hierarchy": 2})
+        failures = {p.attributes["stage"]: p.value for p in points["strands_openinference.serialization.failures"]}
+        self.assertEqual(failures, {"value": 1})
+
+
+class TestTraceTiming(unittest.TestCase):
+    MS = 1_000_000
+
+    def run_timed_trace(self, tracer):
+        """Agent trace with fixed timestamps (ms): two cycles, a tool call in the first."""
+        def span(name, parent, start, end, attributes=None):
+            context = trace.set_span_in_context(parent) if parent is not None else None
+            started = tracer.start_span(name, context=context, start_time=start * self.MS, attributes=attributes)
+            return started, end
+
+        agent, agent_end = span("invoke_agent", None, 0, 100, {"gen_ai.agent.name": "Strands Agents"})
+        cycle0, cycle0_end = span("Cycle 0", agent, 0, 60, {"event_loop.cycle_id": "0"})
+        for child, end in [
+            span("Model invoke", cycle0, 0, 40, {"gen_ai.prompt": "hi"}),
+            span("Tool: create_booking", cycle0, 40, 58, {"tool.name": "create_booking"}),
+        ]:
+            child.end(end * self.MS)
+        cycle0.end(cycle0_end * self.MS)
+        cycle1, cycle1_end = span("Cycle 1", agent, 60, 100, {"event_loop.cycle_id": "1"})
+        llm, llm_end = span("Model invoke", cycle1, 60, 95, {"gen_ai.prompt": "hi"})
+        llm.end(llm_end * self.MS)
+        cycle1.end(cycle1_end * self.MS)
+        agent.end(agent_end * self.MS)
+
+    def assert_timing(self, root_attributes):
+        self.assertEqual(root_attributes[TIMING_ATTRIBUTE_PREFIX + "llm_ms"], 75.0)
+        self.assertEqual(root_attributes[TIMING_ATTRIBUTE_PREFIX + "tool_ms"], 18.0)
+        self.assertEqual(json.loads(root_attributes[TIMING_ATTRIBUTE_PREFIX + "tools"]),
+                         {"create_booking": {"count": 1, "ms": 18.0}})
+        self.assertEqual(json.loads(root_attributes[TIMING_ATTRIBUTE_PREFIX + "critical_path"]), [
+            ["Model invoke", 40.0], ["Tool: create_booking", 18.0], ["Cycle 0", 2.0],
+            ["Model invoke", 35.0], ["Cycle 1", 5.0],
+        ])
+
+    def test_summary_on_root_span(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(trace_timing=True))
+        self.run_timed_trace(tracer)
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assert_timing(spans["invoke_agent"].attributes)
+        self.assertNotIn(TIMING_ATTRIBUTE_PREFIX + "llm_ms", spans["Cycle 1"].attributes)
+
+    def test_summary_with_deferred_transform(self):
+        tracer, exporter, processor, batch_processor = make_deferred_tracer(trace_timing=True)
+        self.run_timed_trace(tracer)
+        batch_processor.force_flush()
+
+        root = next(span for span in exporter.get_finished_spans() if span.name == "invoke_agent")
+        self.assert_timing(root.attributes)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+    def test_summary_off_by_default(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        self.run_timed_trace(tracer)
+
+        root = next(span for span in exporter.get_finished_spans() if span.name == "invoke_agent")
+        self.assertFalse(any(key.startswith(TIMING_ATTRIBUTE_PREFIX) for key in root.attributes))
+
+
+class TestTraceUsage(unittest.TestCase):
+    PRICES = {"model-a": {"input": 3.0, "output": 15.0, "cache_read": 0.3, "cache_write": 3.75}}
+
+    def run_usage_trace(self, tracer):
+        """
+        Agent trace with three cycles on two models, the last cycle calling a tool that
+        runs a nested agent. The agent spans carry Strands' own usage totals too.
+        """
+        usages = [
+            ("model-a", {"gen_ai.usage.prompt_tokens": 1000, "gen_ai.usage.completion_tokens": 100,
+                         "gen_ai.usage.total_tokens": 1100, "gen_ai.usage.cache_write_input_tokens": 2000}),
+            ("model-a", {"gen_ai.usage.prompt_tokens": 200, "gen_ai.usage.completion_tokens": 50,
+                         "gen_ai.usage.total_tokens": 250, "gen_ai.usage.cache_read_input_tokens": 2000}),
+            ("model-b", {"gen_ai.usage.input_tokens": 300, "gen_ai.usage.output_tokens": 30}),
+        ]
+        with tracer.start_as_current_span("invoke_agent", attributes={
+            "gen_ai.agent.name": "Strands Agents", "gen_ai.usage.total_tokens": 9999,
+        }):
+            for cycle, (model, usage) in enumerate(usages):
+                with tracer.start_as_current_span(f"Cycle {cycle}", attributes={"event_loop.cycle_id": str(cycle)}):
+                    with tracer.start_as_current_span("Model invoke", attributes={
+                        "gen_ai.request.model": model, "gen_ai.prompt": "hi", **usage,
+                    }):
+                        pass
+            with tracer.start_as_current_span("Tool: ask_expert", attributes={"tool.name": "ask_expert"}):
+                with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "expert"}):
+                    with tracer.start_as_current_span("Model invoke", attributes={
+                        "gen_ai.request.model": "model-a", "gen_ai.prompt": "hi",
+                        "gen_ai.usage.prompt_tokens": 10, "gen_ai.usage.completion_tokens": 5,
+                        "gen_ai.usage.total_tokens": 15,
+                    }):
+                        pass
+
+    def usage_attributes(self, spans):
+        root = next(span for span in spans if span.name == "invoke_agent" and span.parent is None)
+        return {key[len(USAGE_ATTRIBUTE_PREFIX):]: value for key, value in root.attributes.items()
+                if key.startswith(USAGE_ATTRIBUTE_PREFIX)}
+
+    def test_token_totals_on_root_span(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(trace_usage=True))
+        self.run_usage_trace(tracer)
+        spans = exporter.get_finished_spans()
+
+        self.assertEqual(self.usage_attributes(spans), {
+            "llm_calls": 4,
+            "prompt_tokens": 1510,
+            "completion_tokens": 185,
+            "total_tokens": 1695,
+            "cache_read_tokens": 2000,
+            "cache_write_tokens": 2000,
+        })
+        nested_agent = next(span for span in spans if span.name == "invoke_agent" and span.parent is not None)
+        self.assertFalse(any(key.startswith(USAGE_ATTRIBUTE_PREFIX) for key in nested_agent.attributes))
+
+    def test_cost_estimated_from_price_table(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(trace_usage=True, token_prices=self.PRICES))
+        self.run_usage_trace(tracer)
+        usage = self.usage_attributes(exporter.get_finished_spans())
+
+        # model-a: 1210 input, 155 output, 2000 cache read, 2000 cache write tokens
+        expected = (1210 * 3.0 + 155 * 15.0 + 2000 * 0.3 + 2000 * 3.75) / 1e6
+        self.assertAlmostEqual(usage["cost_usd"], expected, places=6)
+        self.assertEqual(usage["unpriced_models"], ("model-b",))
+
+    def test_cache_tokens_mapped_per_span(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor())
+        self.run_usage_trace(tracer)
+
+        llm_spans = [span for span in exporter.get_finished_spans() if span.name == "Model invoke"]
+        self.assertEqual(llm_spans[0].attributes["llm.token_count.prompt_details.cache_write"], 2000)
+        self.assertEqual(llm_spans[1].attributes["llm.token_count.prompt_details.cache_read"], 2000)
+
+    def test_totals_with_deferred_transform(self):
+        tracer, exporter, processor, batch_processor = make_deferred_tracer(trace_usage=True)
+        self.run_usage_trace(tracer)
+        batch_processor.force_flush()
+
+        self.assertEqual(self.usage_attributes(exporter.get_finished_spans())["total_tokens"], 1695)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+    def test_usage_off_by_default(self):
+        tracer, exporter = make_tracer(StrandsToOpenInferenceProcessor(token_prices=self.PRICES))
+        self.run_usage_trace(tracer)
+        self.assertEqual(self.usage_attributes(exporter.get_finished_spans()), {})
+
+
+class BlockingExporter(InMemorySpanExporter):
+    """In-memory exporter that holds every export until released, like a stalled backend."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def export(self, spans):
+        self.released.wait(5)
+        return super().export(spans)
+
+
+class TestAdaptiveFidelity(unittest.TestCase):
+    def run_llm_span(self, pressure):
+        processor = StrandsToOpenInferenceProcessor(export_queue_pressure=lambda: pressure,
+                                                    degraded_content_bytes=64)
+        tracer, exporter = make_tracer(processor)
+        with tracer.start_as_current_span("Model invoke", attributes={
+            "gen_ai.request.model": "test-model",
+            "gen_ai.prompt": json.dumps([{"role": "user", "content": [{"text": "x" * 1000}]}]),
+            "gen_ai.completion": '[{"text": "Sure"}]',
+            "gen_ai.usage.total_tokens": 300,
+            "session.id": "session-1",
+        }):
+            pass
+        return exporter.get_finished_spans()[0].attributes
+
+    def test_fidelity_steps_down_with_queue_pressure(self):
+        full = self.run_llm_span(0.1)
+        self.assertNotIn(FIDELITY_ATTRIBUTE, full)
+        self.assertIn("x" * 1000, full["llm.input_messages"])
+
+        truncated = self.run_llm_span(0.6)
+        self.assertEqual(truncated[FIDELITY_ATTRIBUTE], "truncated")
+        self.assertIn("truncated", truncated["llm.input_messages.0.message.content"])
+        self.assertLess(len(truncated["llm.input_messages"]), 200)
+
+        minimal = self.run_llm_span(0.9)
+        self.assertEqual(minimal[FIDELITY_ATTRIBUTE], "minimal")
+        self.assertEqual(minimal["llm.token_count.total"], 300)
+        self.assertEqual(minimal["llm.model_name"], "test-model")
+        self.assertEqual(minimal["session.id"], "session-1")
+        self.assertEqual(minimal["openinference.span.kind"], "LLM")
+        self.assertFalse(any(key.startswith(("llm.input_messages", "input.", "metadata")) for key in minimal))
+
+    def test_batch_queue_pressure_degrades_spans(self):
+        blocking_exporter = BlockingExporter()
+        batch_processor = BatchSpanProcessor(blocking_exporter, max_queue_size=20, max_export_batch_size=20,
+                                             schedule_delay_millis=60000)
+        processor = StrandsToOpenInferenceProcessor(export_queue_pressure=batch_queue_pressure(batch_processor))
+        seen = InMemorySpanExporter()
+        provider = TracerProvider(id_generator=SequentialIdGenerator())
+        provider.add_span_processor(processor)
+        provider.add_span_processor(SimpleSpanProcessor(seen))
+        provider.add_span_processor(batch_processor)
+        tracer = provider.get_tracer("test")
+        try:
+            for _ in range(3):
+                run_agent_trace(tracer, cycles=3)
+        finally:
+            blocking_exporter.released.set()
+            provider.shutdown()
+
+        fidelities = [span.attributes.get(FIDELITY_ATTRIBUTE, "full") for span in seen.get_finished_spans()]
+        self.assertEqual(fidelities[0], "full")
+        self.assertIn("truncated", fidelities)
+        self.assertIn("minimal", fidelities)
+
+
+class TestConcurrency(unittest.TestCase):
+    THREADS = 16
+    TRACES_PER_THREAD = 10
+    TOOLS_PER_CYCLE = 3
+
+    def run_threaded_traces(self, tracer):
+        """
+        Agent traces ended from many threads at once, each cycle running its tools
+        on threads of their own, like concurrent agents with threaded tools.
+        """
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def run_tool(cycle_context, name):
+            with tracer.start_as_current_span(f"Tool: {name}", context=cycle_context,
+                                              attributes={"tool.name": name, "tool.id": name}):
+                pass
+
+        def run_agent(worker):
+            try:
+                barrier.wait()
+                for trace_idx in range(self.TRACES_PER_THREAD):
+                    with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"}):
+                        for cycle in range(2):
+                            cycle_id = f"{worker}-{trace_idx}-{cycle}"
+                            with tracer.start_as_current_span(f"Cycle {cycle_id}",
+                                                              attributes={"event_loop.cycle_id": cycle_id}) as cycle_span:
+                                with tracer.start_as_current_span("Model invoke", attributes={"gen_ai.prompt": "hi"}):
+                                    pass
+                                tools = [
+                                    threading.Thread(target=run_tool, args=(
+                                        trace.set_span_in_context(cycle_span), f"tool_{cycle_id}_{idx}"))
+                                    for idx in range(self.TOOLS_PER_CYCLE)
+                                ]
+                                for tool in tools:
+                                    tool.start()
+                                for tool in tools:
+                                    tool.join()
+            except Exception as e:
+                errors.append(e)
+
+        with self.assertNoLogs("strands_to_openinference_mapping", level="ERROR"):
+            workers = [threading.Thread(target=run_agent, args=(worker,)) for worker in range(self.THREADS)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.assertEqual(errors, [])
+
+    def assert_parent_links(self, spans):
+        """Every LLM and tool span points at the graph node of the cycle that is its parent."""
+        names = {span.context.span_id: span.name for span in spans}
+        children = [span for span in spans if span.name == "Model invoke" or span.name.startswith("Tool:")]
+        self.assertTrue(children)
+        for span in children:
+            cycle_id = names[span.parent.span_id].replace("Cycle ", "")
+            self.assertEqual(span.attributes["graph.node.parent_id"], f"cycle_{cycle_id}")
+
+    def test_threaded_traces_keep_parent_links(self):
+        processor = StrandsToOpenInferenceProcessor(trace_timing=True)
+        tracer, exporter = make_tracer(processor)
+        self.run_threaded_traces(tracer)
+        spans = exporter.get_finished_spans()
+
+        spans_per_trace = 1 + 2 * (2 + self.TOOLS_PER_CYCLE)
+        self.assertEqual(len(spans), self.THREADS * self.TRACES_PER_THREAD * spans_per_trace)
+        self.assert_parent_links(spans)
+        for root in (span for span in spans if span.name == "invoke_agent"):
+            tools = json.loads(root.attributes[TIMING_ATTRIBUTE_PREFIX + "tools"])
+            self.assertEqual(len(tools), 2 * self.TOOLS_PER_CYCLE)
+        self.assertEqual(len(processor.span_hierarchy), 0)
+        self.assertEqual(len(processor.trace_spans), 0)
+        self.assertEqual(len(processor.processed_spans), 0)
+
+    def test_threaded_traces_with_deferred_transform(self):
+        tracer, exporter, processor, batch_processor = make_deferred_tracer()
+        self.run_threaded_traces(tracer)
+        batch_processor.force_flush()
+
+        self.assert_parent_links(exporter.get_finished_spans())
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+    def test_span_cap_holds_under_contention(self):
+        processor = StrandsToOpenInferenceProcessor(max_tracked_spans=64, shards=4)
+        tracer, _ = make_tracer(processor)
+        self.run_threaded_traces(tracer)
+
+        self.assertEqual(len(processor.span_hierarchy), 0)
+        self.assertEqual(len(processor.trace_spans), 0)
+
+    def test_interleaved_asyncio_traces(self):
+        processor = StrandsToOpenInferenceProcessor()
+        tracer, exporter = make_tracer(processor)
+
+        async def run_agent(agent):
+            with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"}):
+                for cycle in range(3):
+                    with tracer.start_as_current_span(f"Cycle {agent}-{cycle}"):
+                        await asyncio.sleep(0)
+                        with tracer.start_as_current_span("Model invoke", attributes={"gen_ai.prompt": "hi"}):
+                            await asyncio.sleep(0)
+
+        async def run_agents():
+            await asyncio.gather(*(run_agent(agent) for agent in range(50)))
+
+        asyncio.run(run_agents())
+        self.assert_parent_links(exporter.get_finished_spans())
+        self.assertEqual(len(processor.span_hierarchy), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the tail-based sampling span processor.
+"""
+
+import itertools
+import unittest
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.id_generator import IdGenerator
+from opentelemetry.trace import Status, StatusCode
+
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor
+from tail_sampling_processor import TailSamplingSpanProcessor
+
+
+class SequentialIdGenerator(IdGenerator):
+    """Trace ids spread evenly over the 64-bit sampling range."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def generate_span_id(self):
+        return next(self._ids)
+
+    def generate_trace_id(self):
+        return (next(self._ids) * 0x9E3779B97F4A7C15) & ((1 << 128) - 1)
+
+
+def make_tracer(**kwargs):
+    exporter = InMemorySpanExporter()
+    sampler = TailSamplingSpanProcessor(SimpleSpanProcessor(exporter), **kwargs)
+    provider = TracerProvider(id_generator=SequentialIdGenerator())
+    provider.add_span_processor(StrandsToOpenInferenceProcessor())
+    provider.add_span_processor(sampler)
+    return provider.get_tracer("test"), exporter, sampler
+
+
+def run_trace(tracer, error=False, total_tokens=100, duration_ns=0, llm_calls=1, agent_usage=False):
+    attributes = {"gen_ai.agent.name": "Strands Agents"}
+    if agent_usage:
+        attributes["gen_ai.usage.total_tokens"] = total_tokens * llm_calls
+    with tracer.start_as_current_span("invoke_agent", start_time=1, end_on_exit=False,
+                                      attributes=attributes) as agent:
+        with tracer.start_as_current_span("Cycle 0"):
+            for _ in range(llm_calls):
+                with tracer.start_as_current_span("Model invoke", attributes={
+                    "gen_ai.prompt": "hi",
+                    "gen_ai.usage.total_tokens": total_tokens,
+                }):
+                    pass
+            with tracer.start_as_current_span("Tool: create_booking", attributes={"tool.name": "create_booking"}) as tool:
+                if error:
+                    tool.set_status(Status(StatusCode.ERROR, "DynamoDB unavailable"))
+    agent.end(end_time=1 + duration_ns)
+
+
+class TestTailSampling(unittest.TestCase):
+    def test_keeps_whole_trace_with_error(self):
+        tracer, exporter, sampler = make_tracer(sample_rate=0.0)
+        run_trace(tracer)
+        run_trace(tracer, error=True)
+
+        spans = exporter.get_finished_spans()
+        self.assertEqual(len(spans), 4)
+        self.assertEqual(len({span.context.trace_id for span in spans}), 1)
+        self.assertEqual(sampler.buffered_spans, 0)
+
+    def test_keeps_slow_and_expensive_traces(self):
+        tracer, exporter, _ = make_tracer(sample_rate=0.0, latency_threshold_ms=1000, token_threshold=5000)
+        run_trace(tracer, duration_ns=2 * 10 ** 9)
+        run_trace(tracer, total_tokens=8000)
+        run_trace(tracer)
+
+        self.assertEqual(len({span.context.trace_id for span in exporter.get_finished_spans()}), 2)
+
+    def test_token_threshold_on_trace_total(self):
+        tracer, exporter, _ = make_tracer(sample_rate=0.0, latency_threshold_ms=None, token_threshold=5000)
+        run_trace(tracer, total_tokens=2000, llm_calls=3)
+        # The agent span's own total repeats its model calls' tokens
+        run_trace(tracer, total_tokens=3000, agent_usage=True)
+
+        spans = exporter.get_finished_spans()
+        self.assertEqual(len({span.context.trace_id for span in spans}), 1)
+        self.assertEqual(sum(span.name == "Model invoke" for span in spans), 3)
+
+    def test_samples_remaining_traces_at_rate(self):
+        tracer, exporter, _ = make_tracer(sample_rate=0.25)
+        for _ in range(400):
+            run_trace(tracer)
+
+        kept_traces = len({span.context.trace_id for span in exporter.get_finished_spans()})
+        self.assertTrue(60 <= kept_traces <= 140, kept_traces)
+        self.assertEqual(len(exporter.get_finished_spans()), kept_traces * 4)
+
+    def test_buffer_bounded_for_unfinished_traces(self):
+        tracer, exporter, sampler = make_tracer(sample_rate=1.0, max_buffered_spans=10, max_decisions=5)
+        with tracer.start_as_current_span("invoke_agent", attributes={"gen_ai.agent.name": "agent"}):
+            for cycle in range(100):
+                with tracer.start_as_current_span(f"Cycle {cycle}"):
+                    pass
+                self.assertLessEqual(sampler.buffered_spans, 10)
+
+        self.assertEqual(len(exporter.get_finished_spans()), 101)
+        self.assertLessEqual(len(sampler.decisions), 5)
+
+    def test_shutdown_decides_open_traces(self):
+        tracer, exporter, sampler = make_tracer(sample_rate=1.0)
+        agent = tracer.start_span("invoke_agent")
+        with trace.use_span(agent):
+            with tracer.start_as_current_span("Cycle 0"):
+                pass
+        self.assertEqual(len(exporter.get_finished_spans()), 0)
+
+        sampler.shutdown()
+        self.assertEqual([span.name for span in exporter.get_finished_spans()], ["Cycle 0"])
+
+
+if __name__ == "__main__":
+    unittest.main()